@@ -0,0 +1,84 @@
+"""
+Benchmark de descargas de manuales: tiempo de worker por descarga en cada modo de download_manual().
+
+Escenarios (un PDF sintético servido con el test client de Flask, leyendo el cuerpo completo):
+  - completa:            lo que pasaba en cada reapertura antes (sin caché fuerte)
+  - rango 256 KiB:       el visor de PDF del teléfono salta a una página
+  - revalidación (304):  el teléfono ya tiene el archivo (If-None-Match con el hash)
+  - x-sendfile/x-accel:  el proxy envía los bytes; el worker solo arma las cabeceras
+
+Uso:
+    python benchmarks/descargas.py [--mb 20] [--repeticiones 50]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def medir(cliente, url, repeticiones, headers=None):
+    muro, cpu, enviados = [], [], 0
+    for _ in range(repeticiones):
+        t0, c0 = time.perf_counter(), time.process_time()
+        r = cliente.get(url, headers=headers or {})
+        enviados = len(r.get_data())  # consumir el cuerpo, como haría el servidor WSGI
+        muro.append(time.perf_counter() - t0)
+        cpu.append(time.process_time() - c0)
+        r.close()
+    return r.status_code, enviados, statistics.median(muro) * 1000, statistics.median(cpu) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mb', type=int, default=20, help="Tamaño del PDF sintético")
+    parser.add_argument('--repeticiones', type=int, default=50)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    shutil.copy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'inventario.db'),
+                os.path.join(carpeta, 'inventario.db'))
+    os.environ['DATABASE_PATH'] = os.path.join(carpeta, 'inventario.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(carpeta, 'manuales')
+    os.environ['BACKUP_FOLDER'] = os.path.join(carpeta, 'backups')
+    from app import app
+    from inventario import almacen
+    from inventario.cli import inicializar_base
+
+    with app.app_context():
+        inicializar_base()
+
+    with open(os.path.join(carpeta, 'origen.pdf'), 'wb') as f:
+        f.write(os.urandom(args.mb * 1024 * 1024))
+    with open(os.path.join(carpeta, 'origen.pdf'), 'rb') as f:
+        sha256, filename, _, _ = almacen.guardar_stream(f, app.config['UPLOAD_FOLDER'], 'pdf')
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+    url = f'/download/{filename}'
+
+    escenarios = [
+        ('completa', '', None),
+        ('rango 256 KiB', '', {'Range': 'bytes=1048576-1310719'}),
+        ('revalidación (304)', '', {'If-None-Match': f'"{sha256}"'}),
+        ('x-sendfile', 'x-sendfile', None),
+        ('x-accel', 'x-accel', None),
+    ]
+    print(f"PDF de {args.mb} MiB, mediana de {args.repeticiones} descargas\n")
+    print(f"{'escenario':<22} {'estado':>6} {'bytes del worker':>17} {'muro ms':>9} {'cpu ms':>9}")
+    for nombre, modo, headers in escenarios:
+        app.config['DESCARGAS_OFFLOAD'] = modo
+        app.config['USE_X_SENDFILE'] = modo == 'x-sendfile'
+        estado, enviados, muro, cpu = medir(cliente, url, args.repeticiones, headers)
+        print(f"{nombre:<22} {estado:>6} {enviados:>17} {muro:>9.2f} {cpu:>9.2f}")
+
+    shutil.rmtree(carpeta, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Prueba de estrés de concurrencia: varios procesos (como workers de gunicorn) registran
+salidas y retornos sobre el mismo archivo SQLite a la vez. Al final verifica que ningún
+contador quedó negativo ni por encima del total, que coincide con el historial y que
+cada fixture tiene una sola salida abierta.
+
+Uso:
+    python benchmarks/estres_concurrencia.py [--procesos 6] [--operaciones 150]
+Sale con código 1 si encuentra alguna inconsistencia.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STOCK = 5
+FIXTURES = 8
+
+
+def preparar_base(carpeta):
+    os.environ['DATABASE_PATH'] = os.path.join(carpeta, 'estres.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(carpeta, 'manuales')
+    os.environ['BACKUP_FOLDER'] = os.path.join(carpeta, 'backups')
+    sys.path.insert(0, RAIZ)
+    from inventario import create_app
+    from inventario.cli import inicializar_base
+    from inventario.extensiones import db
+    from inventario.modelos import Equipo, EquipoIndividual
+
+    with create_app().app_context():
+        inicializar_base()
+        cantidad = Equipo(nombre='Stand C', categoria='Grip', cantidad_total=STOCK, cantidad_en_uso=0)
+        grupo = Equipo(nombre='Forza Estrés', categoria='Luminarias', cantidad_total=FIXTURES,
+                       cantidad_en_uso=0, gestion_individual=True)
+        db.session.add_all([cantidad, grupo])
+        db.session.flush()
+        db.session.add_all([EquipoIndividual(equipo_grupo_id=grupo.id, numero_serie=f'SN{i}', numero_fixture=i)
+                            for i in range(1, FIXTURES + 1)])
+        db.session.commit()
+        individuales = [i.id for i in EquipoIndividual.query.filter_by(equipo_grupo_id=grupo.id)]
+        return cantidad.id, grupo.id, individuales
+
+
+def trabajador(args):
+    carpeta, semilla, operaciones, cantidad_id, grupo_id, individuales = args
+    os.environ['DATABASE_PATH'] = os.path.join(carpeta, 'estres.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(carpeta, 'manuales')
+    os.environ['BACKUP_FOLDER'] = os.path.join(carpeta, 'backups')
+    sys.path.insert(0, RAIZ)
+    from app import app
+
+    rnd = random.Random(semilla)
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'MLProducciones', 'password': 'admin123'})
+    errores_http = 0
+    for _ in range(operaciones):
+        tipo = rnd.choice(['prestar', 'devolver'])
+        if rnd.random() < 0.5:
+            datos = {'donde': f'Worker {semilla}', 'cant_lote': rnd.randint(1, 3)}
+            r = cliente.post(f'/movimiento/{cantidad_id}/{tipo}', data=datos)
+        else:
+            datos = {'donde': f'Worker {semilla}', 'cant_lote': 1, 'ind_id': rnd.choice(individuales)}
+            r = cliente.post(f'/movimiento/{grupo_id}/{tipo}', data=datos)
+        errores_http += r.status_code >= 500
+    return errores_http
+
+
+def verificar(path, cantidad_id, grupo_id):
+    conn = sqlite3.connect(path)
+    problemas = []
+    for equipo_id in (cantidad_id, grupo_id):
+        total, en_uso = conn.execute('SELECT cantidad_total, cantidad_en_uso FROM equipo WHERE id = ?',
+                                     (equipo_id,)).fetchone()
+        neto = conn.execute(
+            "SELECT coalesce(sum(CASE tipo WHEN 'SALIDA' THEN cantidad ELSE -cantidad END), 0) "
+            "FROM historial WHERE equipo_id = ?", (equipo_id,)).fetchone()[0]
+        print(f"  equipo {equipo_id}: total={total} en_uso={en_uso} historial(SALIDA-RETORNO)={neto}")
+        if not 0 <= en_uso <= total:
+            problemas.append(f"equipo {equipo_id}: en_uso={en_uso} fuera de [0, {total}]")
+        if en_uso != neto:
+            problemas.append(f"equipo {equipo_id}: contador {en_uso} != historial {neto}")
+
+    for ind_id, en_uso in conn.execute('SELECT id, coalesce(en_uso, 0) FROM equipo_individual WHERE equipo_grupo_id = ?',
+                                       (grupo_id,)):
+        neto = conn.execute(
+            "SELECT coalesce(sum(CASE tipo WHEN 'SALIDA' THEN 1 ELSE -1 END), 0) "
+            "FROM historial WHERE equipo_individual_id = ?", (ind_id,)).fetchone()[0]
+        if neto != en_uso:
+            problemas.append(f"individual {ind_id}: en_uso={en_uso} pero historial neto={neto}")
+    en_uso_ind = conn.execute('SELECT count(*) FROM equipo_individual WHERE equipo_grupo_id = ? AND en_uso',
+                              (grupo_id,)).fetchone()[0]
+    en_uso_grupo = conn.execute('SELECT cantidad_en_uso FROM equipo WHERE id = ?', (grupo_id,)).fetchone()[0]
+    if en_uso_ind != en_uso_grupo:
+        problemas.append(f"grupo {grupo_id}: {en_uso_ind} fixtures en uso pero contador={en_uso_grupo}")
+    movimientos = conn.execute('SELECT count(*) FROM historial').fetchone()[0]
+    print(f"  movimientos registrados: {movimientos}")
+    return problemas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--procesos', type=int, default=6)
+    parser.add_argument('--operaciones', type=int, default=150)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    # La base se prepara en un proceso aparte para que los trabajadores arranquen "en frío" como en gunicorn
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        cantidad_id, grupo_id, individuales = pool.apply(preparar_base, (carpeta,))
+
+    tareas = [(carpeta, semilla, args.operaciones, cantidad_id, grupo_id, individuales)
+              for semilla in range(args.procesos)]
+    with multiprocessing.get_context('spawn').Pool(args.procesos) as pool:
+        errores_http = sum(pool.map(trabajador, tareas))
+
+    print(f"{args.procesos} procesos x {args.operaciones} operaciones, respuestas 5xx: {errores_http}")
+    problemas = verificar(os.path.join(carpeta, 'estres.db'), cantidad_id, grupo_id)
+    if problemas or errores_http:
+        for p in problemas:
+            print(f"  ❌ {p}")
+        sys.exit(1)
+    print("  ✅ Contadores consistentes")
+
+
+if __name__ == '__main__':
+    main()
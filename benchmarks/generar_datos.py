@@ -0,0 +1,175 @@
+"""
+Generador de datos sintéticos para benchmarks: llena equipo, equipo_individual, historial,
+repuesto, compatibilidad, equipo_repuesto y ubicacion con volúmenes configurables.
+
+Los contadores quedan coherentes con los datos: cada fixture en terreno tiene su última
+SALIDA abierta y cantidad_en_uso de cada equipo coincide con SALIDA - RETORNO.
+
+Uso:
+    python benchmarks/generar_datos.py DESTINO.db [--escala chica|mediana|grande]
+                                       [--equipos N] [--individuales N] [--movimientos N] [--repuestos N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ESCALAS = {
+    'chica': {'equipos': 200, 'individuales': 5000, 'movimientos': 50000, 'repuestos': 300},
+    'mediana': {'equipos': 1000, 'individuales': 20000, 'movimientos': 300000, 'repuestos': 1000},
+    'grande': {'equipos': 5000, 'individuales': 100000, 'movimientos': 2000000, 'repuestos': 5000},
+}
+
+CATEGORIAS = ["Luminarias", "Grip", "Insumos", "Equipamiento Electrico", "Accesorios"]
+MARCAS = ['Nanlite', 'Aputure', 'Eastman', 'Manfrotto', 'Avenger', 'Kupo', 'Godox', 'Litepanels']
+MODELOS = ['Forza', 'Alien', 'PavoTube', 'ParLed', 'Evoke', 'C-Stand', 'Combo', 'Clamp', 'Cable', 'Dimmer']
+LUGARES = [f'{tipo} {n}' for tipo in ('Teatro', 'Estudio', 'Locación', 'Evento', 'Set') for n in range(1, 41)]
+LOTE = 20000
+
+
+def insertar(db, tabla, filas):
+    for i in range(0, len(filas), LOTE):
+        db.session.execute(db.insert(tabla), filas[i:i + LOTE])
+
+
+def generar(equipos, individuales, movimientos, repuestos, semilla=42):
+    """Llena la base configurada en DATABASE_PATH (debe estar vacía). Devuelve un resumen con ids útiles."""
+    sys.path.insert(0, RAIZ)
+    from inventario import create_app
+    from inventario.cli import inicializar_base
+    from inventario.extensiones import db
+    from inventario.modelos import (Equipo, EquipoIndividual, Historial, Repuesto, Ubicacion,
+                                    compatibilidad, equipo_repuesto)
+
+    rnd = random.Random(semilla)
+    inicio = datetime.now() - timedelta(days=730)
+    paso = timedelta(days=730) / max(movimientos, 1)
+    hoy = datetime.now().strftime('%Y-%m-%d')
+
+    with create_app().app_context():
+        inicializar_base()
+        # Grupos: ~1/5 luminarias con gestión individual; el resto por cantidad
+        n_grupos = max(1, equipos // 5)
+        filas_equipo = []
+        for i in range(1, equipos + 1):
+            individual = i <= n_grupos
+            filas_equipo.append({
+                'id': i,
+                'nombre': f'{rnd.choice(MODELOS)} {rnd.randint(10, 999)}{rnd.choice("BCX")} #{i}',
+                'categoria': 'Luminarias' if individual else rnd.choice(CATEGORIAS[1:]),
+                'marca': rnd.choice(MARCAS),
+                'cantidad_total': 0 if individual else rnd.randint(5, 60),
+                'cantidad_en_uso': 0,
+                'fecha_ingreso': hoy,
+                'observaciones': '',
+                'danado': False,
+                'gestion_individual': individual,
+            })
+
+        filas_ind = []
+        por_grupo = {}
+        for i in range(1, individuales + 1):
+            grupo = rnd.randint(1, n_grupos)
+            numero = len(por_grupo.setdefault(grupo, [])) + 1
+            por_grupo[grupo].append(i)
+            filas_ind.append({
+                'id': i, 'equipo_grupo_id': grupo, 'numero_serie': f'SN{grupo:05d}{numero:05d}',
+                'numero_fixture': numero, 'danado': rnd.random() < 0.02, 'observaciones_individuales': '',
+                'fecha_ingreso': hoy, 'en_uso': False, 'ubicacion_actual': None,
+            })
+        for grupo, ids in por_grupo.items():
+            filas_equipo[grupo - 1]['cantidad_total'] = len(ids)
+
+        # Historial: alterna salidas y retornos por equipo para que el estado final sea válido
+        filas_hist = []
+        abiertos_ind = {}        # fixture -> lugar de su SALIDA abierta
+        en_uso_cant = {}         # equipo -> unidades en terreno
+        usos_lugar = {}
+        for n in range(movimientos):
+            fecha = inicio + paso * n
+            lugar = rnd.choice(LUGARES)
+            if rnd.random() < 0.6 and individuales:
+                ind = rnd.randint(1, individuales)
+                fila_ind = filas_ind[ind - 1]
+                tipo = 'RETORNO' if ind in abiertos_ind else 'SALIDA'
+                if tipo == 'RETORNO':
+                    lugar = abiertos_ind.pop(ind)
+                else:
+                    abiertos_ind[ind] = lugar
+                filas_hist.append({'equipo_id': fila_ind['equipo_grupo_id'], 'tipo': tipo, 'usuario': lugar,
+                                   'cantidad': 1, 'observaciones': '', 'estado_al_retorno': 'Buen Estado',
+                                   'fecha': fecha, 'equipo_individual_id': ind})
+            else:
+                equipo = rnd.randint(n_grupos + 1, equipos) if equipos > n_grupos else 1
+                actual = en_uso_cant.get(equipo, 0)
+                total = filas_equipo[equipo - 1]['cantidad_total']
+                if actual and (actual >= total or rnd.random() < 0.5):
+                    tipo, cantidad = 'RETORNO', rnd.randint(1, actual)
+                    en_uso_cant[equipo] = actual - cantidad
+                else:
+                    tipo, cantidad = 'SALIDA', rnd.randint(1, max(1, min(3, total - actual)))
+                    en_uso_cant[equipo] = actual + cantidad
+                filas_hist.append({'equipo_id': equipo, 'tipo': tipo, 'usuario': lugar, 'cantidad': cantidad,
+                                   'observaciones': '', 'estado_al_retorno': 'Buen Estado', 'fecha': fecha,
+                                   'equipo_individual_id': None})
+            usos_lugar[lugar] = (usos_lugar.get(lugar, (0, None))[0] + 1, fecha)
+
+        for equipo, cantidad in en_uso_cant.items():
+            filas_equipo[equipo - 1]['cantidad_en_uso'] = cantidad
+        # En los grupos con gestión individual el contador es la cantidad de fixtures fuera
+        for ind, lugar in abiertos_ind.items():
+            filas_ind[ind - 1]['en_uso'] = True
+            filas_ind[ind - 1]['ubicacion_actual'] = lugar
+            filas_equipo[filas_ind[ind - 1]['equipo_grupo_id'] - 1]['cantidad_en_uso'] += 1
+
+        filas_rep = [{'id': i, 'nombre': f'Repuesto {rnd.choice(MODELOS)} {i}', 'marca': rnd.choice(MARCAS),
+                      'categoria': rnd.choice(['General', 'Electrónico', 'Mecánico', 'Óptico']),
+                      'cantidad': rnd.choice([0, 0, 1, 2, 5, 10]), 'equipo_asociado_texto': ''}
+                     for i in range(1, repuestos + 1)]
+        compat = {(rnd.randint(1, n_grupos), rnd.randint(1, n_grupos)) for _ in range(n_grupos * 2)}
+        vinculos = {(rnd.randint(1, n_grupos), rnd.randint(1, repuestos)) for _ in range(repuestos * 2)} if repuestos else set()
+
+        insertar(db, Equipo, filas_equipo)
+        insertar(db, EquipoIndividual, filas_ind)
+        insertar(db, Repuesto, filas_rep)
+        insertar(db, Historial, filas_hist)
+        insertar(db, compatibilidad, [{'equipo_id': a, 'compatible_id': b} for a, b in compat if a != b])
+        insertar(db, equipo_repuesto, [{'equipo_id': e, 'repuesto_id': r} for e, r in vinculos])
+        insertar(db, Ubicacion, [{'nombre': l, 'usos': u, 'ultimo_uso': f} for l, (u, f) in usos_lugar.items()])
+        db.session.commit()
+
+    return {
+        'grupo_individual': max(por_grupo, key=lambda g: len(por_grupo[g])) if por_grupo else None,
+        'equipo_cantidad': n_grupos + 1 if equipos > n_grupos else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('destino', help="Archivo SQLite a crear (no debe existir)")
+    parser.add_argument('--escala', choices=ESCALAS, default='chica')
+    for campo in ('equipos', 'individuales', 'movimientos', 'repuestos'):
+        parser.add_argument(f'--{campo}', type=int)
+    args = parser.parse_args()
+
+    if os.path.exists(args.destino):
+        parser.error(f"{args.destino} ya existe")
+    volumen = dict(ESCALAS[args.escala])
+    volumen.update({k: v for k, v in vars(args).items() if k in volumen and v is not None})
+
+    carpeta = os.path.dirname(os.path.abspath(args.destino))
+    os.environ['DATABASE_PATH'] = os.path.abspath(args.destino)
+    os.environ.setdefault('UPLOAD_FOLDER', os.path.join(carpeta, 'manuales'))
+    os.environ.setdefault('BACKUP_FOLDER', os.path.join(carpeta, 'backups'))
+
+    t = time.perf_counter()
+    generar(**volumen)
+    print(f"Base generada en {args.destino} ({volumen}) en {time.perf_counter() - t:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark de planes de consulta: compara las consultas frecuentes sin y con los índices
+de la migración 0002_indices_y_serie_unica, sobre una base sintética.
+
+Uso:
+    python benchmarks/planes_indices.py [--equipos 500] [--individuales 20000] [--movimientos 200000]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+INDICES = {
+    'ix_historial_equipo_id': 'CREATE INDEX ix_historial_equipo_id ON historial (equipo_id)',
+    'ix_historial_fecha': 'CREATE INDEX ix_historial_fecha ON historial (fecha)',
+    'ix_historial_usuario': 'CREATE INDEX ix_historial_usuario ON historial (usuario)',
+    'ix_historial_equipo_individual_id': 'CREATE INDEX ix_historial_equipo_individual_id ON historial (equipo_individual_id)',
+    'ix_equipo_categoria': 'CREATE INDEX ix_equipo_categoria ON equipo (categoria)',
+    'uq_equipo_individual_grupo_serie': 'CREATE UNIQUE INDEX uq_equipo_individual_grupo_serie ON equipo_individual (equipo_grupo_id, numero_serie)',
+}
+
+CONSULTAS = [
+    ('Movimientos de un equipo (detalle)',
+     'SELECT * FROM historial WHERE equipo_id = :equipo ORDER BY id'),
+    ('Página de historial (keyset)',
+     'SELECT * FROM historial WHERE fecha < :fecha ORDER BY fecha DESC, id DESC LIMIT 51'),
+    ('Movimientos por destino',
+     'SELECT count(*) FROM historial WHERE usuario = :usuario'),
+    ('Movimientos de un fixture',
+     'SELECT * FROM historial WHERE equipo_individual_id = :individual'),
+    ('Equipos de una categoría',
+     "SELECT * FROM equipo WHERE categoria = 'Luminarias' ORDER BY nombre"),
+    ('Disponibilidad de un grupo',
+     'SELECT count(*), sum(en_uso), sum(danado) FROM equipo_individual WHERE equipo_grupo_id = :equipo'),
+    ('Verificar serie duplicada',
+     'SELECT id FROM equipo_individual WHERE equipo_grupo_id = :equipo AND numero_serie = :serie LIMIT 1'),
+]
+
+CATEGORIAS = ["Luminarias", "Grip", "Insumos", "Equipamiento Electrico", "Accesorios"]
+LUGARES = [f"Locación {i}" for i in range(200)]
+
+
+def crear_base(path, n_equipos, n_individuales, n_movimientos):
+    os.environ['DATABASE_PATH'] = path
+    os.environ.setdefault('UPLOAD_FOLDER', os.path.join(os.path.dirname(path), 'manuales'))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from inventario import create_app
+    from inventario.cli import inicializar_base
+
+    with create_app().app_context():
+        inicializar_base()  # esquema vacío (con índices) en DATABASE_PATH
+
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO equipo (id, nombre, categoria, marca, cantidad_total, cantidad_en_uso) VALUES (?, ?, ?, ?, ?, 0)',
+        [(i, f'Equipo {i}', rnd.choice(CATEGORIAS), 'Marca', 10) for i in range(1, n_equipos + 1)])
+    conn.executemany(
+        'INSERT INTO equipo_individual (id, equipo_grupo_id, numero_serie, numero_fixture, en_uso, danado) VALUES (?, ?, ?, ?, 0, 0)',
+        [(i, rnd.randint(1, n_equipos), f'SN{i:08d}', i % 100) for i in range(1, n_individuales + 1)])
+    inicio = datetime(2024, 1, 1)
+    conn.executemany(
+        'INSERT INTO historial (equipo_id, tipo, usuario, cantidad, fecha, equipo_individual_id) VALUES (?, ?, ?, 1, ?, ?)',
+        ((rnd.randint(1, n_equipos), rnd.choice(['SALIDA', 'RETORNO']), rnd.choice(LUGARES),
+          (inicio + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S.000000'),
+          rnd.randint(1, n_individuales)) for i in range(n_movimientos)))
+    conn.commit()
+    conn.execute('ANALYZE')
+    return conn
+
+
+def medir(conn, sql, params, repeticiones):
+    plan = ' | '.join(r[3] for r in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+    t = time.perf_counter()
+    for _ in range(repeticiones):
+        conn.execute(sql, params).fetchall()
+    return plan, (time.perf_counter() - t) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', type=int, default=500)
+    parser.add_argument('--individuales', type=int, default=20000)
+    parser.add_argument('--movimientos', type=int, default=200000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    conn = crear_base(os.path.join(carpeta, 'bench.db'), args.equipos, args.individuales, args.movimientos)
+    params = {'equipo': args.equipos // 2, 'fecha': '2024-03-01 00:00:00.000000', 'usuario': LUGARES[7],
+              'individual': args.individuales // 2, 'serie': f'SN{args.individuales // 3:08d}'}
+
+    resultados = {}
+    for nombre in INDICES:
+        conn.execute(f'DROP INDEX IF EXISTS {nombre}')
+    conn.execute('ANALYZE')
+    for titulo, sql in CONSULTAS:
+        resultados[titulo] = [medir(conn, sql, params, args.repeticiones)]
+
+    for sql in INDICES.values():
+        conn.execute(sql)
+    conn.execute('ANALYZE')
+    for titulo, sql in CONSULTAS:
+        resultados[titulo].append(medir(conn, sql, params, args.repeticiones))
+
+    print(f"Base sintética: {args.equipos} equipos, {args.individuales} individuales, {args.movimientos} movimientos\n")
+    print(f"{'Consulta':<38} {'sin índices':>12} {'con índices':>12}  plan con índices")
+    for titulo, ((_, antes), (plan, despues)) in resultados.items():
+        print(f"{titulo:<38} {antes:>10.2f}ms {despues:>10.2f}ms  {plan}")
+    print("\nPlanes sin índices:")
+    for titulo, ((plan, _), _) in resultados.items():
+        print(f"  {titulo}: {plan}")
+
+
+if __name__ == '__main__':
+    main()
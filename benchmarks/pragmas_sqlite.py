@@ -0,0 +1,168 @@
+"""
+Benchmark de los ajustes de SQLite (SQLITE_PRAGMAS en inventario/config.py) contra los valores por defecto.
+
+Sobre una base sintética mide:
+  - escrituras: transacciones cortas como las de movimiento() (INSERT en historial + UPDATE de equipo)
+  - lecturas: consultas de página de historial y disponibilidad por grupo
+  - mixto: lectores en hilos mientras un escritor registra movimientos (workers concurrentes)
+
+Uso:
+    python benchmarks/pragmas_sqlite.py [--movimientos 100000] [--escrituras 2000] [--lecturas 2000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRAGMAS_POR_DEFECTO = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}
+
+
+def crear_base(path, n_equipos, n_individuales, n_movimientos):
+    rnd = random.Random(7)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE equipo (id INTEGER PRIMARY KEY, nombre TEXT, categoria TEXT,
+                             cantidad_total INTEGER, cantidad_en_uso INTEGER);
+        CREATE TABLE equipo_individual (id INTEGER PRIMARY KEY, equipo_grupo_id INTEGER, numero_serie TEXT,
+                                        en_uso BOOLEAN, danado BOOLEAN);
+        CREATE TABLE historial (id INTEGER PRIMARY KEY, equipo_id INTEGER, tipo TEXT, usuario TEXT,
+                                cantidad INTEGER, fecha DATETIME, equipo_individual_id INTEGER);
+        CREATE INDEX ix_historial_fecha ON historial (fecha);
+        CREATE INDEX ix_historial_equipo_id ON historial (equipo_id);
+        CREATE INDEX ix_ind_grupo ON equipo_individual (equipo_grupo_id);
+    """)
+    conn.executemany('INSERT INTO equipo VALUES (?, ?, ?, 1000000, 0)',
+                     [(i, f'Equipo {i}', 'Grip') for i in range(1, n_equipos + 1)])
+    conn.executemany('INSERT INTO equipo_individual VALUES (?, ?, ?, 0, 0)',
+                     [(i, rnd.randint(1, n_equipos), f'SN{i}') for i in range(1, n_individuales + 1)])
+    inicio = datetime(2024, 1, 1)
+    conn.executemany('INSERT INTO historial (equipo_id, tipo, usuario, cantidad, fecha) VALUES (?, ?, ?, 1, ?)',
+                     ((rnd.randint(1, n_equipos), 'SALIDA', f'Lugar {i % 50}',
+                       (inicio + timedelta(minutes=i)).isoformat(' ')) for i in range(n_movimientos)))
+    conn.commit()
+    conn.close()
+
+
+def conectar(path, pragmas):
+    from inventario.base_datos import aplicar_pragmas_sqlite
+    conn = sqlite3.connect(path, timeout=pragmas.get('busy_timeout', 5000) / 1000, check_same_thread=False)
+    aplicar_pragmas_sqlite(conn, pragmas)
+    return conn
+
+
+def escribir(conn, n, n_equipos, rnd):
+    for _ in range(n):
+        equipo = rnd.randint(1, n_equipos)
+        conn.execute('UPDATE equipo SET cantidad_en_uso = cantidad_en_uso + 1 WHERE id = ? '
+                     'AND cantidad_total - cantidad_en_uso >= 1', (equipo,))
+        conn.execute("INSERT INTO historial (equipo_id, tipo, usuario, cantidad, fecha) "
+                     "VALUES (?, 'SALIDA', 'Bench', 1, datetime('now'))", (equipo,))
+        conn.commit()
+
+
+def leer(conn, n, n_equipos, rnd):
+    for i in range(n):
+        if i % 2:
+            conn.execute('SELECT * FROM historial ORDER BY fecha DESC, id DESC LIMIT 50 OFFSET ?',
+                         (rnd.randint(0, 500),)).fetchall()
+        else:
+            conn.execute('SELECT count(*), sum(en_uso), sum(danado) FROM equipo_individual '
+                         'WHERE equipo_grupo_id = ?', (rnd.randint(1, n_equipos),)).fetchall()
+
+
+def medir_configuracion(nombre, base, pragmas, args):
+    path = os.path.join(os.path.dirname(base), f'{nombre}.db')
+    shutil.copy(base, path)
+    rnd = random.Random(1)
+
+    conn = conectar(path, pragmas)
+    t = time.perf_counter()
+    escribir(conn, args.escrituras, args.equipos, rnd)
+    escrituras = args.escrituras / (time.perf_counter() - t)
+
+    t = time.perf_counter()
+    leer(conn, args.lecturas, args.equipos, rnd)
+    lecturas = args.lecturas / (time.perf_counter() - t)
+    conn.close()
+
+    # Mixto: 4 lectores y 1 escritor, cada uno con su propia conexión
+    contadores = {'lecturas': 0, 'escrituras': 0, 'bloqueos': 0}
+    fin = time.perf_counter() + args.segundos_mixto
+
+    def lector(semilla):
+        c, r = conectar(path, pragmas), random.Random(semilla)
+        while time.perf_counter() < fin:
+            try:
+                leer(c, 10, args.equipos, r)
+                contadores['lecturas'] += 10
+            except sqlite3.OperationalError:
+                contadores['bloqueos'] += 1
+        c.close()
+
+    def escritor():
+        c, r = conectar(path, pragmas), random.Random(99)
+        while time.perf_counter() < fin:
+            try:
+                escribir(c, 5, args.equipos, r)
+                contadores['escrituras'] += 5
+            except sqlite3.OperationalError:
+                c.rollback()
+                contadores['bloqueos'] += 1
+        c.close()
+
+    hilos = [threading.Thread(target=lector, args=(i,)) for i in range(4)] + [threading.Thread(target=escritor)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    return {
+        'escrituras/s': escrituras,
+        'lecturas/s': lecturas,
+        'mixto lecturas/s': contadores['lecturas'] / args.segundos_mixto,
+        'mixto escrituras/s': contadores['escrituras'] / args.segundos_mixto,
+        'mixto errores de bloqueo': contadores['bloqueos'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', type=int, default=500)
+    parser.add_argument('--individuales', type=int, default=20000)
+    parser.add_argument('--movimientos', type=int, default=100000)
+    parser.add_argument('--escrituras', type=int, default=2000)
+    parser.add_argument('--lecturas', type=int, default=2000)
+    parser.add_argument('--segundos-mixto', type=float, default=3.0)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    os.environ.setdefault('DATABASE_PATH', os.path.join(carpeta, 'app.db'))
+    os.environ.setdefault('UPLOAD_FOLDER', os.path.join(carpeta, 'manuales'))
+    from app import app
+
+    base = os.path.join(carpeta, 'base.db')
+    crear_base(base, args.equipos, args.individuales, args.movimientos)
+
+    resultados = {
+        'por defecto': medir_configuracion('defecto', base, PRAGMAS_POR_DEFECTO, args),
+        'ajustado': medir_configuracion('ajustado', base, app.config['SQLITE_PRAGMAS'], args),
+    }
+
+    print(f"Base sintética: {args.equipos} equipos, {args.individuales} individuales, {args.movimientos} movimientos")
+    print(f"Ajustes: {app.config['SQLITE_PRAGMAS']}\n")
+    print(f"{'métrica':<28} {'por defecto':>14} {'ajustado':>14}")
+    for metrica in resultados['por defecto']:
+        a, b = resultados['por defecto'][metrica], resultados['ajustado'][metrica]
+        print(f"{metrica:<28} {a:>14.1f} {b:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
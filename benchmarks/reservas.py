@@ -0,0 +1,97 @@
+"""
+Benchmark de reservas: consulta por rango con el índice de intervalos (reserva_rtree) contra el
+recorrido de la tabla reserva, sobre una base sintética con años de reservas pasadas y futuras.
+
+Uso:
+    python benchmarks/reservas.py [--equipos 500] [--reservas 200000] [--repeticiones 200]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DESTINOS = [f"Rodaje {i}" for i in range(300)]
+
+
+def crear_base(path, n_equipos, n_reservas):
+    os.environ['DATABASE_PATH'] = path
+    os.environ.setdefault('UPLOAD_FOLDER', os.path.join(os.path.dirname(path), 'manuales'))
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from inventario import create_app
+    from inventario.cli import inicializar_base
+
+    app = create_app()
+    with app.app_context():
+        inicializar_base()  # esquema, reserva_rtree y sus triggers
+
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        'INSERT INTO equipo (id, nombre, categoria, marca, cantidad_total, cantidad_en_uso) VALUES (?, ?, ?, ?, ?, 0)',
+        [(i, f'Equipo {i}', 'Luminarias', 'Marca', rnd.randint(5, 60)) for i in range(1, n_equipos + 1)])
+    inicio_datos = datetime.now() - timedelta(days=3 * 365)
+    filas = []
+    for _ in range(n_reservas):
+        inicio = inicio_datos + timedelta(minutes=rnd.randrange(4 * 365 * 24 * 60))
+        fin = inicio + timedelta(hours=rnd.randint(4, 24 * 10))
+        filas.append((rnd.randint(1, n_equipos), rnd.randint(1, 4), rnd.choice(DESTINOS), inicio, fin))
+    conn.executemany(
+        'INSERT INTO reserva (equipo_id, cantidad, usuario, inicio, fin, retiradas) VALUES (?, ?, ?, ?, ?, 0)',
+        [(e, c, u, i.isoformat(' '), f.isoformat(' ')) for e, c, u, i, f in filas])
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return app
+
+
+def medir(funcion, repeticiones):
+    t = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return (time.perf_counter() - t) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--equipos', type=int, default=500)
+    parser.add_argument('--reservas', type=int, default=200000)
+    parser.add_argument('--repeticiones', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        path = os.path.join(carpeta, 'inventario.db')
+        app = crear_base(path, args.equipos, args.reservas)
+        from inventario.extensiones import db
+        from inventario.modelos import Reserva
+        from inventario.reservas import disponibilidad, en_rango
+
+        rnd = random.Random(7)
+        kit = rnd.sample(range(1, args.equipos + 1), 15)
+        desde = datetime.now() + timedelta(days=10)
+        hasta = desde + timedelta(days=3)
+        with app.app_context():
+            consultas = {
+                'reservas de un kit (índice)':
+                    lambda: db.session.execute(db.select(Reserva.id).where(en_rango(desde, hasta, kit))).all(),
+                'reservas de un kit (recorrido)':
+                    lambda: db.session.execute(db.select(Reserva.id).where(
+                        Reserva.equipo_id.in_(kit), Reserva.inicio < hasta, Reserva.fin > desde)).all(),
+                'todas las del rango (índice)':
+                    lambda: db.session.execute(db.select(Reserva.id).where(en_rango(desde, hasta))).all(),
+                'todas las del rango (recorrido)':
+                    lambda: db.session.execute(db.select(Reserva.id).where(
+                        Reserva.inicio < hasta, Reserva.fin > desde)).all(),
+                'disponibilidad() de un kit':
+                    lambda: disponibilidad(kit, desde, hasta),
+            }
+            print(f"{args.reservas} reservas, {args.equipos} equipos, kit de {len(kit)} equipos, rango de 3 días")
+            for nombre, funcion in consultas.items():
+                print(f"  {nombre:<34} {medir(funcion, args.repeticiones):8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
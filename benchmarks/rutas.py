@@ -0,0 +1,206 @@
+"""
+Benchmark de rutas sobre datos sintéticos (ver generar_datos.py).
+
+Recorre con el test client de Flask: index, buscar (página + /api/buscar), luminarias,
+mostrar_historial, gestion_individual, movimiento y las dos exportaciones. Por ruta registra
+percentiles de latencia (p50/p95/p99), sentencias SQL por request y memoria pico (tracemalloc),
+y compara contra una línea base guardada en JSON.
+
+Las cachés de página y del Excel se vacían antes de cada request para medir el costo real;
+--con-cache las deja activas.
+
+Uso:
+    python benchmarks/rutas.py [--escala chica] [--base DATOS.db] [--repeticiones 30]
+                               [--guardar-linea-base] [--linea-base benchmarks/linea_base.json]
+                               [--tolerancia 0.25]
+Sale con código 1 si alguna ruta empeora más que la tolerancia respecto de la línea base.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'linea_base.json')
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    return ordenados[i] if i + 1 >= len(ordenados) else ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (k - i)
+
+
+def escenarios(ids):
+    grupo, equipo = ids['grupo_individual'], ids['equipo_cantidad']
+    alterna = {'n': 0}
+
+    def movimiento():
+        # Alterna salida y retorno de una unidad para que el stock no se agote
+        alterna['n'] += 1
+        tipo = 'prestar' if alterna['n'] % 2 else 'devolver'
+        return 'POST', f'/movimiento/{equipo}/{tipo}', {'cant_lote': 1, 'donde': 'Benchmark'}
+
+    return [
+        ('index', lambda: ('GET', '/inventario', None), 1),
+        ('buscar', lambda: ('GET', '/buscar', None), 1),
+        ('api_buscar', lambda: ('GET', '/api/buscar?q=forza&estado=disponible', None), 1),
+        ('luminarias', lambda: ('GET', '/luminarias', None), 1),
+        ('mostrar_historial', lambda: ('GET', '/historial?tipo=SALIDA', None), 1),
+        ('gestion_individual', lambda: ('GET', f'/equipo/{grupo}/individuales', None), 1),
+        ('movimiento', movimiento, 1),
+        ('exportar_excel', lambda: ('GET', '/exportar', None), 10),
+        ('exportar_movimientos', lambda: ('GET', '/exportar_movimientos?desde=2000-01-01', None), 10),
+    ]
+
+
+def medir(app, cliente, nombre, armar, repeticiones, con_cache):
+    from sqlalchemy import event
+    from inventario.cache import _cache_paginas
+    from inventario.extensiones import db
+
+    # Se cuentan en el engine y no con g.sql_sentencias: las respuestas en streaming
+    # ejecutan sus consultas después de terminado el request
+    sentencias = {'n': 0}
+
+    def contar(*_):
+        sentencias['n'] += 1
+
+    def pedir():
+        if not con_cache:
+            _cache_paginas.clear()
+            shutil.rmtree(app.config['CACHE_FOLDER'], ignore_errors=True)
+        metodo, url, datos = armar()
+        sentencias['n'] = 0
+        t = time.perf_counter()
+        r = cliente.open(url, method=metodo, data=datos)
+        r.get_data()  # las respuestas en streaming se generan al leerlas
+        transcurrido = (time.perf_counter() - t) * 1000
+        r.close()
+        if r.status_code >= 400:
+            raise RuntimeError(f"{nombre}: {metodo} {url} respondió {r.status_code}")
+        return transcurrido, sentencias['n']
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', contar)
+    try:
+        tiempos, conteos = zip(*(pedir() for _ in range(repeticiones)))
+        # La memoria se mide en una pasada aparte: tracemalloc hace todo mucho más lento
+        tracemalloc.start()
+        pedir()
+        pico = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+    finally:
+        event.remove(engine, 'before_cursor_execute', contar)
+
+    return {
+        'p50_ms': round(percentil(tiempos, 50), 2),
+        'p95_ms': round(percentil(tiempos, 95), 2),
+        'p99_ms': round(percentil(tiempos, 99), 2),
+        'sql': max(conteos),
+        'memoria_mb': round(pico, 2),
+    }
+
+
+def comparar(resultados, linea_base, tolerancia):
+    """Imprime la tabla con la variación contra la línea base; devuelve las rutas que empeoraron"""
+    empeoradas = []
+    print(f"{'ruta':<22} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL':>5} {'mem MB':>8}   vs línea base (p50 / SQL / mem)")
+    for nombre, r in resultados.items():
+        linea = f"{nombre:<22} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['sql']:>5} {r['memoria_mb']:>8.2f}"
+        base = linea_base.get(nombre)
+        if base:
+            # p50: con pocas repeticiones el p95 depende de pausas del GC
+            dp50 = r['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0
+            dmem = r['memoria_mb'] / base['memoria_mb'] - 1 if base['memoria_mb'] else 0
+            linea += f"   {dp50:+6.0%} / {r['sql'] - base['sql']:+d} / {dmem:+6.0%}"
+            if dp50 > tolerancia or r['sql'] > base['sql'] or dmem > tolerancia:
+                empeoradas.append(nombre)
+                linea += '  ⚠️'
+        print(linea)
+    return empeoradas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--escala', default='chica', help="Escala de generar_datos.ESCALAS")
+    parser.add_argument('--base', help="Usar una base ya generada (se copia; no se modifica)")
+    parser.add_argument('--repeticiones', type=int, default=30)
+    parser.add_argument('--con-cache', action='store_true')
+    parser.add_argument('--linea-base', default=LINEA_BASE)
+    parser.add_argument('--guardar-linea-base', action='store_true')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="Empeoramiento relativo permitido (p50 y memoria)")
+    args = parser.parse_args()
+
+    import generar_datos
+
+    carpeta = tempfile.mkdtemp()
+    destino = os.path.join(carpeta, 'benchmark.db')
+    os.environ['DATABASE_PATH'] = destino
+    os.environ['UPLOAD_FOLDER'] = os.path.join(carpeta, 'manuales')
+    os.environ['BACKUP_FOLDER'] = os.path.join(carpeta, 'backups')
+    os.environ['CACHE_FOLDER'] = os.path.join(carpeta, 'cache')
+    # Los respaldos en segundo plano meterían ruido en las mediciones
+    os.environ['BACKUP_CADA_N_ESCRITURAS'] = str(10 ** 9)
+
+    t = time.perf_counter()
+    if args.base:
+        shutil.copy(args.base, destino)
+        from app import app
+        from inventario.cli import inicializar_base
+        from inventario.extensiones import db
+        from inventario.modelos import Equipo, EquipoIndividual
+        with app.app_context():
+            inicializar_base()
+            ids = {
+                'grupo_individual': db.session.execute(
+                    db.select(EquipoIndividual.equipo_grupo_id)
+                    .group_by(EquipoIndividual.equipo_grupo_id)
+                    .order_by(db.func.count().desc()).limit(1)).scalar(),
+                'equipo_cantidad': db.session.execute(
+                    db.select(Equipo.id).where(Equipo.cantidad_total > 1, ~Equipo.gestion_individual).limit(1)).scalar(),
+            }
+        volumen = args.base
+    else:
+        volumen = generar_datos.ESCALAS[args.escala]
+        ids = generar_datos.generar(**volumen)
+        from app import app
+    print(f"Datos: {volumen} (preparados en {time.perf_counter() - t:.1f} s)\n")
+
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': 'MLProducciones', 'password': 'admin123'})
+
+    resultados = {}
+    for nombre, armar, divisor in escenarios(ids):
+        metodo, url, datos = armar()  # calentar (compilación de plantillas, caché de sentencias)
+        cliente.open(url, method=metodo, data=datos).close()
+        resultados[nombre] = medir(app, cliente, nombre, armar,
+                                   max(3, args.repeticiones // divisor), args.con_cache)
+
+    linea_base = {}
+    if os.path.exists(args.linea_base) and not args.guardar_linea_base:
+        with open(args.linea_base) as f:
+            linea_base = json.load(f).get('rutas', {})
+    empeoradas = comparar(resultados, linea_base, args.tolerancia)
+
+    if args.guardar_linea_base:
+        with open(args.linea_base, 'w') as f:
+            json.dump({'datos': volumen, 'rutas': resultados}, f, indent=2, ensure_ascii=False)
+        print(f"\nLínea base guardada en {args.linea_base}")
+    elif empeoradas:
+        print(f"\nEmpeoraron respecto de la línea base: {', '.join(empeoradas)}")
+        sys.exit(1)
+
+    shutil.rmtree(carpeta, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Tiempo de arranque de un worker: cuánto tarda `import app` en un intérprete nuevo (lo que paga
+cada worker de gunicorn y cada script que hace `from app import ...`) y el primer request.
+
+Cada medición corre en un subproceso limpio sobre una copia de inventario.db ya inicializada.
+
+Uso:
+    python benchmarks/tiempo_arranque.py [--repeticiones 10] [--detalle]
+--detalle muestra los módulos que más tardan en importarse (python -X importtime).
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDIR = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+cliente = app.app.test_client()
+cliente.get('/')
+t2 = time.perf_counter()
+print(f"{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f}")
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--detalle', action='store_true')
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp()
+    shutil.copy(os.path.join(RAIZ, 'inventario.db'), os.path.join(carpeta, 'inventario.db'))
+    entorno = dict(os.environ, DATABASE_PATH=os.path.join(carpeta, 'inventario.db'),
+                   UPLOAD_FOLDER=os.path.join(carpeta, 'manuales'), BACKUP_FOLDER=os.path.join(carpeta, 'backups'),
+                   CACHE_FOLDER=os.path.join(carpeta, 'cache'), FLASK_APP='app')
+
+    # Dejar la base con el esquema completo para medir el arranque normal, no el de una base nueva
+    subprocess.run([sys.executable, '-m', 'flask', 'inicializar'], cwd=RAIZ, env=entorno, check=True,
+                   capture_output=True)
+
+    importacion, primer_request = [], []
+    for _ in range(args.repeticiones):
+        salida = subprocess.run([sys.executable, '-c', MEDIR], cwd=RAIZ, env=entorno,
+                                capture_output=True, text=True, check=True).stdout.split()
+        importacion.append(float(salida[-2]))
+        primer_request.append(float(salida[-1]))
+
+    print(f"import app:      mediana {statistics.median(importacion):7.1f} ms  (mín {min(importacion):.1f})")
+    print(f"primer request:  mediana {statistics.median(primer_request):7.1f} ms  (mín {min(primer_request):.1f})")
+
+    if args.detalle:
+        salida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=RAIZ, env=entorno,
+                                capture_output=True, text=True).stderr.splitlines()
+        filas = []
+        for linea in salida:
+            partes = linea.split('|')
+            if len(partes) == 3 and partes[1].strip().isdigit():
+                filas.append((int(partes[1]), partes[2].rstrip()))
+        print("\nMódulos con mayor tiempo acumulado de importación:")
+        for acumulado, modulo in sorted(filas, reverse=True)[:15]:
+            print(f"  {acumulado / 1000:8.1f} ms {modulo}")
+
+    shutil.rmtree(carpeta, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,9 @@
-from app import app, db, Equipo, Documento
-import os
+from inventario import create_app
+from inventario.extensiones import db
+from inventario.modelos import Equipo, Documento, Archivo
 
 def clean_data():
+    app = create_app()
     with app.app_context():
         # Limpiar referencias en Equipo
         equipos = Equipo.query.all()
@@ -10,6 +12,8 @@ def clean_data():
         
         # Eliminar todos los registros de documentos adicionales
         Documento.query.delete()
+        # Sin referencias, el conteo del almacén de documentos queda en cero
+        Archivo.query.delete()
         
         db.session.commit()
         print("Base de datos actualizada: referencias a manuales y documentos eliminadas.")
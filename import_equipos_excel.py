@@ -2,252 +2,189 @@
 Script para importar equipos individuales desde el Excel de numeración
 Excluye: Bowen Projection
 Alien 150c: Solo equipos indexados (con ID asignado)
+
+Cada hoja se describe en HOJAS (qué equipo es y qué columnas usar); un solo importador
+normaliza las columnas con pandas, descarta las series ya cargadas (un set por grupo)
+e inserta todo lo nuevo con un único INSERT masivo por hoja.
+
+Uso:
+    python import_equipos_excel.py            # importar
+    python import_equipos_excel.py --dry-run  # solo mostrar qué se importaría
 """
-from app import app, db, Equipo, EquipoIndividual
-import pandas as pd
+import argparse
+import time
 from datetime import datetime
 
-# Mapeo de hojas del Excel a nombres de equipos en la DB
-MAPEO_EQUIPOS = {
-    'Eastman ParLed': 'ParLed Ignite 18 Slim',
-    'Eastman ParLedWP': 'ParLed Ignite 18 Slim WP',
-    'Forza 500B II': 'Forza 500B II Bi-Color LED',
-    'Forza720': 'Forza 720B Bi-Color LED',
-    'Forza 60B': 'Forza 60B II Bi-Color LED',
-    'Alien 300': 'Alien 300C RGB LED',
-    'Alien 150c': 'Alien 150C RGB LED'
+import pandas as pd
+
+from inventario import create_app
+from inventario.extensiones import db
+from inventario.modelos import Equipo, EquipoIndividual
+
+EXCEL_PATH = 'static/Numeracion de Equipos Nuevos.xlsx'
+
+# Hojas excluidas a pedido del usuario
+HOJAS_EXCLUIDAS = {'Bowen Projection'}
+
+# Mapeo declarativo: hoja del Excel -> equipo en la DB y columnas a leer
+#   fixture / serie: columnas con el número físico y el número de serie
+#   serie_numerica: la serie viene como número (se normaliza a entero sin decimales)
+#   observaciones: columna opcional con observaciones por equipo
+#   solo_indexados: importar solo las filas que tienen número de fixture
+HOJAS = {
+    'Eastman ParLed': {'equipo': 'ParLed Ignite 18 Slim', 'fixture': 'Fixture N°', 'serie': 'Serial ID'},
+    'Eastman ParLedWP': {'equipo': 'ParLed Ignite 18 Slim WP', 'fixture': 'Fixture N°', 'serie': 'Serial ID'},
+    'Forza 500B II': {'equipo': 'Forza 500B II Bi-Color LED', 'fixture': 'ID', 'serie': 'Código de Serie'},
+    'Forza720': {'equipo': 'Forza 720B Bi-Color LED', 'fixture': '# Forza', 'serie': 'Número de Serie'},
+    'Forza 60B': {'equipo': 'Forza 60B II Bi-Color LED', 'fixture': 'Ítem',
+                  'serie': 'Número de Identificación / Serie', 'serie_numerica': False},
+    'Alien 300': {'equipo': 'Alien 300C RGB LED', 'fixture': 'ID de Equipo', 'serie': 'Número de Serie'},
+    'Alien 150c': {'equipo': 'Alien 150C RGB LED', 'fixture': 'ID', 'serie': 'Número de Serie Completo',
+                   'observaciones': 'Observación Técnica', 'solo_indexados': True},
 }
 
-def importar_equipos():
+
+def normalizar_hoja(df, mapeo):
+    """Devuelve un DataFrame con numero_fixture, numero_serie y observaciones_individuales"""
+    if mapeo.get('solo_indexados'):
+        df = df[df[mapeo['fixture']].notna()]
+
+    serie = df[mapeo['serie']]
+    if mapeo.get('serie_numerica', True):
+        serie = pd.to_numeric(serie, errors='coerce').astype('Int64').astype('string')
+    else:
+        serie = serie.astype('string').str.strip()
+
+    obs_col = mapeo.get('observaciones')
+    observaciones = df[obs_col].fillna('').astype(str) if obs_col and obs_col in df else ''
+
+    filas = pd.DataFrame({
+        'numero_fixture': pd.to_numeric(df[mapeo['fixture']], errors='coerce').astype('Int64'),
+        'numero_serie': serie,
+        'observaciones_individuales': observaciones,
+    })
+    return filas[filas['numero_serie'].notna() & (filas['numero_serie'] != '')]
+
+
+def importar_hoja(df, mapeo, equipo_grupo, existentes, fecha, dry_run=False):
+    """Importa una hoja; devuelve el resumen de la diferencia con la DB"""
+    filas = normalizar_hoja(df, mapeo)
+    repetidas = filas['numero_serie'].duplicated()
+    filas = filas[~repetidas]
+    ya_cargadas = filas['numero_serie'].isin(existentes)
+    nuevas = filas[~ya_cargadas]
+
+    if not dry_run and len(nuevas):
+        registros = [
+            {
+                'equipo_grupo_id': equipo_grupo.id,
+                'numero_serie': r['numero_serie'],
+                'numero_fixture': None if pd.isna(r['numero_fixture']) else int(r['numero_fixture']),
+                'observaciones_individuales': r['observaciones_individuales'],
+                'fecha_ingreso': fecha,
+                'en_uso': False,
+                'danado': False,
+            }
+            for r in nuevas.to_dict('records')
+        ]
+        db.session.execute(db.insert(EquipoIndividual), registros)
+
+    return {
+        'nuevas': nuevas,
+        'ya_cargadas': int(ya_cargadas.sum()),
+        'repetidas_en_hoja': int(repetidas.sum()),
+    }
+
+
+def importar_equipos(excel_path=EXCEL_PATH, dry_run=False):
     """Importa todos los equipos desde el Excel"""
-    excel_path = 'static/Numeracion de Equipos Nuevos.xlsx'
+    inicio_total = time.perf_counter()
     xls = pd.ExcelFile(excel_path)
-    
+    fecha = datetime.now().strftime("%Y-%m-%d")
+
     total_importados = 0
     errores = []
-    
-    with app.app_context():
+
+    with create_app().app_context():
+        # Una sola consulta para los grupos y otra para las series ya existentes de todos ellos
+        grupos = {e.nombre: e for e in Equipo.query.filter(
+            Equipo.nombre.in_([m['equipo'] for m in HOJAS.values()])).all()}
+        existentes = {}
+        for grupo_id, serie in db.session.execute(
+                db.select(EquipoIndividual.equipo_grupo_id, EquipoIndividual.numero_serie)
+                .where(EquipoIndividual.equipo_grupo_id.in_([e.id for e in grupos.values()]))):
+            existentes.setdefault(grupo_id, set()).add(serie)
+
         for sheet_name in xls.sheet_names:
-            # Excluir Bowen Projection
-            if sheet_name == 'Bowen Projection':
+            if sheet_name in HOJAS_EXCLUIDAS:
                 print(f"⏭️  Saltando {sheet_name} (excluido por usuario)")
                 continue
-                
-            if sheet_name not in MAPEO_EQUIPOS:
+
+            if sheet_name not in HOJAS:
                 print(f"⚠️  Hoja '{sheet_name}' no mapeada, saltando...")
                 continue
-            
-            equipo_nombre = MAPEO_EQUIPOS[sheet_name]
-            print(f"\n📦 Procesando: {sheet_name} → {equipo_nombre}")
-            
-            # Buscar el grupo en la base de datos
-            equipo_grupo = Equipo.query.filter_by(nombre=equipo_nombre).first()
-            
+
+            mapeo = HOJAS[sheet_name]
+            print(f"\n📦 Procesando: {sheet_name} → {mapeo['equipo']}")
+
+            equipo_grupo = grupos.get(mapeo['equipo'])
             if not equipo_grupo:
-                error_msg = f"❌ Equipo '{equipo_nombre}' no encontrado en la base de datos"
+                error_msg = f"❌ Equipo '{mapeo['equipo']}' no encontrado en la base de datos"
                 print(error_msg)
                 errores.append(error_msg)
                 continue
-            
-            # Marcar para gestión individual
-            equipo_grupo.gestion_individual = True
-            
-            # Leer la hoja
-            df = pd.read_excel(xls, sheet_name)
-            
-            # Procesar según la estructura de cada hoja
+
+            inicio = time.perf_counter()
             try:
-                if sheet_name in ['Eastman ParLed', 'Eastman ParLedWP']:
-                    importados = importar_eastman(df, equipo_grupo, sheet_name)
-                elif sheet_name == 'Forza 500B II':
-                    importados = importar_forza_500(df, equipo_grupo)
-                elif sheet_name == 'Forza720':
-                    importados = importar_forza_720(df, equipo_grupo)
-                elif sheet_name == 'Forza 60B':
-                    importados = importar_forza_60(df, equipo_grupo)
-                elif sheet_name == 'Alien 300':
-                    importados = importar_alien_300(df, equipo_grupo)
-                elif sheet_name == 'Alien 150c':
-                    importados = importar_alien_150(df, equipo_grupo)
-                else:
-                    importados = 0
-                
-                total_importados += importados
-                print(f"   ✅ {importados} equipos importados")
-                
+                df = pd.read_excel(xls, sheet_name)
+                resumen = importar_hoja(df, mapeo, equipo_grupo, existentes.get(equipo_grupo.id, set()),
+                                        fecha, dry_run=dry_run)
             except Exception as e:
                 error_msg = f"❌ Error procesando {sheet_name}: {str(e)}"
                 print(error_msg)
                 errores.append(error_msg)
-        
-        # Commit de todos los cambios
-        db.session.commit()
-        
+                continue
+
+            if not dry_run:
+                # Marcar para gestión individual
+                equipo_grupo.gestion_individual = True
+
+            nuevas = resumen['nuevas']
+            total_importados += len(nuevas)
+            accion = "se importarían" if dry_run else "importados"
+            print(f"   ✅ {len(nuevas)} equipos {accion} | {resumen['ya_cargadas']} ya existían"
+                  f" | {resumen['repetidas_en_hoja']} repetidos en la hoja"
+                  f" | {(time.perf_counter() - inicio) * 1000:.0f} ms")
+            if dry_run:
+                for r in nuevas.head(10).to_dict('records'):
+                    print(f"      + #{r['numero_fixture']}  SN {r['numero_serie']}")
+                if len(nuevas) > 10:
+                    print(f"      ... y {len(nuevas) - 10} más")
+
+        if dry_run:
+            db.session.rollback()
+        else:
+            # Commit de todos los cambios
+            db.session.commit()
+
         print(f"\n{'='*60}")
-        print(f"✨ IMPORTACIÓN COMPLETADA")
+        print(f"✨ {'SIMULACIÓN' if dry_run else 'IMPORTACIÓN'} COMPLETADA"
+              f" en {time.perf_counter() - inicio_total:.2f} s")
         print(f"{'='*60}")
-        print(f"Total equipos importados: {total_importados}")
-        
+        print(f"Total equipos {'a importar' if dry_run else 'importados'}: {total_importados}")
+
         if errores:
             print(f"\n⚠️  Errores encontrados ({len(errores)}):")
             for error in errores:
                 print(f"   {error}")
 
-def importar_eastman(df, equipo_grupo, tipo):
-    """Importa equipos Eastman ParLed y ParLedWP"""
-    count = 0
-    for _, row in df.iterrows():
-        fixture_num = int(row['Fixture N°'])
-        serial_id = str(int(row['Serial ID']))
-        
-        # Verificar si ya existe
-        existe = EquipoIndividual.query.filter_by(
-            equipo_grupo_id=equipo_grupo.id,
-            numero_serie=serial_id
-        ).first()
-        
-        if not existe:
-            nuevo = EquipoIndividual(
-                equipo_grupo_id=equipo_grupo.id,
-                numero_serie=serial_id,
-                numero_fixture=fixture_num,
-                fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
-            )
-            db.session.add(nuevo)
-            count += 1
-    
-    return count
-
-def importar_forza_500(df, equipo_grupo):
-    """Importa equipos Forza 500B II"""
-    count = 0
-    for _, row in df.iterrows():
-        fixture_id = int(row['ID'])
-        serial = str(int(row['Código de Serie']))
-        
-        existe = EquipoIndividual.query.filter_by(
-            equipo_grupo_id=equipo_grupo.id,
-            numero_serie=serial
-        ).first()
-        
-        if not existe:
-            nuevo = EquipoIndividual(
-                equipo_grupo_id=equipo_grupo.id,
-                numero_serie=serial,
-                numero_fixture=fixture_id,
-                fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
-            )
-            db.session.add(nuevo)
-            count += 1
-    
-    return count
-
-def importar_forza_720(df, equipo_grupo):
-    """Importa equipos Forza 720"""
-    count = 0
-    for _, row in df.iterrows():
-        fixture_num = int(row['# Forza'])
-        serial = str(int(row['Número de Serie']))
-        
-        existe = EquipoIndividual.query.filter_by(
-            equipo_grupo_id=equipo_grupo.id,
-            numero_serie=serial
-        ).first()
-        
-        if not existe:
-            nuevo = EquipoIndividual(
-                equipo_grupo_id=equipo_grupo.id,
-                numero_serie=serial,
-                numero_fixture=fixture_num,
-                fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
-            )
-            db.session.add(nuevo)
-            count += 1
-    
-    return count
-
-def importar_forza_60(df, equipo_grupo):
-    """Importa equipos Forza 60B"""
-    count = 0
-    for _, row in df.iterrows():
-        fixture_num = int(row['Ítem'])
-        serial = str(row['Número de Identificación / Serie'])
-        
-        existe = EquipoIndividual.query.filter_by(
-            equipo_grupo_id=equipo_grupo.id,
-            numero_serie=serial
-        ).first()
-        
-        if not existe:
-            nuevo = EquipoIndividual(
-                equipo_grupo_id=equipo_grupo.id,
-                numero_serie=serial,
-                numero_fixture=fixture_num,
-                fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
-            )
-            db.session.add(nuevo)
-            count += 1
-    
-    return count
-
-def importar_alien_300(df, equipo_grupo):
-    """Importa equipos Alien 300"""
-    count = 0
-    for _, row in df.iterrows():
-        fixture_id = int(row['ID de Equipo'])
-        serial = str(int(row['Número de Serie']))
-        
-        existe = EquipoIndividual.query.filter_by(
-            equipo_grupo_id=equipo_grupo.id,
-            numero_serie=serial
-        ).first()
-        
-        if not existe:
-            nuevo = EquipoIndividual(
-                equipo_grupo_id=equipo_grupo.id,
-                numero_serie=serial,
-                numero_fixture=fixture_id,
-                fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
-            )
-            db.session.add(nuevo)
-            count += 1
-    
-    return count
-
-def importar_alien_150(df, equipo_grupo):
-    """Importa equipos Alien 150c - SOLO LOS INDEXADOS"""
-    count = 0
-    # Filtrar solo los que tienen ID asignado
-    df_indexados = df[df['ID'].notna()]
-    
-    for _, row in df_indexados.iterrows():
-        fixture_id = int(row['ID'])
-        serial = str(int(row['Número de Serie Completo']))
-        
-        # Observaciones si existen
-        obs = ""
-        if pd.notna(row.get('Observación Técnica')):
-            obs = str(row['Observación Técnica'])
-        
-        existe = EquipoIndividual.query.filter_by(
-            equipo_grupo_id=equipo_grupo.id,
-            numero_serie=serial
-        ).first()
-        
-        if not existe:
-            nuevo = EquipoIndividual(
-                equipo_grupo_id=equipo_grupo.id,
-                numero_serie=serial,
-                numero_fixture=fixture_id,
-                observaciones_individuales=obs,
-                fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
-            )
-            db.session.add(nuevo)
-            count += 1
-    
-    return count
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Importa equipos individuales desde el Excel de numeración")
+    parser.add_argument('--dry-run', action='store_true', help="Mostrar qué se importaría sin escribir en la base")
+    parser.add_argument('--archivo', default=EXCEL_PATH, help="Ruta del Excel")
+    args = parser.parse_args()
+
     print("🚀 Iniciando importación de equipos individuales...")
     print("="*60)
-    importar_equipos()
+    importar_equipos(args.archivo, dry_run=args.dry_run)
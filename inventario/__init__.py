@@ -0,0 +1,52 @@
+"""
+Inventario Media Lighting.
+
+create_app() arma la aplicación sin efectos secundarios: no crea carpetas ni toca el esquema.
+La base se prepara con `flask --app app inicializar` (ver cli.py) en cada despliegue.
+"""
+from functools import partial
+
+from flask import Flask
+
+from . import (api, auth, busqueda, equipos, exportar, historico, individuales, metricas, movimientos, repuestos,
+               reservas, utilizacion)
+from .cache import vaciar_cache_paginas
+from .base_datos import configurar_motor
+from .cli import conciliacion_cli, inicializar, instantaneas, respaldo, utilizacion_cli
+from .conciliacion import registrar_conciliacion
+from .config import RAIZ, configurar
+from .extensiones import db, registrar_migraciones, registrar_respaldos
+from .grafo import vaciar_grafo
+from .ubicaciones import vaciar_cache_ubicaciones
+
+BLUEPRINTS = (auth, equipos, movimientos, reservas, exportar, busqueda, individuales, repuestos, utilizacion, historico,
+              api, metricas)
+
+
+def create_app(configuracion=None):
+    app = Flask(__name__, root_path=RAIZ)
+    configurar(app)
+    if configuracion:
+        app.config.update(configuracion)
+
+    db.init_app(app)
+    registrar_migraciones(app)
+    registrar_respaldos(app)
+    # Todo lo cacheado por versión de datos (en disco y en este proceso) deja de valer al restaurar; los
+    # demás workers guardan sus propias copias en memoria, por eso se reinicia la app después
+    app.extensions['respaldos'].al_restaurar.extend([
+        partial(exportar.borrar_cache_excel, app.config['CACHE_FOLDER']),
+        vaciar_cache_paginas, vaciar_cache_ubicaciones, vaciar_grafo])
+    registrar_conciliacion(app)
+    with app.app_context():
+        configurar_motor(db.engine, app.config['SQLITE_PRAGMAS'])
+        metricas.instrumentar(app, db.engine)
+
+    for modulo in BLUEPRINTS:
+        app.register_blueprint(modulo.bp)
+    app.cli.add_command(inicializar)
+    app.cli.add_command(respaldo)
+    app.cli.add_command(utilizacion_cli)
+    app.cli.add_command(instantaneas)
+    app.cli.add_command(conciliacion_cli)
+    return app
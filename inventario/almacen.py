@@ -0,0 +1,64 @@
+"""
+Almacén de documentos direccionado por contenido.
+
+Cada archivo se guarda una sola vez en la carpeta de uploads con el nombre `{sha256}.{ext}`:
+el hash se calcula mientras el upload se escribe a un temporal, sin cargarlo entero en memoria,
+y si ya existe un archivo con ese nombre el temporal se descarta. El mismo contenido con otra
+extensión es otro archivo: la extensión decide el tipo con que se descarga. El conteo de
+referencias (qué documentos/manuales usan cada archivo) lo lleva la base de datos.
+"""
+import hashlib
+import os
+import tempfile
+
+BLOQUE = 64 * 1024
+
+
+def nombre_blob(sha256, extension):
+    return f"{sha256}.{extension.lower()}" if extension else sha256
+
+
+def sha256_de_nombre(filename):
+    """El SHA-256 si el nombre tiene la forma {sha256}.{ext} del almacén; si no, None"""
+    base = (filename or '').split('.', 1)[0]
+    if len(base) == 64 and all(c in '0123456789abcdef' for c in base):
+        return base
+    return None
+
+
+def digest_archivo(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def guardar_stream(stream, carpeta, extension):
+    """Escribe el stream en la carpeta calculando su SHA-256; devuelve (sha256, filename, tamaño, nuevo),
+    con nuevo=False si ya había un archivo con ese nombre"""
+    os.makedirs(carpeta, exist_ok=True)
+    h = hashlib.sha256()
+    tamano = 0
+    fd, tmp = tempfile.mkstemp(dir=carpeta, prefix='.subida_')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            for bloque in iter(lambda: stream.read(BLOQUE), b''):
+                h.update(bloque)
+                destino.write(bloque)
+                tamano += len(bloque)
+        sha256 = h.hexdigest()
+        filename = nombre_blob(sha256, extension)
+        final = os.path.join(carpeta, filename)
+        # link falla si el nombre ya existe: entre dos subidas simultáneas solo una lo crea
+        try:
+            os.link(tmp, final)
+            nuevo = True
+        except FileExistsError:
+            nuevo = False
+        os.remove(tmp)
+        return sha256, filename, tamano, nuevo
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
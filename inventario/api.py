@@ -0,0 +1,208 @@
+"""API JSON versionada para la PWA"""
+import zlib
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request, Response
+
+from .auth import login_required
+from .cache import version_datos
+from .extensiones import db
+from .grafo import TABLAS_GRAFO, bloqueos, repuestos_para
+from .historico import detalle_estado, estado_en, parse_momento
+from .modelos import Equipo, EquipoIndividual, Historial, Repuesto, equipo_repuesto, subconsulta_disponibilidad
+from .movimientos import leer_lineas_lote
+from .reservas import conflictos, disponibilidad, parse_intervalo
+
+bp = Blueprint('api', __name__)
+
+
+# Para la PWA: columnas mínimas por recurso y ETag derivado de contador_cambios. Si el teléfono manda
+# If-None-Match con la versión vigente se responde 304 sin consultar los datos ni armar el JSON.
+API_MOVIMIENTOS_POR_PAGINA = 100
+
+
+def respuesta_versionada(tablas, generar):
+    """Responde 304 si el cliente ya tiene la versión actual de `tablas`; si no, JSON de generar() con su ETag"""
+    etag = f"{request.endpoint}-{version_datos(*tablas)}-{zlib.crc32(request.full_path.encode()):08x}"
+    if etag in request.if_none_match:
+        respuesta = Response(status=304)
+    else:
+        respuesta = jsonify(generar())
+    respuesta.set_etag(etag)
+    # El teléfono guarda la respuesta pero revalida siempre (barato: 304 sin cuerpo)
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+@bp.route('/api/v1/equipos')
+@login_required
+def api_equipos():
+    categoria = request.args.get('categoria')
+
+    def generar():
+        disp = subconsulta_disponibilidad()
+        consulta = (
+            db.select(Equipo.id, Equipo.nombre, Equipo.marca, Equipo.categoria,
+                      db.func.coalesce(Equipo.gestion_individual, False).label('gestion_individual'),
+                      db.func.coalesce(disp.c.total, Equipo.cantidad_total, 0).label('total'),
+                      db.func.coalesce(disp.c.en_uso, Equipo.cantidad_en_uso, 0).label('en_uso'),
+                      db.func.coalesce(disp.c.disponibles,
+                                       db.func.coalesce(Equipo.cantidad_total, 0) - db.func.coalesce(Equipo.cantidad_en_uso, 0)).label('disponibles'),
+                      db.func.coalesce(disp.c.danados, 0).label('danados'))
+            .outerjoin(disp, disp.c.equipo_id == Equipo.id)
+            .order_by(Equipo.nombre, Equipo.id)
+        )
+        if categoria:
+            consulta = consulta.where(Equipo.categoria == categoria)
+        return {'equipos': [dict(f, gestion_individual=bool(f['gestion_individual']))
+                            for f in db.session.execute(consulta).mappings()]}
+
+    return respuesta_versionada(['equipo', 'equipo_individual'], generar)
+
+
+@bp.route('/api/v1/individuales')
+@login_required
+def api_individuales():
+    equipo_id = request.args.get('equipo_id', type=int)
+
+    def generar():
+        consulta = (
+            db.select(EquipoIndividual.id, EquipoIndividual.equipo_grupo_id.label('equipo_id'),
+                      EquipoIndividual.numero_fixture, EquipoIndividual.numero_serie,
+                      db.func.coalesce(EquipoIndividual.en_uso, False).label('en_uso'),
+                      db.func.coalesce(EquipoIndividual.danado, False).label('danado'),
+                      EquipoIndividual.ubicacion_actual)
+            .order_by(EquipoIndividual.equipo_grupo_id, EquipoIndividual.numero_fixture, EquipoIndividual.id)
+        )
+        if equipo_id:
+            consulta = consulta.where(EquipoIndividual.equipo_grupo_id == equipo_id)
+        return {'individuales': [dict(f, en_uso=bool(f['en_uso']), danado=bool(f['danado']))
+                                 for f in db.session.execute(consulta).mappings()]}
+
+    return respuesta_versionada(['equipo_individual'], generar)
+
+
+@bp.route('/api/v1/repuestos')
+@login_required
+def api_repuestos():
+    def generar():
+        equipos = db.func.group_concat(equipo_repuesto.c.equipo_id).label('equipos')
+        filas = db.session.execute(
+            db.select(Repuesto.id, Repuesto.nombre, Repuesto.marca, Repuesto.categoria,
+                      db.func.coalesce(Repuesto.cantidad, 0).label('cantidad'), equipos)
+            .outerjoin(equipo_repuesto, equipo_repuesto.c.repuesto_id == Repuesto.id)
+            .group_by(Repuesto.id)
+            .order_by(Repuesto.nombre, Repuesto.id)
+        ).mappings()
+        return {'repuestos': [dict(f, equipos=[int(i) for i in f['equipos'].split(',')] if f['equipos'] else [])
+                              for f in filas]}
+
+    return respuesta_versionada(['repuesto', 'equipo_repuesto'], generar)
+
+
+@bp.route('/api/v1/equipos/<int:id>/repuestos')
+@login_required
+def api_repuestos_equipo(id):
+    """Repuestos que sirven para el equipo, también los de sus modelos compatibles (ver grafo.py)"""
+    resultado = repuestos_para(id)
+    if resultado is None:
+        return jsonify({'error': f'el equipo #{id} no existe'}), 404
+    return respuesta_versionada(TABLAS_GRAFO, lambda: resultado)
+
+
+@bp.route('/api/v1/repuestos/bloqueos')
+@login_required
+def api_bloqueos():
+    """Equipos que dependen de un repuesto con stock cero; `repuesto_id` limita a uno"""
+    repuesto_id = request.args.get('repuesto_id', type=int)
+    return respuesta_versionada(TABLAS_GRAFO, lambda: bloqueos(repuesto_id))
+
+
+@bp.route('/api/v1/movimientos')
+@login_required
+def api_movimientos():
+    """Movimientos por id descendente. `desde_id` trae solo los nuevos; `antes_id` pagina hacia atrás."""
+    equipo_id = request.args.get('equipo_id', type=int)
+    desde_id = request.args.get('desde_id', type=int)
+    antes_id = request.args.get('antes_id', type=int)
+    limite = min(max(request.args.get('limite', API_MOVIMIENTOS_POR_PAGINA, type=int), 1), 500)
+
+    def generar():
+        consulta = db.select(Historial.id, Historial.fecha, Historial.tipo, Historial.usuario, Historial.cantidad,
+                             Historial.estado_al_retorno, Historial.equipo_id, Historial.equipo_individual_id)
+        if equipo_id:
+            consulta = consulta.where(Historial.equipo_id == equipo_id)
+        if desde_id:
+            consulta = consulta.where(Historial.id > desde_id)
+        if antes_id:
+            consulta = consulta.where(Historial.id < antes_id)
+        filas = db.session.execute(consulta.order_by(Historial.id.desc()).limit(limite + 1)).mappings().all()
+        movimientos = [dict(f, fecha=f['fecha'].isoformat() if f['fecha'] else None) for f in filas[:limite]]
+        return {'movimientos': movimientos,
+                'siguiente_antes_id': movimientos[-1]['id'] if len(filas) > limite else None}
+
+    return respuesta_versionada(['historial'], generar)
+
+
+@bp.route('/api/v1/estado')
+@login_required
+def api_estado():
+    """Unidades fuera de bodega a una `fecha` (ISO; por defecto ahora), por destino.
+    Filtros opcionales: equipo_id, equipo_individual_id y ubicacion (destino exacto)."""
+    momento = parse_momento(request.args.get('fecha'))
+    if momento is None:
+        if request.args.get('fecha'):
+            return jsonify({'error': 'fecha inválida, usar AAAA-MM-DD o AAAA-MM-DDTHH:MM'}), 400
+        momento = datetime.now()
+    equipo_id = request.args.get('equipo_id', type=int)
+    ind_id = request.args.get('equipo_individual_id', type=int)
+    ubicacion = request.args.get('ubicacion')
+
+    def generar():
+        abiertos, desde_instantanea, reproducidos = estado_en(momento)
+        filas = detalle_estado(abiertos, equipo_id=equipo_id, ind_id=ind_id, ubicacion=ubicacion)
+        return {'fecha': momento.isoformat(),
+                'instantanea': desde_instantanea.isoformat() if desde_instantanea else None,
+                'movimientos_reproducidos': reproducidos,
+                'prestamos': [dict(f, equipo_individual_id=f['equipo_individual_id'] or None,
+                                   desde=f['desde'].isoformat()) for f in filas]}
+
+    # Sin fecha es el estado actual, que solo cambia con un movimiento: sirve el mismo ETag por versión
+    return respuesta_versionada(['historial', 'equipo', 'equipo_individual'], generar)
+
+
+def disponibilidad_json(d):
+    return {k: d[k] for k in ('equipo_id', 'nombre', 'total', 'fuera_sin_reserva', 'reservadas', 'disponibles')}
+
+
+@bp.route('/api/v1/disponibilidad')
+@login_required
+def api_disponibilidad():
+    """¿Hay `cantidad` de `equipo_id` libres entre `desde` y `hasta`? (ISO; una fecha sola es el día entero)"""
+    equipo_id = request.args.get('equipo_id', type=int)
+    cantidad = request.args.get('cantidad', 1, type=int)
+    inicio, fin = parse_intervalo(request.args.get('desde'), request.args.get('hasta'))
+    if not equipo_id or inicio is None:
+        return jsonify({'error': 'se necesitan equipo_id, desde y hasta (hasta posterior a desde)'}), 400
+    # Sin ETag: lo que sale con una reserva vuelve cuando esta termina, así que la respuesta cambia con la hora
+    d = disponibilidad([equipo_id], inicio, fin).get(equipo_id)
+    if d is None:
+        return jsonify({'error': f'el equipo #{equipo_id} no existe'}), 404
+    return jsonify(dict(disponibilidad_json(d), desde=inicio.isoformat(), hasta=fin.isoformat(),
+                        cantidad=cantidad, ok=cantidad <= d['disponibles']))
+
+
+@bp.route('/api/v1/disponibilidad/kit', methods=['POST'])
+@login_required
+def api_disponibilidad_kit():
+    """Revisa un kit entero en una llamada: JSON {desde, hasta, lineas: [{equipo_id, cantidad, ind_id}]}"""
+    datos = request.get_json(silent=True) or {}
+    inicio, fin = parse_intervalo(datos.get('desde'), datos.get('hasta'))
+    if inicio is None:
+        return jsonify({'error': 'se necesitan desde y hasta (hasta posterior a desde)'}), 400
+    lineas = leer_lineas_lote()
+    if not lineas:
+        return jsonify({'error': 'el kit no tiene líneas'}), 400
+    errores, disp = conflictos(lineas, inicio, fin)
+    return jsonify({'ok': not errores, 'conflictos': errores, 'desde': inicio.isoformat(), 'hasta': fin.isoformat(),
+                    'equipos': [dict(disponibilidad_json(d), pedidas=d['pedidas']) for d in disp.values()]})
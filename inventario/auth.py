@@ -0,0 +1,53 @@
+"""Inicio y cierre de sesión"""
+from functools import wraps
+
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+from werkzeug.security import check_password_hash
+
+from .extensiones import db
+from .modelos import Usuario
+
+bp = Blueprint('auth', __name__)
+
+
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            flash("Por favor, inicia sesión para acceder.", "warning")
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@bp.route('/')
+def welcome():
+    if 'user_id' in session:
+        return redirect(url_for('equipos.index'))
+    return render_template('welcome.html')
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        user = request.form.get('username')
+        pw = request.form.get('password')
+        # Búsqueda case-insensitive del usuario
+        usuario = Usuario.query.filter(db.func.lower(Usuario.username) == user.lower()).first()
+        
+        if usuario and check_password_hash(usuario.password_hash, pw):
+            session['user_id'] = usuario.id
+            session['username'] = usuario.username
+            flash(f"Bienvenido de nuevo, {usuario.username}!", "success")
+            return redirect(url_for('equipos.index'))
+        else:
+            flash("Usuario o contraseña incorrectos.", "error")
+            
+    return render_template('login.html')
+
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    flash("Has cerrado sesión correctamente.", "info")
+    return redirect(url_for('auth.welcome'))
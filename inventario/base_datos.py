@@ -0,0 +1,19 @@
+"""Ajustes de SQLite aplicados a cada conexión nueva del engine"""
+import sqlite3
+
+from sqlalchemy import event
+
+
+def aplicar_pragmas_sqlite(conexion, pragmas):
+    cursor = conexion.cursor()
+    for nombre, valor in pragmas.items():
+        if valor is not None and valor != '':
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+    cursor.close()
+
+
+def configurar_motor(motor, pragmas):
+    @event.listens_for(motor, 'connect')
+    def configurar_conexion_sqlite(dbapi_conexion, registro):
+        if isinstance(dbapi_conexion, sqlite3.Connection):
+            aplicar_pragmas_sqlite(dbapi_conexion, pragmas)
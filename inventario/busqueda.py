@@ -0,0 +1,227 @@
+"""Búsqueda de texto completo (FTS5) sobre equipos, unidades individuales y repuestos"""
+from flask import Blueprint, jsonify, render_template, request
+
+from .auth import login_required
+from .cache import cache_pagina
+from .config import CATEGORIAS
+from .extensiones import db
+from .modelos import Equipo, EquipoIndividual, Historial, Repuesto
+from .ubicaciones import listar_ubicaciones
+
+bp = Blueprint('busqueda', __name__)
+
+
+# --- ÍNDICE DE BÚSQUEDA (FTS5) ---
+# Tabla virtual con el texto buscable de equipos, unidades individuales y repuestos.
+# Se mantiene sincronizada con triggers de SQLite, así ninguna ruta tiene que acordarse de actualizarla.
+# El texto de una unidad incluye nombre y marca de su grupo: "forza 12" tiene que encontrar el fixture
+# #12 de un Forza, así que renombrar un grupo vuelve a indexar sus unidades.
+TEXTO_EQUIPO = "coalesce({t}nombre, '') || ' ' || coalesce({t}marca, '') || ' ' || coalesce({t}observaciones, '')"
+TEXTO_INDIVIDUAL = ("coalesce((SELECT coalesce(g.nombre, '') || ' ' || coalesce(g.marca, '') FROM equipo g "
+                    "WHERE g.id = {t}equipo_grupo_id), '') || ' ' || coalesce({t}numero_serie, '') || ' ' || "
+                    "coalesce({t}numero_fixture, '') || ' ' || coalesce({t}observaciones_individuales, '')")
+SQL_BUSQUEDA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_fts USING fts5(
+        tipo UNINDEXED, ref_id UNINDEXED, texto, tokenize="unicode61 remove_diacritics 2")""",
+    f"""CREATE TRIGGER IF NOT EXISTS busqueda_equipo_ai AFTER INSERT ON equipo BEGIN
+        INSERT INTO busqueda_fts (tipo, ref_id, texto) VALUES ('equipo', new.id, {TEXTO_EQUIPO.format(t='new.')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS busqueda_equipo_au AFTER UPDATE OF nombre, marca, observaciones ON equipo BEGIN
+        DELETE FROM busqueda_fts WHERE tipo = 'equipo' AND ref_id = old.id;
+        INSERT INTO busqueda_fts (tipo, ref_id, texto) VALUES ('equipo', new.id, {TEXTO_EQUIPO.format(t='new.')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS busqueda_equipo_au_unidades AFTER UPDATE OF nombre, marca ON equipo BEGIN
+        DELETE FROM busqueda_fts WHERE tipo = 'individual'
+            AND ref_id IN (SELECT id FROM equipo_individual WHERE equipo_grupo_id = new.id);
+        INSERT INTO busqueda_fts (tipo, ref_id, texto)
+        SELECT 'individual', i.id, {TEXTO_INDIVIDUAL.format(t='i.')} FROM equipo_individual i WHERE i.equipo_grupo_id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS busqueda_equipo_ad AFTER DELETE ON equipo BEGIN
+        DELETE FROM busqueda_fts WHERE tipo = 'equipo' AND ref_id = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS busqueda_individual_ai AFTER INSERT ON equipo_individual BEGIN
+        INSERT INTO busqueda_fts (tipo, ref_id, texto) VALUES ('individual', new.id, {TEXTO_INDIVIDUAL.format(t='new.')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS busqueda_individual_au
+        AFTER UPDATE OF equipo_grupo_id, numero_serie, numero_fixture, observaciones_individuales ON equipo_individual BEGIN
+        DELETE FROM busqueda_fts WHERE tipo = 'individual' AND ref_id = old.id;
+        INSERT INTO busqueda_fts (tipo, ref_id, texto) VALUES ('individual', new.id, {TEXTO_INDIVIDUAL.format(t='new.')});
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS busqueda_individual_ad AFTER DELETE ON equipo_individual BEGIN
+        DELETE FROM busqueda_fts WHERE tipo = 'individual' AND ref_id = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS busqueda_repuesto_ai AFTER INSERT ON repuesto BEGIN
+        INSERT INTO busqueda_fts (tipo, ref_id, texto) VALUES ('repuesto', new.id, coalesce(new.nombre, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS busqueda_repuesto_au AFTER UPDATE OF nombre ON repuesto BEGIN
+        DELETE FROM busqueda_fts WHERE tipo = 'repuesto' AND ref_id = old.id;
+        INSERT INTO busqueda_fts (tipo, ref_id, texto) VALUES ('repuesto', new.id, coalesce(new.nombre, ''));
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS busqueda_repuesto_ad AFTER DELETE ON repuesto BEGIN
+        DELETE FROM busqueda_fts WHERE tipo = 'repuesto' AND ref_id = old.id;
+    END""",
+]
+# Trigger que solo existe desde que las unidades llevan el texto del grupo: si falta, el índice es del
+# formato anterior y hay que recrear los triggers y reconstruirlo
+TRIGGER_FORMATO_ACTUAL = 'busqueda_equipo_au_unidades'
+
+
+def reconstruir_indice_busqueda():
+    """Vuelve a poblar busqueda_fts desde cero (bases existentes o índice corrupto)"""
+    db.session.execute(db.text("DELETE FROM busqueda_fts"))
+    db.session.execute(db.text(f"""
+        INSERT INTO busqueda_fts (tipo, ref_id, texto) SELECT 'equipo', id, {TEXTO_EQUIPO.format(t='')} FROM equipo"""))
+    db.session.execute(db.text(f"""
+        INSERT INTO busqueda_fts (tipo, ref_id, texto)
+        SELECT 'individual', id, {TEXTO_INDIVIDUAL.format(t='equipo_individual.')} FROM equipo_individual"""))
+    db.session.execute(db.text("""
+        INSERT INTO busqueda_fts (tipo, ref_id, texto)
+        SELECT 'repuesto', id, coalesce(nombre, '') FROM repuesto"""))
+    db.session.commit()
+
+
+def inicializar_busqueda():
+    triggers = db.session.execute(db.text(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'busqueda_%'")).scalars().all()
+    desactualizado = bool(triggers) and TRIGGER_FORMATO_ACTUAL not in triggers
+    if desactualizado:
+        for nombre in triggers:
+            db.session.execute(db.text(f'DROP TRIGGER IF EXISTS "{nombre}"'))
+    for sql in SQL_BUSQUEDA:
+        db.session.execute(db.text(sql))
+    db.session.commit()
+    vacio = db.session.execute(db.text("SELECT 1 FROM busqueda_fts LIMIT 1")).first() is None
+    hay_datos = db.session.execute(db.text(
+        "SELECT 1 FROM equipo UNION ALL SELECT 1 FROM repuesto LIMIT 1")).first() is not None
+    if desactualizado or (vacio and hay_datos):
+        reconstruir_indice_busqueda()
+
+
+def consulta_fts(q):
+    """Convierte el texto del usuario en una consulta FTS5 segura: cada palabra como prefijo"""
+    palabras = [p.replace('"', '') for p in q.split()]
+    return ' '.join(f'"{p}"*' for p in palabras if p)
+
+
+@bp.route('/buscar')
+@login_required
+@cache_pagina('ubicacion')
+def buscar():
+    # Los resultados se cargan por página desde /api/buscar
+    ubicaciones = listar_ubicaciones()
+    return render_template('buscar.html', categorias=CATEGORIAS, ubicaciones=ubicaciones)
+
+
+busqueda_fts = db.table('busqueda_fts', db.column('tipo'), db.column('ref_id'), db.column('texto'))
+
+
+def coincidencias_fts(tipo, consulta):
+    return db.select(busqueda_fts.c.ref_id).where(
+        busqueda_fts.c.tipo == tipo,
+        db.literal_column('busqueda_fts').op('MATCH')(consulta)
+    )
+
+
+@bp.route('/api/buscar')
+@login_required
+def api_buscar():
+    """Búsqueda paginada para el buscador incremental (índice FTS5 + filtros en SQL)"""
+    consulta = consulta_fts(request.args.get('q', ''))
+    categoria = request.args.get('categoria', 'all')
+    estado = request.args.get('estado', 'all')
+    ubicacion = request.args.get('ubicacion', 'all')
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+
+    # Unidades individuales (una fila por fixture)
+    q_ind = db.select(
+        db.literal('individual').label('tipo'),
+        EquipoIndividual.id.label('ref_id'),
+        Equipo.id.label('equipo_id'),
+        Equipo.nombre, Equipo.marca, Equipo.categoria,
+        EquipoIndividual.numero_fixture, EquipoIndividual.numero_serie,
+        EquipoIndividual.ubicacion_actual.label('ubicacion'),
+        db.literal(1).label('total'),
+        db.case((EquipoIndividual.en_uso, 1), else_=0).label('en_uso'),
+        db.case((db.or_(EquipoIndividual.en_uso, EquipoIndividual.danado), 0), else_=1).label('disponibles'),
+        db.func.coalesce(EquipoIndividual.danado, False).label('danado'),
+    ).join(Equipo, EquipoIndividual.equipo_grupo_id == Equipo.id)
+
+    # Equipos por cantidad, más los de gestión individual que aún no tienen unidades
+    sin_unidades = ~db.exists().where(EquipoIndividual.equipo_grupo_id == Equipo.id)
+    q_eq = db.select(
+        db.literal('equipo').label('tipo'),
+        Equipo.id.label('ref_id'),
+        Equipo.id.label('equipo_id'),
+        Equipo.nombre, Equipo.marca, Equipo.categoria,
+        db.null().label('numero_fixture'), db.null().label('numero_serie'),
+        db.null().label('ubicacion'),
+        db.func.coalesce(Equipo.cantidad_total, 0).label('total'),
+        db.func.coalesce(Equipo.cantidad_en_uso, 0).label('en_uso'),
+        db.case((db.func.coalesce(Equipo.gestion_individual, False), 0),
+                else_=db.func.coalesce(Equipo.cantidad_total, 0) - db.func.coalesce(Equipo.cantidad_en_uso, 0)).label('disponibles'),
+        db.func.coalesce(Equipo.danado, False).label('danado'),
+    ).where(db.or_(~db.func.coalesce(Equipo.gestion_individual, False), sin_unidades))
+
+    q_rep = db.select(
+        db.literal('repuesto').label('tipo'),
+        Repuesto.id.label('ref_id'),
+        db.null().label('equipo_id'),
+        Repuesto.nombre, Repuesto.marca, Repuesto.categoria,
+        db.null().label('numero_fixture'), db.null().label('numero_serie'),
+        db.null().label('ubicacion'),
+        db.func.coalesce(Repuesto.cantidad, 0).label('total'),
+        db.literal(0).label('en_uso'),
+        db.func.coalesce(Repuesto.cantidad, 0).label('disponibles'),
+        db.literal(False).label('danado'),
+    )
+
+    if consulta:
+        equipos_match = coincidencias_fts('equipo', consulta)
+        q_ind = q_ind.where(db.or_(EquipoIndividual.id.in_(coincidencias_fts('individual', consulta)),
+                                   Equipo.id.in_(equipos_match)))
+        q_eq = q_eq.where(Equipo.id.in_(equipos_match))
+        q_rep = q_rep.where(Repuesto.id.in_(coincidencias_fts('repuesto', consulta)))
+
+    if categoria not in ('all', 'Repuestos'):
+        q_ind = q_ind.where(Equipo.categoria == categoria)
+        q_eq = q_eq.where(Equipo.categoria == categoria)
+
+    if ubicacion != 'all':
+        # Los equipos por cantidad cuentan si alguna vez salieron a ese lugar (igual que el filtro anterior)
+        ubicacion = ubicacion.lower()
+        q_ind = q_ind.where(db.func.lower(EquipoIndividual.ubicacion_actual) == ubicacion)
+        q_eq = q_eq.where(db.exists().where(Historial.equipo_id == Equipo.id,
+                                            db.func.lower(Historial.usuario) == ubicacion))
+
+    # Los repuestos no tienen categoría de equipo ni ubicación
+    if categoria == 'Repuestos':
+        partes = [q_rep] if ubicacion == 'all' else []
+    elif categoria != 'all' or ubicacion != 'all':
+        partes = [q_ind, q_eq]
+    else:
+        partes = [q_ind, q_eq, q_rep]
+
+    if not partes:
+        return jsonify(items=[], total=0, page=page, per_page=per_page, has_more=False)
+
+    filas = db.union_all(*partes).subquery()
+    if estado == 'disponible':
+        filtro_estado = filas.c.disponibles > 0
+    elif estado == 'en-terreno':
+        filtro_estado = filas.c.en_uso > 0
+    elif estado == 'danado':
+        filtro_estado = filas.c.danado == True
+    else:
+        filtro_estado = db.true()
+
+    total = db.session.execute(db.select(db.func.count()).select_from(filas).where(filtro_estado)).scalar()
+    resultados = db.session.execute(
+        db.select(filas).where(filtro_estado)
+        .order_by(filas.c.nombre, filas.c.numero_fixture, filas.c.tipo, filas.c.ref_id)
+        .limit(per_page).offset((page - 1) * per_page)
+    ).mappings().all()
+
+    items = [dict(r, danado=bool(r['danado'])) for r in resultados]
+    return jsonify(items=items, total=total, page=page, per_page=per_page,
+                   has_more=page * per_page < total)
@@ -0,0 +1,85 @@
+"""Versiones de datos por tabla y caché de páginas renderizadas"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, session
+
+from .extensiones import db
+
+# --- CONTADORES DE CAMBIOS ---
+# Una fila por tabla con una versión que incrementan triggers de SQLite en cada INSERT/UPDATE/DELETE.
+# Al vivir en la base, la ven todos los workers y también los scripts que escriben directo.
+TABLAS_VERSIONADAS = ['equipo', 'equipo_individual', 'historial', 'repuesto', 'documento',
+                      'compatibilidad', 'equipo_repuesto', 'ubicacion', 'reserva']
+# Versiones que cambian solo con algunas columnas: un movimiento actualiza equipo.cantidad_en_uso y no
+# tiene por qué invalidar lo que depende únicamente de la ficha del equipo.
+VERSIONES_PARCIALES = {'equipo_ficha': ('equipo', 'nombre, marca, categoria')}
+
+
+def inicializar_contadores():
+    db.session.execute(db.text(
+        "CREATE TABLE IF NOT EXISTS contador_cambios (tabla VARCHAR(50) PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)"))
+    for tabla in TABLAS_VERSIONADAS:
+        db.session.execute(db.text("INSERT OR IGNORE INTO contador_cambios (tabla, version) VALUES (:t, 0)"), {'t': tabla})
+        for operacion in ('INSERT', 'UPDATE', 'DELETE'):
+            db.session.execute(db.text(f"""
+                CREATE TRIGGER IF NOT EXISTS version_{tabla}_{operacion.lower()} AFTER {operacion} ON {tabla} BEGIN
+                    UPDATE contador_cambios SET version = version + 1 WHERE tabla = '{tabla}';
+                END"""))
+    for nombre, (tabla, columnas) in VERSIONES_PARCIALES.items():
+        db.session.execute(db.text("INSERT OR IGNORE INTO contador_cambios (tabla, version) VALUES (:t, 0)"), {'t': nombre})
+        for operacion in ('INSERT', f'UPDATE OF {columnas}', 'DELETE'):
+            db.session.execute(db.text(f"""
+                CREATE TRIGGER IF NOT EXISTS version_{nombre}_{operacion.split()[0].lower()} AFTER {operacion} ON {tabla} BEGIN
+                    UPDATE contador_cambios SET version = version + 1 WHERE tabla = '{nombre}';
+                END"""))
+    db.session.commit()
+
+
+def version_datos(*tablas):
+    """Suma de versiones de las tablas indicadas (o de todas). Cambia con cualquier escritura en ellas."""
+    consulta = "SELECT coalesce(sum(version), 0) FROM contador_cambios"
+    if tablas:
+        nombres = ', '.join(f"'{t}'" for t in tablas if t in TABLAS_VERSIONADAS or t in VERSIONES_PARCIALES)
+        consulta += f" WHERE tabla IN ({nombres})"
+    return db.session.execute(db.text(consulta)).scalar()
+
+
+# --- CACHÉ DE PÁGINAS ---
+# HTML ya renderizado de las vistas de solo lectura, por proceso. La clave incluye la versión de las
+# tablas que la vista lee: como los contadores viven en SQLite, un commit en cualquier worker (o en
+# un script) cambia la clave en todos y nunca se sirve una página vieja. Un acierto cuesta una
+# consulta a contador_cambios y nada de ORM ni Jinja.
+PAGINAS_CACHE_MAX = 64
+_cache_paginas = OrderedDict()
+_cache_paginas_lock = threading.Lock()
+
+
+def cache_pagina(*tablas):
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            # Con mensajes flash pendientes la página es única para este request
+            if '_flashes' in session:
+                return f(*args, **kwargs)
+            clave = (request.full_path, session.get('username'), version_datos(*tablas))
+            with _cache_paginas_lock:
+                html = _cache_paginas.get(clave)
+                if html is not None:
+                    _cache_paginas.move_to_end(clave)
+                    return html
+            html = f(*args, **kwargs)
+            if isinstance(html, str):
+                with _cache_paginas_lock:
+                    _cache_paginas[clave] = html
+                    while len(_cache_paginas) > PAGINAS_CACHE_MAX:
+                        _cache_paginas.popitem(last=False)
+            return html
+        return envoltura
+    return decorador
+
+
+def vaciar_cache_paginas():
+    with _cache_paginas_lock:
+        _cache_paginas.clear()
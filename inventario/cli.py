@@ -0,0 +1,145 @@
+"""Comandos de consola: `flask inicializar`, `flask respaldo ...`, `flask utilizacion ...` `flask instantaneas ...` y `flask conciliacion ...`"""
+import os
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from werkzeug.security import generate_password_hash
+
+from .busqueda import inicializar_busqueda
+from .cache import inicializar_contadores
+from .conciliacion import conciliar, describir
+from .extensiones import db
+from .historico import estado_en
+from .modelos import Instantanea, InstantaneaPrestamo, Usuario
+from .reservas import inicializar_reservas
+from .respaldos import verificar_respaldo
+from .ubicaciones import inicializar_ubicaciones
+from .utilizacion import reconstruir_utilizacion
+
+
+def inicializar_base():
+    """Crea tablas, índices de búsqueda y de reservas, contadores y catálogo de ubicaciones. Es idempotente."""
+    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+    db.create_all()
+    # Crear usuario por defecto si no hay ninguno
+    if not Usuario.query.first():
+        hashed_pw = generate_password_hash("admin123")
+        admin = Usuario(username="MLProducciones", password_hash=hashed_pw)
+        db.session.add(admin)
+        db.session.commit()
+    inicializar_busqueda()
+    inicializar_reservas()
+    inicializar_contadores()
+    inicializar_ubicaciones()
+
+
+def revision_pendiente():
+    """(revisión de la base, última revisión de migrations/) si la base no está al día; None si lo está"""
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    ultima = ScriptDirectory.from_config(current_app.extensions['migrate'].migrate.get_config()).get_current_head()
+    with db.engine.connect() as conexion:
+        actual = MigrationContext.configure(conexion).get_current_revision()
+    return None if actual == ultima else (actual, ultima)
+
+
+@click.command('inicializar')
+def inicializar():
+    """Prepara la base de datos (correr en cada despliegue, después de `flask db upgrade` y antes de levantar los workers)"""
+    # create_all no agrega índices ni migra datos en tablas que ya existen: sin las migraciones la base
+    # quedaría a medias sin que nada avise
+    pendiente = revision_pendiente()
+    if pendiente:
+        raise click.ClickException(f"La base está en la revisión {pendiente[0] or '(sin versionar)'} y la última es "
+                                   f"{pendiente[1]}: correr `flask --app app db upgrade` antes de inicializar.")
+    inicializar_base()
+    click.echo(f"Base inicializada: {current_app.config['DATABASE_PATH']}")
+
+
+respaldo = AppGroup('respaldo', help="Respaldos de la base de datos")
+
+
+@respaldo.command('crear')
+def respaldo_crear():
+    """Crea un respaldo ahora y aplica la retención"""
+    path = current_app.extensions['respaldos'].realizar()
+    click.echo(f"Respaldo creado: {path}" if path else "No se encontró la base de datos.")
+
+
+@respaldo.command('listar')
+def respaldo_listar():
+    for fecha, path in current_app.extensions['respaldos'].listar():
+        click.echo(f"{fecha:%Y-%m-%d %H:%M:%S}  {path}")
+
+
+@respaldo.command('verificar')
+@click.argument('path', required=False)
+def respaldo_verificar(path):
+    """Verifica un respaldo (o todos si no se indica ninguno)"""
+    paths = [path] if path else [p for _, p in current_app.extensions['respaldos'].listar()]
+    fallidos = 0
+    for p in paths:
+        ok, detalle = verificar_respaldo(p)
+        fallidos += not ok
+        click.echo(f"{'OK   ' if ok else 'ERROR'} {p} {'' if ok else detalle}")
+    if fallidos:
+        raise SystemExit(1)
+
+
+@respaldo.command('restaurar')
+@click.argument('path')
+@click.confirmation_option(prompt='Esto reemplaza la base de datos actual. ¿Continuar?')
+def respaldo_restaurar(path):
+    """Restaura un respaldo verificado sobre la base activa (detener la app antes y levantarla después:
+    las cachés en memoria de cada worker dependen de las versiones de la base reemplazada)"""
+    try:
+        current_app.extensions['respaldos'].restaurar(path)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Base restaurada desde {path}")
+
+
+utilizacion_cli = AppGroup('utilizacion', help="Resúmenes diarios de utilización")
+
+
+@utilizacion_cli.command('reconstruir')
+def utilizacion_reconstruir():
+    """Recalcula los resúmenes desde todo el historial (bases existentes o resúmenes dañados)"""
+    procesados = reconstruir_utilizacion()
+    click.echo(f"Utilización reconstruida a partir de {procesados} movimientos.")
+
+
+instantaneas = AppGroup('instantaneas', help="Puntos de control del estado a una fecha")
+
+
+@instantaneas.command('actualizar')
+@click.option('--desde-cero', is_flag=True, help="Borra los puntos existentes (si se cargaron movimientos con fechas pasadas)")
+def instantaneas_actualizar(desde_cero):
+    """Guarda los puntos de control que falten hasta hoy"""
+    if desde_cero:
+        db.session.execute(db.delete(InstantaneaPrestamo))
+        db.session.execute(db.delete(Instantanea))
+        db.session.commit()
+    _, _, reproducidos = estado_en(datetime.now())
+    total = db.session.scalar(db.select(db.func.count()).select_from(Instantanea))
+    click.echo(f"{reproducidos} movimientos reproducidos; {total} puntos de control.")
+
+
+conciliacion_cli = AppGroup('conciliacion', help="Contadores contra el historial de movimientos")
+
+
+@conciliacion_cli.command('revisar')
+@click.option('--reparar', is_flag=True, help="Corrige contador de equipos y estado de unidades según el historial")
+@click.option('--completa', is_flag=True, help="Vuelve a agregar todo el historial en vez de solo lo nuevo")
+def conciliacion_revisar(reparar, completa):
+    """Informa las discrepancias; sale con código 1 si queda alguna sin reparar"""
+    discrepancias = conciliar(reparar_contadores=reparar, completa=completa)
+    for d in discrepancias:
+        click.echo(describir(d))
+    pendientes = sum(not d['reparada'] for d in discrepancias)
+    click.echo(f"{len(discrepancias)} discrepancias, {pendientes} sin reparar.")
+    if pendientes:
+        raise SystemExit(1)
@@ -0,0 +1,217 @@
+"""
+Conciliación de contadores contra el historial de movimientos.
+
+Equipo.cantidad_en_uso y EquipoIndividual.en_uso se mantienen a mano en cada movimiento y pueden
+desviarse (ediciones, cargas directas, errores). Lo esperado sale del historial: SALIDA - RETORNO por
+equipo y el último movimiento de cada unidad. Esos agregados se guardan (SaldoEquipo y
+UltimoMovimientoUnidad) y cada corrida suma solo los movimientos con id mayor a la marca
+Conciliacion.ultimo_historial_id, así el costo depende de lo nuevo y no del largo del historial.
+
+Discrepancias:
+  contador        cantidad_en_uso distinto de SALIDA - RETORNO (reparable)
+  unidad          en_uso de una unidad distinto de lo que dice su último movimiento (reparable)
+  sobreasignado   SALIDA - RETORNO mayor que cantidad_total (se revisa a mano)
+  saldo_negativo  más retornos que salidas en el historial (se revisa a mano)
+
+Corre desde `flask --app app conciliacion revisar` y, si CONCILIACION_INTERVALO_SEGUNDOS > 0, en un
+hilo por worker que se turna con los demás mediante un UPDATE condicional sobre Conciliacion.proxima.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .extensiones import db, realizar_backup
+from .modelos import Conciliacion, Equipo, EquipoIndividual, Historial, SaldoEquipo, UltimoMovimientoUnidad
+
+REPARABLES = ('contador', 'unidad')
+
+
+def preparar_estado(completa=False):
+    """Crea la fila de estado si falta; con `completa` vuelve a agregar todo el historial"""
+    db.session.execute(sqlite_insert(Conciliacion).values(id=1, ultimo_historial_id=0).on_conflict_do_nothing())
+    if completa:
+        db.session.execute(db.delete(SaldoEquipo))
+        db.session.execute(db.delete(UltimoMovimientoUnidad))
+        db.session.execute(db.update(Conciliacion).where(Conciliacion.id == 1).values(ultimo_historial_id=0))
+
+
+def reclamar_turno(intervalo_segundos):
+    """True si a este worker le toca la corrida programada (y la siguiente queda para dentro de un intervalo)"""
+    preparar_estado()
+    ahora = datetime.now()
+    return db.session.execute(
+        db.update(Conciliacion)
+        .where(Conciliacion.id == 1, db.or_(Conciliacion.proxima.is_(None), Conciliacion.proxima <= ahora))
+        .values(proxima=ahora + timedelta(seconds=intervalo_segundos))
+    ).rowcount == 1
+
+
+def agregar_movimientos(desde_id, hasta_id):
+    """Suma a los agregados los movimientos con id en (desde_id, hasta_id]"""
+    nuevos = db.and_(Historial.id > desde_id, Historial.id <= hasta_id, Historial.tipo.in_(['SALIDA', 'RETORNO']))
+    cantidad = db.func.coalesce(Historial.cantidad, 1)
+    saldos = (db.select(Historial.equipo_id,
+                        db.func.sum(db.case((Historial.tipo == 'SALIDA', cantidad), else_=0)),
+                        db.func.sum(db.case((Historial.tipo == 'RETORNO', cantidad), else_=0)))
+              .where(nuevos).group_by(Historial.equipo_id))
+    stmt = sqlite_insert(SaldoEquipo).from_select(['equipo_id', 'salidas', 'retornos'], saldos)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[SaldoEquipo.equipo_id],
+        set_={'salidas': SaldoEquipo.salidas + stmt.excluded.salidas,
+              'retornos': SaldoEquipo.retornos + stmt.excluded.retornos}))
+
+    # Con max() SQLite toma tipo y usuario de la misma fila que el id máximo
+    ultimos = (db.select(Historial.equipo_individual_id, db.func.max(Historial.id), Historial.tipo, Historial.usuario)
+               .where(nuevos, Historial.equipo_individual_id.isnot(None))
+               .group_by(Historial.equipo_individual_id))
+    stmt = sqlite_insert(UltimoMovimientoUnidad).from_select(
+        ['equipo_individual_id', 'historial_id', 'tipo', 'usuario'], ultimos)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[UltimoMovimientoUnidad.equipo_individual_id],
+        set_={c: getattr(stmt.excluded, c) for c in ('historial_id', 'tipo', 'usuario')}))
+
+
+def buscar_discrepancias():
+    """Discrepancias como dicts (tipo, equipo_id, equipo, equipo_individual_id, numero_fixture, registrado, esperado)"""
+    esperado = db.func.coalesce(SaldoEquipo.salidas, 0) - db.func.coalesce(SaldoEquipo.retornos, 0)
+    registrado = db.func.coalesce(Equipo.cantidad_en_uso, 0)
+    discrepancias = []
+    for f in db.session.execute(
+            db.select(Equipo.id, Equipo.nombre, Equipo.cantidad_total, registrado.label('registrado'),
+                      esperado.label('esperado'))
+            .outerjoin(SaldoEquipo, SaldoEquipo.equipo_id == Equipo.id)
+            .where(db.or_(registrado != esperado, esperado < 0, esperado > db.func.coalesce(Equipo.cantidad_total, 0)))
+            .order_by(Equipo.id)):
+        if f.esperado < 0:
+            tipo = 'saldo_negativo'
+        elif f.esperado > (f.cantidad_total or 0):
+            tipo = 'sobreasignado'
+        else:
+            tipo = 'contador'
+        discrepancias.append({'tipo': tipo, 'equipo_id': f.id, 'equipo': f.nombre, 'equipo_individual_id': None,
+                              'numero_fixture': None, 'registrado': f.registrado, 'esperado': f.esperado})
+
+    en_uso_esperado = db.func.coalesce(UltimoMovimientoUnidad.tipo == 'SALIDA', False)
+    en_uso = db.func.coalesce(EquipoIndividual.en_uso, False)
+    for f in db.session.execute(
+            db.select(EquipoIndividual.id, EquipoIndividual.numero_fixture, Equipo.id.label('equipo_id'),
+                      Equipo.nombre, en_uso.label('registrado'), en_uso_esperado.label('esperado'))
+            .join(Equipo, Equipo.id == EquipoIndividual.equipo_grupo_id)
+            .outerjoin(UltimoMovimientoUnidad, UltimoMovimientoUnidad.equipo_individual_id == EquipoIndividual.id)
+            .where(en_uso != en_uso_esperado)
+            .order_by(EquipoIndividual.id)):
+        discrepancias.append({'tipo': 'unidad', 'equipo_id': f.equipo_id, 'equipo': f.nombre,
+                              'equipo_individual_id': f.id, 'numero_fixture': f.numero_fixture,
+                              'registrado': bool(f.registrado), 'esperado': bool(f.esperado)})
+    return discrepancias
+
+
+def reparar(discrepancias):
+    """Lleva los contadores reparables a lo que dice el historial, en dos UPDATE"""
+    equipos = [d['equipo_id'] for d in discrepancias if d['tipo'] == 'contador']
+    unidades = [d['equipo_individual_id'] for d in discrepancias if d['tipo'] == 'unidad']
+    if equipos:
+        saldo = (db.select(SaldoEquipo.salidas - SaldoEquipo.retornos)
+                 .where(SaldoEquipo.equipo_id == Equipo.id).scalar_subquery())
+        db.session.execute(db.update(Equipo).where(Equipo.id.in_(equipos))
+                           .values(cantidad_en_uso=db.func.coalesce(saldo, 0)))
+    if unidades:
+        ultimo = db.select(UltimoMovimientoUnidad).where(
+            UltimoMovimientoUnidad.equipo_individual_id == EquipoIndividual.id)
+        salida = ultimo.with_only_columns(UltimoMovimientoUnidad.tipo == 'SALIDA').scalar_subquery()
+        destino = ultimo.with_only_columns(UltimoMovimientoUnidad.usuario).scalar_subquery()
+        db.session.execute(db.update(EquipoIndividual).where(EquipoIndividual.id.in_(unidades)).values(
+            en_uso=db.func.coalesce(salida, False),
+            ubicacion_actual=db.case((db.func.coalesce(salida, False), destino), else_='Bodega')))
+    for d in discrepancias:
+        d['reparada'] = d['tipo'] in REPARABLES
+
+
+def conciliar(reparar_contadores=False, completa=False):
+    """Agrega los movimientos nuevos, busca discrepancias y opcionalmente repara las reparables.
+    La primera escritura toma el lock de SQLite: nadie registra movimientos mientras se compara."""
+    preparar_estado(completa)
+    estado = db.session.get(Conciliacion, 1)
+    hasta_id = db.session.scalar(db.select(db.func.max(Historial.id))) or 0
+    if hasta_id > estado.ultimo_historial_id:
+        agregar_movimientos(estado.ultimo_historial_id, hasta_id)
+
+    discrepancias = buscar_discrepancias()
+    for d in discrepancias:
+        d['reparada'] = False
+    if reparar_contadores:
+        reparar(discrepancias)
+
+    estado.ultimo_historial_id = hasta_id
+    estado.ultima = datetime.now()
+    estado.discrepancias = sum(not d['reparada'] for d in discrepancias)
+    db.session.commit()
+    if any(d['reparada'] for d in discrepancias):
+        realizar_backup()
+    return discrepancias
+
+
+def borrar_conciliacion(equipo_id=None, ind_id=None):
+    """Al eliminar un equipo o una unidad se van sus agregados (su id puede volver a usarse)"""
+    if ind_id is not None:
+        db.session.execute(db.delete(UltimoMovimientoUnidad).where(UltimoMovimientoUnidad.equipo_individual_id == ind_id))
+        return
+    db.session.execute(db.delete(SaldoEquipo).where(SaldoEquipo.equipo_id == equipo_id))
+    db.session.execute(db.delete(UltimoMovimientoUnidad).where(UltimoMovimientoUnidad.equipo_individual_id.in_(
+        db.select(EquipoIndividual.id).where(EquipoIndividual.equipo_grupo_id == equipo_id))))
+
+
+def describir(d):
+    unidad = f" #{d['numero_fixture']}" if d['equipo_individual_id'] else ''
+    estado = 'reparada' if d['reparada'] else ('reparable' if d['tipo'] in REPARABLES else 'revisar a mano')
+    return (f"{d['tipo']:<15} {d['equipo']}{unidad} (equipo {d['equipo_id']}): "
+            f"registrado {d['registrado']}, historial {d['esperado']} [{estado}]")
+
+
+class ProgramadorConciliacion:
+    """Corre conciliar() en segundo plano. Cada worker tiene su hilo; solo uno por intervalo gana el turno."""
+
+    def __init__(self, app, intervalo_segundos, reparar_contadores=False):
+        self.app = app
+        self.intervalo_segundos = intervalo_segundos
+        self.reparar_contadores = reparar_contadores
+        self._hilo = None
+        self._pid = None
+
+    def asegurar_hilo(self):
+        # Igual que los respaldos: el hilo se crea de forma perezosa para que cada worker tenga el suyo
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._hilo = threading.Thread(target=self._bucle, name='conciliacion', daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            time.sleep(min(self.intervalo_segundos, 300))
+            try:
+                self.correr_si_toca()
+            except Exception:
+                self.app.logger.exception("Conciliación: la corrida falló, se reintenta en el próximo turno")
+
+    def correr_si_toca(self):
+        with self.app.app_context():
+            if not reclamar_turno(self.intervalo_segundos):
+                db.session.rollback()
+                return None
+            discrepancias = conciliar(reparar_contadores=self.reparar_contadores)
+            for d in discrepancias:
+                self.app.logger.warning("Conciliación: %s", describir(d))
+            return discrepancias
+
+
+def registrar_conciliacion(app):
+    intervalo = app.config['CONCILIACION_INTERVALO_SEGUNDOS']
+    if intervalo <= 0:
+        return
+    programador = ProgramadorConciliacion(app, intervalo, app.config['CONCILIACION_REPARAR'])
+    app.extensions['conciliacion'] = programador
+    app.before_request(programador.asegurar_hilo)
@@ -0,0 +1,90 @@
+"""Configuración de la aplicación: variables de entorno con valores por defecto para desarrollo"""
+import os
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CATEGORIAS = sorted(["Luminarias", "Grip", "Insumos", "Equipamiento Electrico", "Accesorios"])
+CATEGORIAS_REPUESTOS = sorted(["General", "Electrónico", "Mecánico", "Óptico", "Cables/Conectores", "Otros"])
+
+DESCARGAS_MAX_AGE = 365 * 24 * 3600
+
+
+def configurar(app):
+    app.secret_key = os.environ.get("SECRET_KEY", "media_lighting_secret_key") # Usar variable de entorno en producción
+
+    # Configuración de base de datos: usar variable de entorno si está disponible (producción)
+    # De lo contrario, usar la ruta local (desarrollo)
+    db_path = os.environ.get('DATABASE_PATH', os.path.join(RAIZ, 'inventario.db'))
+    app.config['DATABASE_PATH'] = db_path
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Ajustes de SQLite aplicados a cada conexión (sobrescribibles por variable de entorno).
+    # WAL permite leer mientras otro worker escribe; busy_timeout hace esperar en vez de fallar con "database is locked".
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),        # ms
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),          # negativo = KiB (~20 MB)
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),  # bytes
+        'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+    }
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'connect_args': {'timeout': app.config['SQLITE_PRAGMAS']['busy_timeout'] / 1000},
+    }
+
+    # Configuración de archivos
+    upload_folder = os.environ.get('UPLOAD_FOLDER', os.path.join(RAIZ, 'manuales'))
+    app.config['UPLOAD_FOLDER'] = upload_folder
+    app.config['CACHE_FOLDER'] = os.environ.get('CACHE_FOLDER', os.path.join(os.path.dirname(db_path), 'cache'))
+    app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'doc', 'docx', 'txt', 'png', 'jpg', 'jpeg'}
+
+    # Descargas de manuales: '' las sirve el worker; 'x-sendfile' (Apache/lighttpd) o 'x-accel' (nginx)
+    # delegan el envío de bytes al proxy. Para nginx, DESCARGAS_ACCEL_PREFIJO es una location `internal`
+    # con `alias` a UPLOAD_FOLDER.
+    app.config['DESCARGAS_OFFLOAD'] = os.environ.get('DESCARGAS_OFFLOAD', '').lower()
+    app.config['DESCARGAS_ACCEL_PREFIJO'] = os.environ.get('DESCARGAS_ACCEL_PREFIJO', '/_manuales/')
+    app.config['USE_X_SENDFILE'] = app.config['DESCARGAS_OFFLOAD'] == 'x-sendfile'
+
+    # Respaldos: en segundo plano, agrupados cada N escrituras o cada intervalo, con retención por hora/día/semana
+    app.config['BACKUP_FOLDER'] = os.environ.get('BACKUP_FOLDER', os.path.join(os.path.dirname(db_path), 'backups'))
+    app.config['BACKUP_CADA_N_ESCRITURAS'] = int(os.environ.get('BACKUP_CADA_N_ESCRITURAS', 20))
+    app.config['BACKUP_INTERVALO_SEGUNDOS'] = int(os.environ.get('BACKUP_INTERVALO_SEGUNDOS', 3600))
+    app.config['BACKUP_RETENCION_HORARIA'] = int(os.environ.get('BACKUP_RETENCION_HORARIA', 24))
+    app.config['BACKUP_RETENCION_DIARIA'] = int(os.environ.get('BACKUP_RETENCION_DIARIA', 7))
+    app.config['BACKUP_RETENCION_SEMANAL'] = int(os.environ.get('BACKUP_RETENCION_SEMANAL', 4))
+
+    # Estado a una fecha (ver historico.py): cada cuántos días se guarda un punto de control
+    app.config['INSTANTANEAS_CADA_DIAS'] = int(os.environ.get('INSTANTANEAS_CADA_DIAS', 7))
+
+    # Conciliación de contadores contra el historial (ver conciliacion.py); 0 desactiva la corrida programada
+    app.config['CONCILIACION_INTERVALO_SEGUNDOS'] = int(os.environ.get('CONCILIACION_INTERVALO_SEGUNDOS', 6 * 3600))
+    app.config['CONCILIACION_REPARAR'] = os.environ.get('CONCILIACION_REPARAR', '0') == '1'
+
+    # Reservas (ver reservas.py): cuántas horas antes del inicio una salida ya no puede llevarse lo reservado por otros
+    app.config['RESERVAS_ANTICIPO_HORAS'] = int(os.environ.get('RESERVAS_ANTICIPO_HORAS', 24))
+
+    # Presupuesto de sentencias SQL por ruta: evita que vuelvan las cargas perezosas N+1.
+    # En modo estricto (tests o SQL_PRESUPUESTO_ESTRICTO=1) superar el presupuesto es un error; si no, solo se registra.
+    app.config['SQL_PRESUPUESTO_ESTRICTO'] = os.environ.get('SQL_PRESUPUESTO_ESTRICTO', '0') == '1'
+    app.config['SQL_PRESUPUESTOS'] = {
+        # Versión de la página, equipos, sus unidades, versión de 'ubicacion' y el catálogo de destinos (en frío)
+        'equipos.index': 5,
+        'busqueda.buscar': 3,
+        'individuales.luminarias': 3,
+        'individuales.gestion_individual': 5,
+        'movimientos.mostrar_historial': 3,
+        # Salida con reserva del destino: UPDATE condicional (descuenta reservas), unidad, reservas retiradas, rollups
+        'movimientos.movimiento': 9,
+        'utilizacion.reporte': 2,
+        'api.api_equipos': 3,
+        'api.api_individuales': 3,
+        'api.api_repuestos': 3,
+        'api.api_movimientos': 3,
+    }
+
+    # Métricas y perfilado (ver metricas.py)
+    app.config['SQL_LENTA_MS'] = float(os.environ.get('SQL_LENTA_MS', 200))
+    app.config['METRICAS_TOKEN'] = os.environ.get('METRICAS_TOKEN', '')
+    app.config['ADMINISTRADORES'] = {u.strip().lower() for u in os.environ.get('ADMINISTRADORES', 'MLProducciones').split(',') if u.strip()}
+    app.config['PERFILES_FOLDER'] = os.path.join(app.config['CACHE_FOLDER'], 'perfiles')
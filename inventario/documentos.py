@@ -0,0 +1,91 @@
+"""Referencias a los archivos del almacén de documentos"""
+import os
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from werkzeug.utils import secure_filename
+
+from . import almacen
+from .extensiones import db
+from .modelos import Archivo
+
+# Los uploads se deduplican por contenido (ver almacen.py). Archivo.referencias cuenta cuántos
+# documentos y manuales usan cada archivo; el archivo se borra del disco recién cuando llega a 0
+# y después del commit, para no perderlo si la transacción se deshace. Al revés, un archivo
+# escrito por una transacción que no llega a confirmarse se borra cuando esta termina.
+def guardar_archivo(file):
+    """Guarda el upload (o reutiliza el existente con igual contenido y extensión) y suma una referencia"""
+    extension = secure_filename(file.filename).rsplit('.', 1)[-1].lower()
+    sha256, filename, tamano, nuevo = almacen.guardar_stream(file.stream, current_app.config['UPLOAD_FOLDER'], extension)
+    if nuevo:
+        db.session.info.setdefault('archivos_nuevos', set()).add(filename)
+    stmt = sqlite_insert(Archivo).values(filename=filename, sha256=sha256, tamano=tamano, referencias=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[Archivo.filename], set_={'referencias': Archivo.referencias + 1}))
+    return filename
+
+
+def sumar_referencias(filename, cantidad):
+    """Suma `cantidad` usos a un archivo que ya está en disco. False si el archivo no existe."""
+    path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    if not os.path.isfile(path):
+        return False
+    resultado = db.session.execute(
+        db.update(Archivo).where(Archivo.filename == filename).values(referencias=Archivo.referencias + cantidad))
+    if not resultado.rowcount:
+        # Archivo anterior al almacén: lo usaba solo el registro de origen, desde ahora se cuenta
+        db.session.add(Archivo(filename=filename, sha256=almacen.digest_archivo(path),
+                               tamano=os.path.getsize(path), referencias=1 + cantidad))
+    return True
+
+
+def liberar_archivo(filename):
+    """Resta una referencia; si era la última, el archivo se borra del disco al confirmar"""
+    if not filename:
+        return
+    resultado = db.session.execute(
+        db.update(Archivo).where(Archivo.filename == filename).values(referencias=Archivo.referencias - 1))
+    if resultado.rowcount:
+        resultado = db.session.execute(
+            db.delete(Archivo).where(Archivo.filename == filename, Archivo.referencias <= 0))
+        if not resultado.rowcount:
+            return
+    # Sin fila en Archivo: archivo anterior al almacén, lo usaba solo este registro
+    db.session.info.setdefault('archivos_liberados', set()).add(filename)
+
+
+def borrar_sin_uso(filenames):
+    """Borra del disco los archivos que no tienen fila en Archivo según lo ya confirmado"""
+    with db.engine.connect() as conn:
+        # Otro request pudo volver a subir el mismo contenido entre tanto
+        en_uso = set(conn.execute(db.select(Archivo.filename).where(Archivo.filename.in_(filenames))).scalars())
+    for filename in filenames - en_uso:
+        try:
+            os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+        except FileNotFoundError:
+            pass
+
+
+@event.listens_for(Session, 'after_commit')
+def borrar_archivos_liberados(sesion):
+    sesion.info.pop('archivos_nuevos', None)
+    liberados = sesion.info.pop('archivos_liberados', None)
+    if liberados:
+        borrar_sin_uso(liberados)
+
+
+@event.listens_for(Session, 'after_rollback')
+def descartar_archivos_liberados(sesion):
+    sesion.info.pop('archivos_liberados', None)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def borrar_archivos_nuevos(sesion, transaccion):
+    # Rollback explícito, excepción o fin del request sin commit: lo subido no quedó registrado
+    if transaccion.parent is not None:
+        return
+    nuevos = sesion.info.pop('archivos_nuevos', None)
+    if nuevos:
+        borrar_sin_uso(nuevos)
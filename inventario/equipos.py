@@ -0,0 +1,266 @@
+"""Inventario general: equipos, manuales, documentos y compatibilidades"""
+import mimetypes
+import os
+from datetime import datetime
+from urllib.parse import quote
+
+from flask import (abort, Blueprint, current_app, flash, redirect, render_template, request, Response,
+                   send_from_directory, url_for)
+from werkzeug.security import safe_join
+
+from . import almacen
+from .auth import login_required
+from .cache import cache_pagina
+from .conciliacion import borrar_conciliacion
+from .config import CATEGORIAS, DESCARGAS_MAX_AGE
+from .documentos import guardar_archivo, liberar_archivo, sumar_referencias
+from .extensiones import db
+from .grafo import repuestos_para
+from .historico import borrar_instantaneas
+from .modelos import Documento, Equipo, resumen_disponibilidad
+from .reservas import borrar_reservas
+from .ubicaciones import listar_ubicaciones
+from .utilizacion import borrar_utilizacion
+
+bp = Blueprint('equipos', __name__)
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+
+@bp.route('/inventario')
+@login_required
+@cache_pagina('equipo', 'equipo_individual', 'ubicacion')
+def index():
+    equipos = (Equipo.query.filter(Equipo.categoria != 'Luminarias')
+               .options(db.selectinload(Equipo.equipos_individuales))
+               .order_by(Equipo.id.desc()).all())
+    # Ubicaciones/destinos para el filtro (catálogo con caché)
+    ubicaciones = listar_ubicaciones()
+    return render_template('index.html', equipos=equipos, categorias=CATEGORIAS, ubicaciones=ubicaciones)
+
+
+@bp.route('/equipo/<int:id>')
+@login_required
+def detalle_equipo(id):
+    e = Equipo.query.get_or_404(id)
+    resumen = resumen_disponibilidad(id) if e.gestion_individual else None
+    # Solo necesitamos las luminarias para el selector de compatibilidad si es un repuesto
+    luminarias = []
+    if e.categoria == "Repuestos/Spare":
+        luminarias = Equipo.query.filter_by(categoria="Luminarias").order_by(Equipo.nombre).all()
+    # Repuestos propios y de modelos compatibles, desde el grafo en memoria (sin cargas perezosas)
+    repuestos = repuestos_para(id) if e.categoria == "Luminarias" else None
+    # Destinos para vincular sus documentos a otros equipos sin volver a subirlos
+    otros_equipos = []
+    if e.manual_filename or e.documentos:
+        otros_equipos = db.session.execute(
+            db.select(Equipo.id, Equipo.nombre, Equipo.marca,
+                      db.func.coalesce(Equipo.categoria, 'Sin categoría').label('categoria'))
+            .where(Equipo.id != id).order_by('categoria', Equipo.nombre)).all()
+
+    return render_template('detalle.html', e=e, categorias=CATEGORIAS, luminarias=luminarias, resumen=resumen,
+                           repuestos=repuestos, otros_equipos=otros_equipos)
+
+
+@bp.route('/equipo/<int:id>/update', methods=['POST'])
+@login_required
+def update_equipo(id):
+    e = Equipo.query.get_or_404(id)
+    
+    # Actualizar campos básicos
+    e.nombre = request.form.get('nombre', e.nombre)
+    e.marca = request.form.get('marca', e.marca)
+    e.categoria = request.form.get('categoria', e.categoria)
+    if e.categoria == 'Luminarias':
+        e.gestion_individual = True
+    e.observaciones = request.form.get('observaciones', '')
+    e.fecha_ingreso = request.form.get('fecha_ingreso', e.fecha_ingreso)
+    e.danado = 'danado' in request.form # Nuevo: Checkbox de dañado
+    
+    try:
+        e.cantidad_total = int(request.form.get('cantidad_total', e.cantidad_total))
+    except ValueError:
+        pass # Mantener valor anterior si hay error
+
+    if 'manual' in request.files:
+        file = request.files['manual']
+        if file and allowed_file(file.filename):
+            filename = guardar_archivo(file)
+            if e.manual_filename != filename:
+                liberar_archivo(e.manual_filename)
+                e.manual_filename = filename
+            else:
+                liberar_archivo(filename)  # mismo contenido que el manual actual: no suma referencia
+            
+    db.session.commit()
+    flash(f"Ficha de {e.nombre} actualizada correctamente.", "success")
+    
+    # Redireccionar usando el parámetro 'next' si existe
+    next_url = request.form.get('next')
+    if next_url:
+        return redirect(next_url)
+        
+    return redirect(url_for('equipos.detalle_equipo', id=id))
+
+
+@bp.route('/download/<filename>')
+@login_required
+def download_manual(filename):
+    """Sirve un manual. Los archivos del almacén ({sha256}.{ext}) nunca cambian de contenido: se
+    cachean como inmutables con el hash como ETag. Range/If-None-Match los resuelve send_file."""
+    path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    sha256 = almacen.sha256_de_nombre(filename)
+
+    modo = current_app.config['DESCARGAS_OFFLOAD']
+    if modo == 'x-accel':
+        # nginx entrega los bytes (y resuelve Range) desde una location `internal`
+        respuesta = Response(mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+        respuesta.headers['X-Accel-Redirect'] = current_app.config['DESCARGAS_ACCEL_PREFIJO'].rstrip('/') + '/' + quote(filename)
+        if sha256:
+            respuesta.set_etag(sha256)
+            respuesta.make_conditional(request)
+    else:
+        # Con USE_X_SENDFILE send_file solo pone la cabecera X-Sendfile y el proxy envía el archivo
+        respuesta = send_from_directory(current_app.config['UPLOAD_FOLDER'], filename, etag=sha256 or True,
+                                        max_age=DESCARGAS_MAX_AGE if sha256 else None)
+    respuesta.accept_ranges = 'bytes'
+    if sha256:
+        respuesta.cache_control.public = False
+        respuesta.cache_control.private = True
+        respuesta.cache_control.max_age = DESCARGAS_MAX_AGE
+        respuesta.cache_control.immutable = True
+    return respuesta
+
+
+@bp.route('/equipo/<int:id>/add_documento', methods=['POST'])
+@login_required
+def add_documento(id):
+    e = Equipo.query.get_or_404(id)
+    referencia = request.form.get('referencia', 'Documento sin nombre').strip()
+    if not referencia:
+        referencia = 'Documento sin nombre'
+    
+    if 'documento' in request.files:
+        file = request.files['documento']
+        if file and allowed_file(file.filename):
+            filename = guardar_archivo(file)
+            nuevo_doc = Documento(equipo_id=id, filename=filename, nombre_referencial=referencia)
+            db.session.add(nuevo_doc)
+            db.session.commit()
+            flash(f"Documento '{referencia}' agregado correctamente.", "success")
+        else:
+            flash("Archivo no válido o no seleccionado.", "error")
+    
+    return redirect(url_for('equipos.detalle_equipo', id=id))
+
+
+@bp.route('/documento/delete/<int:doc_id>', methods=['POST'])
+@login_required
+def delete_documento(doc_id):
+    doc = Documento.query.get_or_404(doc_id)
+    equipo_id = doc.equipo_id
+    # El archivo solo se borra del disco si ningún otro documento/manual lo usa
+    liberar_archivo(doc.filename)
+    db.session.delete(doc)
+    db.session.commit()
+    flash("Documento eliminado.", "success")
+    return redirect(url_for('equipos.detalle_equipo', id=equipo_id))
+
+
+@bp.route('/equipo/<int:id>/vincular_documento', methods=['POST'])
+@login_required
+def vincular_documento(id):
+    """Agrega el manual o un documento de este equipo a otros equipos: mismo archivo, una referencia más por equipo"""
+    e = Equipo.query.get_or_404(id)
+    filename = request.form.get('filename', '')
+    if filename and filename == e.manual_filename:
+        referencia = f"Manual {e.nombre}"
+    else:
+        doc = next((d for d in e.documentos if d.filename == filename), None)
+        if doc is None:
+            flash("Documento no encontrado en este equipo.", "error")
+            return redirect(url_for('equipos.detalle_equipo', id=id))
+        referencia = doc.nombre_referencial
+
+    destinos = Equipo.query.filter(Equipo.id.in_(request.form.getlist('equipo_ids', type=int)), Equipo.id != id).all()
+    # Los que ya tienen el archivo, como documento o como manual, no lo repiten
+    con_archivo = set(db.session.execute(db.select(Documento.equipo_id).where(
+        Documento.filename == filename, Documento.equipo_id.in_([d.id for d in destinos]))).scalars())
+    destinos = [d for d in destinos if d.id not in con_archivo and d.manual_filename != filename]
+    if not destinos:
+        flash("Los equipos elegidos ya tienen ese documento.", "warning")
+        return redirect(url_for('equipos.detalle_equipo', id=id))
+    if not sumar_referencias(filename, len(destinos)):
+        flash("El archivo ya no está en el servidor.", "error")
+        return redirect(url_for('equipos.detalle_equipo', id=id))
+    db.session.add_all(Documento(equipo_id=d.id, filename=filename, nombre_referencial=referencia) for d in destinos)
+    db.session.commit()
+    flash(f"Documento '{referencia}' vinculado a {len(destinos)} equipo(s).", "success")
+    return redirect(url_for('equipos.detalle_equipo', id=id))
+
+
+@bp.route('/equipo/<int:id>/add_compatibilidad', methods=['POST'])
+@login_required
+def add_compatibilidad(id):
+    e = Equipo.query.get_or_404(id)
+    compatible_id = request.form.get('compatible_id')
+    if compatible_id:
+        compatible_item = Equipo.query.get(compatible_id)
+        if compatible_item and compatible_item not in e.compatibles:
+            e.compatibles.append(compatible_item)
+            db.session.commit()
+            flash(f"Compatibilidad con {compatible_item.nombre} agregada.", "success")
+    return redirect(url_for('equipos.detalle_equipo', id=id))
+
+
+@bp.route('/equipo/<int:id>/remove_compatibilidad/<int:comp_id>', methods=['POST'])
+@login_required
+def remove_compatibilidad(id, comp_id):
+    e = Equipo.query.get_or_404(id)
+    compatible_item = Equipo.query.get(comp_id)
+    if compatible_item and compatible_item in e.compatibles:
+        e.compatibles.remove(compatible_item)
+        db.session.commit()
+        flash(f"Compatibilidad con {compatible_item.nombre} eliminada.", "success")
+    return redirect(url_for('equipos.detalle_equipo', id=id))
+
+
+@bp.route('/add', methods=['POST'])
+@login_required
+def add():
+    nuevo = Equipo(
+        nombre=request.form.get('nom'),
+        marca=request.form.get('mar'),
+        categoria=request.form.get('cat'),
+        cantidad_total=int(request.form.get('can') or 1),
+        fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
+    )
+    db.session.add(nuevo)
+    if nuevo.categoria == "Luminarias":
+        nuevo.gestion_individual = True
+    db.session.commit()
+    flash(f"Equipo {nuevo.nombre} añadido al inventario.", "success")
+    return redirect(url_for('equipos.index'))
+
+
+@bp.route('/delete/<int:id>')
+@login_required
+def delete(id):
+    equipo = Equipo.query.get(id)
+    if equipo:
+        nombre = equipo.nombre
+        for doc in equipo.documentos:
+            liberar_archivo(doc.filename)
+        liberar_archivo(equipo.manual_filename)
+        borrar_utilizacion(equipo_id=id)
+        borrar_instantaneas(id)
+        borrar_conciliacion(equipo_id=id)
+        borrar_reservas(equipo_id=id)
+        db.session.delete(equipo)
+        db.session.commit()
+        flash(f"Equipo {nombre} eliminado.", "error")
+    return redirect(url_for('equipos.index'))
@@ -0,0 +1,197 @@
+"""Exportaciones a Excel y CSV"""
+import csv
+import os
+from datetime import datetime, timedelta
+from io import StringIO
+
+from flask import Blueprint, current_app, request, Response, send_file, stream_with_context
+
+from .auth import login_required
+from .cache import version_datos
+from .extensiones import db
+from .modelos import Equipo, EquipoIndividual, Historial, Repuesto, compatibilidad, equipo_repuesto
+
+bp = Blueprint('exportar', __name__)
+
+
+def escribir_hoja(workbook, nombre, encabezados, filas, anchos=None):
+    """Escribe una hoja fila a fila (modo constant_memory: cada fila se vuelca a disco al pasar a la siguiente)"""
+    hoja = workbook.add_worksheet(nombre)
+    negrita = workbook.add_format({'bold': True})
+    for col, ancho in enumerate(anchos or []):
+        hoja.set_column(col, col, ancho)
+    hoja.write_row(0, 0, encabezados, negrita)
+    for i, fila in enumerate(filas, start=1):
+        hoja.write_row(i, 0, ["" if v is None else v for v in fila])
+
+
+def generar_libro_excel(path):
+    """Genera el libro completo (Equipos, Individuales, Repuestos, Historial) sin pasar por pandas"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    por_lotes = {'stream_results': True, 'yield_per': 1000}
+
+    compatibles = (db.select(compatibilidad.c.equipo_id,
+                             db.func.group_concat(Equipo.nombre, ', ').label('nombres'))
+                   .join(Equipo, Equipo.id == compatibilidad.c.compatible_id)
+                   .group_by(compatibilidad.c.equipo_id).subquery())
+    equipos = db.session.execute(
+        db.select(Equipo.id, Equipo.nombre, Equipo.marca, Equipo.categoria, Equipo.cantidad_total,
+                  Equipo.cantidad_en_uso, Equipo.cantidad_total - Equipo.cantidad_en_uso,
+                  db.case((Equipo.danado, "SI"), else_="NO"), Equipo.fecha_ingreso, Equipo.observaciones,
+                  compatibles.c.nombres)
+        .outerjoin(compatibles, compatibles.c.equipo_id == Equipo.id)
+        .order_by(Equipo.id).execution_options(**por_lotes))
+    escribir_hoja(workbook, 'Equipos',
+                  ["ID", "Nombre", "Marca", "Categoría", "Total", "En Uso", "Disponible", "Dañado",
+                   "Fecha Ingreso", "Observaciones", "Compatibles"],
+                  equipos, [6, 35, 15, 20, 8, 8, 10, 8, 12, 40, 40])
+
+    individuales = db.session.execute(
+        db.select(EquipoIndividual.id, Equipo.nombre, EquipoIndividual.numero_fixture, EquipoIndividual.numero_serie,
+                  db.case((EquipoIndividual.en_uso, "SI"), else_="NO"), EquipoIndividual.ubicacion_actual,
+                  db.case((EquipoIndividual.danado, "SI"), else_="NO"), EquipoIndividual.fecha_ingreso,
+                  EquipoIndividual.observaciones_individuales)
+        .join(Equipo, EquipoIndividual.equipo_grupo_id == Equipo.id)
+        .order_by(Equipo.nombre, EquipoIndividual.numero_fixture).execution_options(**por_lotes))
+    escribir_hoja(workbook, 'Individuales',
+                  ["ID", "Equipo", "Fixture", "N° Serie", "En Uso", "Ubicación", "Dañado", "Fecha Ingreso",
+                   "Observaciones"],
+                  individuales, [6, 35, 8, 22, 8, 25, 8, 12, 40])
+
+    vinculados = (db.select(equipo_repuesto.c.repuesto_id,
+                            db.func.group_concat(Equipo.nombre, ', ').label('nombres'))
+                  .join(Equipo, Equipo.id == equipo_repuesto.c.equipo_id)
+                  .group_by(equipo_repuesto.c.repuesto_id).subquery())
+    repuestos_filas = db.session.execute(
+        db.select(Repuesto.id, Repuesto.nombre, Repuesto.marca, Repuesto.categoria, Repuesto.cantidad,
+                  Repuesto.equipo_asociado_texto, vinculados.c.nombres)
+        .outerjoin(vinculados, vinculados.c.repuesto_id == Repuesto.id)
+        .order_by(Repuesto.nombre).execution_options(**por_lotes))
+    escribir_hoja(workbook, 'Repuestos',
+                  ["ID", "Nombre", "Marca", "Categoría", "Cantidad", "Equipo Asociado", "Equipos Vinculados"],
+                  repuestos_filas, [6, 35, 15, 20, 10, 30, 50])
+
+    historial = db.session.execute(
+        db.select(db.func.strftime('%Y-%m-%d %H:%M', Historial.fecha), Equipo.nombre,
+                  EquipoIndividual.numero_fixture, Historial.tipo, Historial.cantidad, Historial.usuario,
+                  db.case((Historial.tipo == 'RETORNO', Historial.estado_al_retorno), else_="-"),
+                  Historial.observaciones)
+        .outerjoin(Equipo, Historial.equipo_id == Equipo.id)
+        .outerjoin(EquipoIndividual, Historial.equipo_individual_id == EquipoIndividual.id)
+        .order_by(Historial.fecha, Historial.id).execution_options(**por_lotes))
+    escribir_hoja(workbook, 'Historial',
+                  ["Fecha", "Equipo", "Fixture", "Tipo", "Cantidad", "Usuario", "Estado Retorno", "Observaciones"],
+                  historial, [17, 35, 8, 10, 9, 25, 15, 40])
+
+    workbook.close()
+
+
+def borrar_cache_excel(carpeta, conservar=None):
+    """Borra los libros cacheados (Inventario_Bodega_v{version}.xlsx) salvo `conservar`"""
+    if not os.path.isdir(carpeta):
+        return
+    for nombre in os.listdir(carpeta):
+        if nombre.startswith('Inventario_Bodega_v') and nombre.endswith('.xlsx') and nombre != conservar:
+            try:
+                os.remove(os.path.join(carpeta, nombre))
+            except FileNotFoundError:
+                pass
+
+
+@bp.route('/exportar')
+@login_required
+def exportar_excel():
+    # El archivo se cachea en disco según la versión de los datos: si nada cambió se sirve tal cual.
+    # Restaurar un respaldo vuelve atrás las versiones, por eso la restauración borra estos archivos.
+    carpeta = current_app.config['CACHE_FOLDER']
+    os.makedirs(carpeta, exist_ok=True)
+    version = version_datos()
+    path = os.path.join(carpeta, f'Inventario_Bodega_v{version}.xlsx')
+
+    if not os.path.exists(path):
+        temporal = f'{path}.{os.getpid()}.tmp'
+        generar_libro_excel(temporal)
+        os.replace(temporal, path)
+        borrar_cache_excel(carpeta, conservar=os.path.basename(path))
+
+    return send_file(
+        path,
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        as_attachment=True,
+        download_name="Inventario_Bodega.xlsx"
+    )
+
+
+def parse_fecha(valor):
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d") if valor else None
+    except ValueError:
+        return None
+
+
+@bp.route('/exportar_movimientos')
+@login_required
+def exportar_movimientos():
+    """CSV de movimientos por rango de fechas, generado fila a fila desde un cursor (memoria constante)"""
+    ahora = datetime.now()
+    desde = parse_fecha(request.args.get('desde')) or ahora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    hasta = parse_fecha(request.args.get('hasta'))
+    # 'hasta' es inclusivo: se compara contra el inicio del día siguiente
+    hasta = hasta + timedelta(days=1) if hasta else None
+    equipo_id = request.args.get('equipo_id', type=int)
+    ubicacion = request.args.get('ubicacion', '').strip()
+
+    consulta = (
+        db.select(Historial.fecha, Equipo.nombre, EquipoIndividual.numero_fixture, Historial.tipo,
+                  Historial.cantidad, Historial.usuario, Historial.estado_al_retorno, Historial.observaciones)
+        .outerjoin(Equipo, Historial.equipo_id == Equipo.id)
+        .outerjoin(EquipoIndividual, Historial.equipo_individual_id == EquipoIndividual.id)
+        .where(Historial.fecha >= desde)
+        .order_by(Historial.fecha, Historial.id)
+    )
+    if hasta:
+        consulta = consulta.where(Historial.fecha < hasta)
+    if equipo_id:
+        consulta = consulta.where(Historial.equipo_id == equipo_id)
+    if ubicacion:
+        consulta = consulta.where(db.func.lower(Historial.usuario) == ubicacion.lower())
+
+    def generar():
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+
+        def volcar():
+            contenido = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return contenido
+
+        buffer.write('\ufeff')  # BOM para que Excel detecte UTF-8
+        writer.writerow(["Fecha", "Equipo", "Fixture", "Tipo", "Cantidad", "Usuario", "Estado Retorno", "Observaciones"])
+        yield volcar()
+
+        filas = db.session.execute(consulta.execution_options(stream_results=True, yield_per=500))
+        for fecha, nombre, fixture, tipo, cantidad, usuario, estado, obs in filas:
+            writer.writerow([
+                fecha.strftime("%Y-%m-%d %H:%M") if fecha else "",
+                nombre or "Unknown",
+                fixture if fixture is not None else "",
+                tipo,
+                cantidad,
+                usuario,
+                estado if tipo == 'RETORNO' else "-",
+                obs,
+            ])
+            if buffer.tell() > 64 * 1024:
+                yield volcar()
+        yield volcar()
+
+    fin = (hasta - timedelta(days=1)) if hasta else ahora
+    nombre_archivo = f"Movimientos_{desde.strftime('%Y_%m_%d')}_{fin.strftime('%Y_%m_%d')}.csv"
+    return Response(
+        stream_with_context(generar()),
+        mimetype="text/csv",
+        headers={"Content-disposition": f"attachment; filename={nombre_archivo}"}
+    )
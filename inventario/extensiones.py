@@ -0,0 +1,43 @@
+"""Extensiones compartidas por los módulos del paquete; create_app las asocia a la aplicación"""
+import click
+from flask import current_app
+from flask_sqlalchemy import SQLAlchemy
+
+from .respaldos import MotorRespaldos
+
+db = SQLAlchemy()
+
+
+def incluir_en_migraciones(objeto, nombre, tipo, reflejado, comparar_con):
+    # Tablas/índices creados con SQL propio (FTS5, R*Tree, contadores) no los administra Alembic
+    if tipo == 'table' and (nombre.startswith(('busqueda_fts', 'reserva_rtree')) or nombre == 'contador_cambios'):
+        return False
+    return True
+
+
+def registrar_migraciones(app, forzar=False):
+    # Flask-Migrate (y Alembic detrás) solo se usan desde `flask db ...`: se registran cuando la app
+    # se carga desde el CLI de Flask (hay un contexto de click activo); gunicorn y los scripts no pagan ese import.
+    # `forzar` es para `python app.py`, que migra antes de levantar el servidor de desarrollo.
+    if not forzar and click.get_current_context(silent=True) is None:
+        return
+    from flask_migrate import Migrate
+    # render_as_batch: SQLite no soporta ALTER de restricciones, Alembic recrea la tabla
+    Migrate(app, db, render_as_batch=True, include_object=incluir_en_migraciones)
+
+
+def registrar_respaldos(app):
+    app.extensions['respaldos'] = MotorRespaldos(
+        app.config['DATABASE_PATH'],
+        app.config['BACKUP_FOLDER'],
+        cada_n_escrituras=app.config['BACKUP_CADA_N_ESCRITURAS'],
+        intervalo_segundos=app.config['BACKUP_INTERVALO_SEGUNDOS'],
+        retencion_horaria=app.config['BACKUP_RETENCION_HORARIA'],
+        retencion_diaria=app.config['BACKUP_RETENCION_DIARIA'],
+        retencion_semanal=app.config['BACKUP_RETENCION_SEMANAL'],
+    )
+
+
+def realizar_backup():
+    # Solo registra la escritura: el respaldo real lo hace el hilo de MotorRespaldos
+    current_app.extensions['respaldos'].registrar_escritura()
@@ -0,0 +1,155 @@
+"""
+Grafo de compatibilidades y repuestos, precalculado en memoria.
+
+Junta las dos relaciones (compatibilidad entre equipos y equipo_repuesto) en listas de adyacencia y
+deja resueltas las dos preguntas frecuentes: qué repuestos sirven para un equipo, contando los de sus
+modelos compatibles, y qué equipos quedan sin repuesto por un Repuesto con stock cero.
+
+Cada proceso guarda su copia junto con la versión de las tablas que lee (contador_cambios, ver
+cache.py): un commit en cualquier worker cambia la versión y la próxima consulta vuelve a armarlo.
+Un movimiento no lo invalida, porque solo depende de la ficha del equipo ('equipo_ficha').
+"""
+import threading
+
+from .cache import version_datos
+from .extensiones import db
+from .modelos import Equipo, Repuesto, compatibilidad, equipo_repuesto
+
+TABLAS_GRAFO = ('equipo_ficha', 'compatibilidad', 'equipo_repuesto', 'repuesto')
+CATEGORIA_REPUESTOS = "Repuestos/Spare"
+
+_grafo = None
+_grafo_lock = threading.Lock()
+
+
+class Grafo:
+    """Listas de adyacencia y respuestas precalculadas para una versión de los datos"""
+
+    def __init__(self, version, equipos, repuestos, enlaces_compatibilidad, enlaces_repuesto):
+        self.version = version
+        self.equipos = equipos          # {id: fila (id, nombre, marca, categoria)}
+        self.repuestos = repuestos      # {id: fila (id, nombre, marca, categoria, cantidad)}
+        # La tabla guarda la compatibilidad en un solo sentido; para consultar vale en los dos
+        self.compatibles = {}
+        for a, b in enlaces_compatibilidad:
+            if a != b and a in equipos and b in equipos:
+                self.compatibles.setdefault(a, set()).add(b)
+                self.compatibles.setdefault(b, set()).add(a)
+        self.repuestos_de = {}
+        for equipo_id, repuesto_id in enlaces_repuesto:
+            if equipo_id in equipos and repuesto_id in repuestos:
+                self.repuestos_de.setdefault(equipo_id, set()).add(repuesto_id)
+
+        # {equipo_id: {repuesto_id: {equipos por los que llega}}}, solo equipos que no son repuestos
+        self.repuestos_por_equipo = {}
+        for equipo_id in equipos:
+            if self.es_repuesto(equipo_id):
+                continue
+            alcanzables = {}
+            for modelo in {equipo_id} | self.modelos_compatibles(equipo_id):
+                for repuesto_id in self.repuestos_de.get(modelo, ()):
+                    alcanzables.setdefault(repuesto_id, set()).add(modelo)
+            if alcanzables:
+                self.repuestos_por_equipo[equipo_id] = alcanzables
+
+        # {repuesto_id sin stock: {equipo_id que lo usa}}
+        self.bloqueos = {}
+        for equipo_id, alcanzables in self.repuestos_por_equipo.items():
+            for repuesto_id in alcanzables:
+                if self.repuestos[repuesto_id].cantidad <= 0:
+                    self.bloqueos.setdefault(repuesto_id, set()).add(equipo_id)
+
+    def es_repuesto(self, equipo_id):
+        return self.equipos[equipo_id].categoria == CATEGORIA_REPUESTOS
+
+    def modelos_compatibles(self, equipo_id):
+        return {c for c in self.compatibles.get(equipo_id, ()) if not self.es_repuesto(c)}
+
+    def equipos_repuesto(self, equipo_id):
+        """Equipos de la categoría de repuestos compatibles con el equipo o con sus modelos compatibles:
+        {equipo_repuesto_id: {equipos por los que llega}}"""
+        alcanzables = {}
+        for modelo in {equipo_id} | self.modelos_compatibles(equipo_id):
+            for c in self.compatibles.get(modelo, ()):
+                if self.es_repuesto(c):
+                    alcanzables.setdefault(c, set()).add(modelo)
+        return alcanzables
+
+
+def cargar_grafo(version):
+    equipos = {f.id: f for f in db.session.execute(
+        db.select(Equipo.id, Equipo.nombre, Equipo.marca, Equipo.categoria))}
+    repuestos = {f.id: f for f in db.session.execute(
+        db.select(Repuesto.id, Repuesto.nombre, Repuesto.marca, Repuesto.categoria,
+                  db.func.coalesce(Repuesto.cantidad, 0).label('cantidad')))}
+    return Grafo(version, equipos, repuestos,
+                 db.session.execute(db.select(compatibilidad.c.equipo_id, compatibilidad.c.compatible_id)).all(),
+                 db.session.execute(db.select(equipo_repuesto.c.equipo_id, equipo_repuesto.c.repuesto_id)).all())
+
+
+def grafo_actual():
+    """El grafo de este proceso; lo vuelve a armar si cambió alguna de las tablas desde la última vez"""
+    global _grafo
+    version = version_datos(*TABLAS_GRAFO)
+    grafo = _grafo
+    if grafo is not None and grafo.version == version:
+        return grafo
+    with _grafo_lock:
+        if _grafo is None or _grafo.version != version:
+            _grafo = cargar_grafo(version)
+        return _grafo
+
+
+def vaciar_grafo():
+    global _grafo
+    with _grafo_lock:
+        _grafo = None
+
+
+def ficha_equipo(grafo, equipo_id):
+    e = grafo.equipos[equipo_id]
+    return {'id': e.id, 'nombre': e.nombre, 'marca': e.marca, 'categoria': e.categoria}
+
+
+def ficha_repuesto(grafo, repuesto_id):
+    r = grafo.repuestos[repuesto_id]
+    return {'id': r.id, 'nombre': r.nombre, 'marca': r.marca, 'categoria': r.categoria, 'cantidad': r.cantidad}
+
+
+def repuestos_para(equipo_id):
+    """Todo lo que sirve de repuesto para un equipo, directo o a través de sus modelos compatibles.
+    `via` son los equipos por los que llega (incluye al propio equipo si está vinculado directo).
+    None si el equipo no existe."""
+    grafo = grafo_actual()
+    if equipo_id not in grafo.equipos:
+        return None
+    alcanzables = grafo.repuestos_por_equipo.get(equipo_id, {})
+    repuestos = [dict(ficha_repuesto(grafo, r), via=sorted(via)) for r, via in alcanzables.items()]
+    repuestos.sort(key=lambda r: (r['nombre'], r['id']))
+    equipos_repuesto = [dict(ficha_equipo(grafo, e), via=sorted(via))
+                        for e, via in grafo.equipos_repuesto(equipo_id).items()]
+    equipos_repuesto.sort(key=lambda e: (e['nombre'], e['id']))
+    compatibles = sorted((ficha_equipo(grafo, c) for c in grafo.modelos_compatibles(equipo_id)),
+                         key=lambda e: (e['nombre'], e['id']))
+    return {'equipo': ficha_equipo(grafo, equipo_id), 'compatibles': compatibles, 'repuestos': repuestos,
+            'equipos_repuesto': equipos_repuesto,
+            'sin_stock': [r['id'] for r in repuestos if r['cantidad'] <= 0]}
+
+
+def bloqueos(repuesto_id=None):
+    """Repuestos con stock cero y los equipos que los usan (directo o por un modelo compatible), y la
+    misma información por equipo. Con `repuesto_id` solo ese repuesto."""
+    grafo = grafo_actual()
+    por_repuesto = grafo.bloqueos
+    if repuesto_id is not None:
+        por_repuesto = {repuesto_id: por_repuesto[repuesto_id]} if repuesto_id in por_repuesto else {}
+    por_equipo = {}
+    for r, equipos in por_repuesto.items():
+        for e in equipos:
+            por_equipo.setdefault(e, []).append(r)
+    return {
+        'repuestos': sorted((dict(ficha_repuesto(grafo, r), equipos=sorted(equipos))
+                             for r, equipos in por_repuesto.items()), key=lambda r: (r['nombre'], r['id'])),
+        'equipos': sorted((dict(ficha_equipo(grafo, e), repuestos_sin_stock=sorted(rs))
+                           for e, rs in por_equipo.items()), key=lambda e: (e['nombre'], e['id'])),
+    }
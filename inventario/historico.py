@@ -0,0 +1,159 @@
+"""
+Estado del inventario a cualquier fecha: qué unidades estaban fuera de bodega y en qué destino.
+
+Reproducir todo el historial en cada consulta crece con los años, así que se guardan puntos de
+control (Instantanea) con los préstamos abiertos justo antes de cada corte, uno cada
+INSTANTANEAS_CADA_DIAS días. Una consulta parte del punto más cercano anterior a la fecha pedida y
+reproduce solo los movimientos posteriores; los cortes que cruza al reproducir quedan guardados para
+la próxima. Los retornos se reparten igual que en utilizacion.py.
+"""
+from datetime import datetime, time, timedelta
+
+from flask import Blueprint, current_app, render_template, request
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .auth import login_required
+from .extensiones import db
+from .modelos import Equipo, EquipoIndividual, Instantanea, InstantaneaPrestamo
+from .utilizacion import LOTE_FILAS, Prestamo, filas_abiertos, movimientos_en_orden, reproducir
+
+bp = Blueprint('historico', __name__)
+
+# Un lunes: con períodos de 7 días los cortes caen los lunes a las 00:00
+EPOCA_CORTES = datetime(2000, 1, 3)
+
+
+def corte_siguiente(fecha):
+    """Primer corte estrictamente posterior a `fecha`"""
+    periodo = timedelta(days=current_app.config['INSTANTANEAS_CADA_DIAS'])
+    return EPOCA_CORTES + ((fecha - EPOCA_CORTES) // periodo + 1) * periodo
+
+
+def parse_momento(valor):
+    """Fecha y hora ISO ('2026-03-03T18:00'); una fecha sola se toma hasta el final de ese día"""
+    if not valor:
+        return None
+    try:
+        if len(valor) == 10:
+            return datetime.combine(datetime.strptime(valor, '%Y-%m-%d').date(), time.max)
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        return None
+
+
+def guardar_instantanea(fecha, abiertos, movimientos):
+    """Guarda el punto de control; si otra petición ya guardó el mismo corte no hace nada"""
+    instantanea_id = db.session.execute(
+        sqlite_insert(Instantanea).values(fecha=fecha, movimientos=movimientos)
+        .on_conflict_do_nothing().returning(Instantanea.id)
+    ).scalar()
+    if instantanea_id is None:
+        return False
+    filas = [dict(f, instantanea_id=instantanea_id) for f in filas_abiertos(abiertos)]
+    for i in range(0, len(filas), LOTE_FILAS):
+        db.session.execute(db.insert(InstantaneaPrestamo), filas[i:i + LOTE_FILAS])
+    return True
+
+
+def borrar_instantaneas(equipo_id):
+    """Al eliminar un equipo se va su historial; sus préstamos tampoco tienen que quedar en los puntos"""
+    db.session.execute(db.delete(InstantaneaPrestamo).where(InstantaneaPrestamo.equipo_id == equipo_id))
+
+
+def estado_en(momento, guardar=True):
+    """Préstamos abiertos al momento dado: ({(equipo_id, ind_id): [Prestamo]}, fecha del punto de
+    control usado o None, movimientos reproducidos). Con `guardar` deja los cortes que cruce."""
+    base = db.session.execute(
+        db.select(Instantanea.id, Instantanea.fecha)
+        .where(Instantanea.fecha <= momento).order_by(Instantanea.fecha.desc()).limit(1)
+    ).first()
+    abiertos = {}
+    if base:
+        for p in db.session.execute(db.select(InstantaneaPrestamo).where(
+                InstantaneaPrestamo.instantanea_id == base.id)).scalars():
+            abiertos.setdefault((p.equipo_id, p.equipo_individual_id), []).append(
+                Prestamo(p.usuario, p.desde, p.cantidad))
+
+    ahora = datetime.now()
+    proximo = corte_siguiente(base.fecha) if base else None
+    reproducidos = desde_corte = 0
+    guardadas = False
+    for equipo_id, ind_id, tipo, usuario, cantidad, fecha in movimientos_en_orden(base.fecha if base else None, momento):
+        if proximo is None:
+            proximo = corte_siguiente(fecha)
+        elif fecha >= proximo:
+            # Semanas sin movimientos no necesitan punto propio: basta el último corte antes de este movimiento
+            corte = corte_siguiente(fecha) - timedelta(days=current_app.config['INSTANTANEAS_CADA_DIAS'])
+            if guardar and corte <= ahora:
+                guardadas |= guardar_instantanea(corte, abiertos, desde_corte)
+            proximo, desde_corte = corte_siguiente(fecha), 0
+        reproducir(abiertos, equipo_id, ind_id, tipo, usuario, cantidad, fecha.date())
+        reproducidos += 1
+        desde_corte += 1
+    if guardadas:
+        db.session.commit()
+    return abiertos, base.fecha if base else None, reproducidos
+
+
+def detalle_estado(abiertos, equipo_id=None, ind_id=None, ubicacion=None):
+    """Filas del estado con nombres de equipo y unidad, ordenadas por destino. Los préstamos de equipos
+    ya eliminados se omiten."""
+    filas = filas_abiertos(abiertos)
+    if equipo_id:
+        filas = [f for f in filas if f['equipo_id'] == equipo_id]
+    if ind_id:
+        filas = [f for f in filas if f['equipo_individual_id'] == ind_id]
+    if ubicacion:
+        filas = [f for f in filas if f['usuario'] == ubicacion]
+    if not filas:
+        return []
+    equipos = {e.id: e for e in db.session.execute(
+        db.select(Equipo.id, Equipo.nombre, Equipo.marca, Equipo.categoria)
+        .where(Equipo.id.in_({f['equipo_id'] for f in filas}))).all()}
+    ids_unidades = {f['equipo_individual_id'] for f in filas} - {0}
+    unidades = {u.id: u for u in db.session.execute(
+        db.select(EquipoIndividual.id, EquipoIndividual.numero_fixture, EquipoIndividual.numero_serie)
+        .where(EquipoIndividual.id.in_(ids_unidades))).all()} if ids_unidades else {}
+
+    detalle = []
+    for f in filas:
+        e = equipos.get(f['equipo_id'])
+        if e is None:
+            continue
+        u = unidades.get(f['equipo_individual_id'])
+        detalle.append(dict(f, nombre=e.nombre, marca=e.marca, categoria=e.categoria,
+                            numero_fixture=u.numero_fixture if u else None,
+                            numero_serie=u.numero_serie if u else None))
+    detalle.sort(key=lambda d: (d['usuario'], d['nombre'], d['numero_fixture'] or 0, d['desde']))
+    return detalle
+
+
+def coincide(fila, texto):
+    """Si la fila corresponde al texto buscado: nombre del equipo, n° de serie o '#12' de fixture"""
+    texto = texto.strip().lower()
+    if texto.startswith('#') and texto[1:].isdigit():
+        return fila['numero_fixture'] == int(texto[1:])
+    return texto in fila['nombre'].lower() or texto in (fila['numero_serie'] or '').lower()
+
+
+@bp.route('/historial/estado')
+@login_required
+def estado():
+    """Dónde estaba cada cosa a una fecha. Con `q` muestra solo los destinos donde había algo que
+    coincide, pero con todo lo que había en ellos."""
+    momento = parse_momento(request.args.get('fecha')) or datetime.now()
+    q = request.args.get('q', '').strip()
+    abiertos, desde_instantanea, reproducidos = estado_en(momento)
+    filas = detalle_estado(abiertos)
+
+    destinos = {}
+    for f in filas:
+        destinos.setdefault(f['usuario'], []).append(f)
+    if q:
+        terminos = q.split()
+        destinos = {d: items for d, items in destinos.items()
+                    if any(all(coincide(f, t) for t in terminos) for f in items)}
+
+    return render_template('estado.html', momento=momento, q=q, destinos=destinos,
+                           unidades=sum(f['cantidad'] for f in filas),
+                           desde_instantanea=desde_instantanea, reproducidos=reproducidos)
@@ -0,0 +1,172 @@
+"""Luminarias y gestión de sus unidades individuales"""
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+from sqlalchemy.exc import IntegrityError
+
+from .auth import login_required
+from .cache import cache_pagina
+from .conciliacion import borrar_conciliacion
+from .extensiones import db
+from .modelos import Equipo, EquipoIndividual, resumen_disponibilidad, subconsulta_disponibilidad
+from .reservas import borrar_reservas
+from .ubicaciones import listar_ubicaciones
+from .utilizacion import borrar_utilizacion
+
+bp = Blueprint('individuales', __name__)
+
+
+@bp.route('/luminarias')
+@login_required
+@cache_pagina('equipo', 'equipo_individual')
+def luminarias():
+    # Cantidades reales desde los individuales (agregadas en SQL); sin unidades se usan las del grupo
+    disp = subconsulta_disponibilidad()
+    filas = db.session.execute(
+        db.select(Equipo.id, Equipo.nombre, Equipo.marca,
+                  db.func.coalesce(disp.c.total, Equipo.cantidad_total).label('total'),
+                  db.func.coalesce(disp.c.en_uso, Equipo.cantidad_en_uso).label('en_uso'),
+                  db.func.coalesce(disp.c.disponibles, Equipo.cantidad_total - Equipo.cantidad_en_uso).label('disponibles'),
+                  db.func.coalesce(disp.c.danados, 0).label('danados'))
+        .outerjoin(disp, disp.c.equipo_id == Equipo.id)
+        .where(Equipo.categoria == 'Luminarias')
+        .order_by(Equipo.nombre.asc())
+    ).all()
+    return render_template('luminarias.html', equipos=filas)
+
+
+@bp.route('/equipo/<int:id>/individuales')
+@login_required
+def gestion_individual(id):
+    """Vista principal de gestión de equipos individuales"""
+    equipo_grupo = Equipo.query.get_or_404(id)
+    
+    if not equipo_grupo.gestion_individual:
+        flash("Este equipo no requiere gestión individual.", "warning")
+        return redirect(url_for('equipos.detalle_equipo', id=id))
+    
+    # Obtener filtros
+    filtro = request.args.get('filtro', 'todos')
+    
+    # Query base
+    query = EquipoIndividual.query.filter_by(equipo_grupo_id=id)
+    
+    # Aplicar filtros
+    if filtro == 'disponibles':
+        query = query.filter_by(en_uso=False, danado=False)
+    elif filtro == 'en_uso':
+        query = query.filter_by(en_uso=True)
+    elif filtro == 'danados':
+        query = query.filter_by(danado=True)
+    
+    equipos_ind = query.order_by(EquipoIndividual.numero_fixture).all()
+    
+    # Estadísticas en una sola consulta agregada
+    stats = resumen_disponibilidad(id)
+    
+    # Ubicaciones para el datalist (catálogo con caché)
+    ubicaciones = listar_ubicaciones()
+
+    return render_template('gestion_individual.html', 
+                         equipo_grupo=equipo_grupo,
+                         equipos_ind=equipos_ind,
+                         filtro=filtro,
+                         stats=stats,
+                         ubicaciones=ubicaciones)
+
+
+@bp.route('/equipo/<int:id>/individual/add', methods=['POST'])
+@login_required
+def add_individual(id):
+    """Agregar un equipo individual manualmente"""
+    equipo_grupo = Equipo.query.get_or_404(id)
+    
+    numero_serie = request.form.get('numero_serie', '').strip()
+    numero_fixture = request.form.get('numero_fixture', type=int)
+    
+    if not numero_serie:
+        flash("El número de serie es obligatorio.", "error")
+        return redirect(url_for('individuales.gestion_individual', id=id))
+    
+    # Verificar que no exista
+    existe = EquipoIndividual.query.filter_by(
+        equipo_grupo_id=id,
+        numero_serie=numero_serie
+    ).first()
+    
+    if existe:
+        flash(f"Ya existe un equipo con el número de serie {numero_serie}.", "error")
+        return redirect(url_for('individuales.gestion_individual', id=id))
+    
+    nuevo = EquipoIndividual(
+        equipo_grupo_id=id,
+        numero_serie=numero_serie,
+        numero_fixture=numero_fixture,
+        fecha_ingreso=datetime.now().strftime("%Y-%m-%d")
+    )
+    
+    db.session.add(nuevo)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Otro request insertó la misma serie entre la verificación y el commit
+        db.session.rollback()
+        flash(f"Ya existe un equipo con el número de serie {numero_serie}.", "error")
+        return redirect(url_for('individuales.gestion_individual', id=id))
+    flash(f"Equipo #{numero_fixture} agregado correctamente.", "success")
+    return redirect(url_for('individuales.gestion_individual', id=id))
+
+
+@bp.route('/equipo/<int:id>/individual/<int:ind_id>/update', methods=['POST'])
+@login_required
+def update_individual(id, ind_id):
+    """Actualizar un equipo individual"""
+    equipo_ind = EquipoIndividual.query.get_or_404(ind_id)
+    
+    if equipo_ind.equipo_grupo_id != id:
+        flash("Equipo no encontrado.", "error")
+        return redirect(url_for('individuales.gestion_individual', id=id))
+    
+    equipo_ind.observaciones_individuales = request.form.get('observaciones', '')
+    
+    db.session.commit()
+    flash(f"Equipo #{equipo_ind.numero_fixture} actualizado.", "success")
+    return redirect(url_for('individuales.gestion_individual', id=id))
+
+
+@bp.route('/equipo/<int:id>/individual/<int:ind_id>/toggle_danado', methods=['POST'])
+@login_required
+def toggle_danado_individual(id, ind_id):
+    """Marcar/desmarcar equipo individual como dañado"""
+    equipo_ind = EquipoIndividual.query.get_or_404(ind_id)
+    
+    if equipo_ind.equipo_grupo_id != id:
+        flash("Equipo no encontrado.", "error")
+        return redirect(url_for('individuales.gestion_individual', id=id))
+    
+    equipo_ind.danado = not equipo_ind.danado
+    db.session.commit()
+    
+    estado = "DAÑADO" if equipo_ind.danado else "OPERATIVO"
+    flash(f"Equipo #{equipo_ind.numero_fixture} marcado como {estado}.", "success")
+    return redirect(url_for('individuales.gestion_individual', id=id))
+
+
+@bp.route('/equipo/<int:id>/individual/<int:ind_id>/delete', methods=['POST'])
+@login_required
+def delete_individual(id, ind_id):
+    """Eliminar un equipo individual"""
+    equipo_ind = EquipoIndividual.query.get_or_404(ind_id)
+    
+    if equipo_ind.equipo_grupo_id != id:
+        flash("Equipo no encontrado.", "error")
+        return redirect(url_for('individuales.gestion_individual', id=id))
+    
+    numero = equipo_ind.numero_fixture
+    borrar_utilizacion(ind_id=ind_id)
+    borrar_conciliacion(ind_id=ind_id)
+    borrar_reservas(ind_id=ind_id)
+    db.session.delete(equipo_ind)
+    db.session.commit()
+    flash(f"Equipo #{numero} eliminado.", "warning")
+    return redirect(url_for('individuales.gestion_individual', id=id))
@@ -0,0 +1,153 @@
+"""
+Métricas y perfilado.
+
+Por endpoint: tiempo total, sentencias y tiempo SQL, tiempo de plantillas y bytes de respuesta.
+Se acumulan en memoria de cada worker (la etiqueta `pid` los distingue en /metrics).
+Un administrador puede pedir un perfil cProfile de un request enviando la cabecera X-Perfilar: 1.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import threading
+import time
+from datetime import datetime
+from io import StringIO
+
+from flask import (Blueprint, Response, abort, before_render_template, current_app, g, has_request_context,
+                   request, session, template_rendered)
+from sqlalchemy import event
+
+bp = Blueprint('metricas', __name__)
+
+log_sql_lento = logging.getLogger('inventario.sql_lento')
+METRICAS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_metricas = {}
+_metricas_lock = threading.Lock()
+
+
+def contar_sentencia_sql(conn, cursor, statement, parameters, context, executemany):
+    # El inicio va en el contexto de la ejecución: si la sentencia falla se descarta junto con él
+    context._inicio_sentencia = time.perf_counter()
+    if has_request_context():
+        g.sql_sentencias = g.get('sql_sentencias', 0) + 1
+
+
+def medir_sentencia_sql(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - context._inicio_sentencia
+    if has_request_context():
+        g.sql_tiempo = g.get('sql_tiempo', 0.0) + duracion
+    if duracion * 1000 >= current_app.config['SQL_LENTA_MS']:
+        ruta = request.endpoint if has_request_context() else '-'
+        log_sql_lento.warning("%.1f ms [%s] %s %s", duracion * 1000, ruta, ' '.join(statement.split()),
+                              parameters if not executemany else f'({len(parameters)} filas)')
+
+
+@bp.after_app_request
+def verificar_presupuesto_sql(response):
+    presupuesto = current_app.config['SQL_PRESUPUESTOS'].get(request.endpoint)
+    usadas = g.get('sql_sentencias', 0)
+    if presupuesto is not None and usadas > presupuesto:
+        mensaje = f"La ruta '{request.endpoint}' ejecutó {usadas} sentencias SQL (presupuesto: {presupuesto})"
+        if current_app.testing or current_app.config['SQL_PRESUPUESTO_ESTRICTO']:
+            raise AssertionError(mensaje)
+        current_app.logger.warning(mensaje)
+    return response
+
+
+def iniciar_render(sender, template, context, **extra):
+    g.render_inicio = time.perf_counter()
+
+
+def terminar_render(sender, template, context, **extra):
+    if 'render_inicio' in g:
+        g.render_tiempo = g.get('render_tiempo', 0.0) + time.perf_counter() - g.pop('render_inicio')
+
+
+@bp.before_app_request
+def iniciar_medicion():
+    g.inicio_request = time.perf_counter()
+    if request.headers.get('X-Perfilar') == '1' and session.get('username', '').lower() in current_app.config['ADMINISTRADORES']:
+        g.perfil = cProfile.Profile()
+        g.perfil.enable()
+
+
+@bp.after_app_request
+def registrar_metricas(response):
+    if 'perfil' in g:
+        g.perfil.disable()
+        response.headers['X-Perfil'] = guardar_perfil(g.perfil)
+    if 'inicio_request' not in g:
+        return response
+    duracion = time.perf_counter() - g.inicio_request
+    clave = (request.endpoint or 'sin_ruta', request.method, response.status_code)
+    with _metricas_lock:
+        m = _metricas.setdefault(clave, {'n': 0, 'segundos': 0.0, 'buckets': [0] * len(METRICAS_BUCKETS),
+                                         'sql': 0, 'sql_segundos': 0.0, 'render_segundos': 0.0, 'bytes': 0})
+        m['n'] += 1
+        m['segundos'] += duracion
+        for i, limite in enumerate(METRICAS_BUCKETS):
+            if duracion <= limite:
+                m['buckets'][i] += 1
+        m['sql'] += g.get('sql_sentencias', 0)
+        m['sql_segundos'] += g.get('sql_tiempo', 0.0)
+        m['render_segundos'] += g.get('render_tiempo', 0.0)
+        m['bytes'] += response.calculate_content_length() or 0  # las respuestas en streaming no tienen largo
+    return response
+
+
+def guardar_perfil(perfil):
+    """Guarda el perfil (.prof, abrir con pstats/snakeviz) y registra las 20 funciones más costosas"""
+    os.makedirs(current_app.config['PERFILES_FOLDER'], exist_ok=True)
+    nombre = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{request.endpoint or 'sin_ruta'}.prof"
+    perfil.dump_stats(os.path.join(current_app.config['PERFILES_FOLDER'], nombre))
+    resumen = StringIO()
+    pstats.Stats(perfil, stream=resumen).sort_stats('cumulative').print_stats(20)
+    current_app.logger.info("Perfil de %s %s (%s):\n%s", request.method, request.full_path, nombre, resumen.getvalue())
+    return nombre
+
+
+@bp.route('/metrics')
+def metricas():
+    """Métricas en formato de texto de Prometheus (con METRICAS_TOKEN se pide como Bearer; si no, sesión iniciada)"""
+    token = current_app.config['METRICAS_TOKEN']
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+    elif 'user_id' not in session:
+        abort(401)
+
+    pid = os.getpid()
+    series = {
+        'inventario_requests_total': ('counter', 'Requests atendidos', 'n'),
+        'inventario_sql_statements_total': ('counter', 'Sentencias SQL ejecutadas', 'sql'),
+        'inventario_sql_duration_seconds_total': ('counter', 'Tiempo en SQL', 'sql_segundos'),
+        'inventario_template_render_seconds_total': ('counter', 'Tiempo renderizando plantillas', 'render_segundos'),
+        'inventario_response_bytes_total': ('counter', 'Bytes de respuesta (sin contar streaming)', 'bytes'),
+    }
+    with _metricas_lock:
+        datos = {clave: dict(m, buckets=list(m['buckets'])) for clave, m in _metricas.items()}
+
+    lineas = ['# HELP inventario_request_duration_seconds Duración de los requests',
+              '# TYPE inventario_request_duration_seconds histogram']
+    for (endpoint, metodo, estado), m in sorted(datos.items()):
+        etiquetas = f'endpoint="{endpoint}",method="{metodo}",status="{estado}",pid="{pid}"'
+        for limite, cantidad in zip(METRICAS_BUCKETS, m['buckets']):
+            lineas.append(f'inventario_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {cantidad}')
+        lineas.append(f'inventario_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} {m["n"]}')
+        lineas.append(f'inventario_request_duration_seconds_sum{{{etiquetas}}} {m["segundos"]:.6f}')
+        lineas.append(f'inventario_request_duration_seconds_count{{{etiquetas}}} {m["n"]}')
+    for nombre, (tipo, ayuda, campo) in series.items():
+        lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+        for (endpoint, metodo, estado), m in sorted(datos.items()):
+            lineas.append(f'{nombre}{{endpoint="{endpoint}",method="{metodo}",status="{estado}",pid="{pid}"}} {m[campo]}')
+    return Response('\n'.join(lineas) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def instrumentar(app, motor):
+    """Conecta la medición de plantillas de `app` y de las sentencias SQL de `motor`"""
+    before_render_template.connect(iniciar_render, app)
+    template_rendered.connect(terminar_render, app)
+    event.listen(motor, 'before_cursor_execute', contar_sentencia_sql)
+    event.listen(motor, 'after_cursor_execute', medir_sentencia_sql)
+
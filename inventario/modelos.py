@@ -0,0 +1,228 @@
+"""Modelos de la base de datos y consultas de disponibilidad compartidas"""
+from datetime import datetime
+
+from .extensiones import db
+
+
+class Equipo(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    categoria = db.Column(db.String(50), nullable=False, index=True)
+    marca = db.Column(db.String(50))
+    cantidad_total = db.Column(db.Integer, default=1)
+    cantidad_en_uso = db.Column(db.Integer, default=0)
+    fecha_ingreso = db.Column(db.String(10)) 
+    observaciones = db.Column(db.Text, default="")
+    danado = db.Column(db.Boolean, default=False) # Nuevo: Indicar si el equipo está dañado
+    manual_filename = db.Column(db.String(200))
+    gestion_individual = db.Column(db.Boolean, default=False) # True para equipos que se gestionan individualmente (ej: Luminarias)
+    movimientos = db.relationship('Historial', backref='equipo', cascade="all, delete-orphan")
+    documentos = db.relationship('Documento', backref='equipo', cascade="all, delete-orphan")
+    
+    # Relación de compatibilidad (Muchos a Muchos)
+    compatibles = db.relationship(
+        'Equipo', 
+        secondary='compatibilidad',
+        primaryjoin='Equipo.id==compatibilidad.c.equipo_id',
+        secondaryjoin='Equipo.id==compatibilidad.c.compatible_id',
+        backref='es_compatible_con'
+    )
+
+
+# Tabla de asociación para compatibilidad
+compatibilidad = db.Table('compatibilidad',
+    db.Column('equipo_id', db.Integer, db.ForeignKey('equipo.id'), primary_key=True),
+    db.Column('compatible_id', db.Integer, db.ForeignKey('equipo.id'), primary_key=True)
+)
+
+
+class Historial(db.Model):
+    # AUTOINCREMENT: un id no se vuelve a usar aunque se borren los movimientos más nuevos (al eliminar un
+    # equipo). La conciliación y /api/v1/movimientos?desde_id= leen "lo nuevo" como id mayor a una marca.
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = db.Column(db.Integer, primary_key=True)
+    equipo_id = db.Column(db.Integer, db.ForeignKey('equipo.id'), nullable=False, index=True)
+    tipo = db.Column(db.String(20)) 
+    usuario = db.Column(db.String(100), index=True)
+    cantidad = db.Column(db.Integer, default=1) 
+    observaciones = db.Column(db.Text, default="") # Nuevo: Observaciones del movimiento
+    estado_al_retorno = db.Column(db.String(50), default="Buen Estado") # Nuevo: Estado reportado (Dañado/OK)
+    fecha = db.Column(db.DateTime, default=datetime.now, index=True)
+    equipo_individual_id = db.Column(db.Integer, db.ForeignKey('equipo_individual.id'), nullable=True, index=True) # Vinculación opcional con equipo individual
+
+
+# Tabla de asociación para Equipo - Repuesto
+equipo_repuesto = db.Table('equipo_repuesto',
+    db.Column('equipo_id', db.Integer, db.ForeignKey('equipo.id'), primary_key=True),
+    db.Column('repuesto_id', db.Integer, db.ForeignKey('repuesto.id'), primary_key=True)
+)
+
+
+class Repuesto(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), nullable=False)
+    marca = db.Column(db.String(50))
+    categoria = db.Column(db.String(50)) 
+    cantidad = db.Column(db.Integer, default=1)
+    equipo_asociado_texto = db.Column(db.String(200)) # Detalle textual del equipo/serie asociado
+    
+    # Relación con Equipos (Luminarias u otros)
+    equipos = db.relationship('Equipo', secondary=equipo_repuesto, backref=db.backref('repuestos_asociados'))
+
+
+class Documento(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    equipo_id = db.Column(db.Integer, db.ForeignKey('equipo.id'), nullable=False)
+    filename = db.Column(db.String(200), nullable=False)
+    nombre_referencial = db.Column(db.String(100), nullable=False)
+
+
+class Archivo(db.Model):
+    """Archivo subido, guardado una vez como {sha256}.{ext}; Documento/Equipo lo referencian por filename.
+    Igual contenido con otra extensión es otro archivo (otra fila)."""
+    filename = db.Column(db.String(200), primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    tamano = db.Column(db.Integer)
+    referencias = db.Column(db.Integer, default=0, nullable=False)
+
+
+class EquipoIndividual(db.Model):
+    """Modelo para gestión individual de equipos (principalmente Luminarias)"""
+    __table_args__ = (
+        # Un número de serie no se repite dentro del mismo grupo (también sirve de índice por grupo)
+        db.Index('uq_equipo_individual_grupo_serie', 'equipo_grupo_id', 'numero_serie', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    equipo_grupo_id = db.Column(db.Integer, db.ForeignKey('equipo.id'), nullable=False)
+    numero_serie = db.Column(db.String(100), nullable=False)
+    numero_fixture = db.Column(db.Integer)  # Número físico del equipo (1, 2, 3...)
+    danado = db.Column(db.Boolean, default=False)
+    observaciones_individuales = db.Column(db.Text, default="")
+    fecha_ingreso = db.Column(db.String(10))
+    en_uso = db.Column(db.Boolean, default=False)
+    ubicacion_actual = db.Column(db.String(200))  # Última ubicación registrada
+    
+    # Relación con el grupo
+    equipo_grupo = db.relationship('Equipo', backref='equipos_individuales')
+    # Relación con historial
+    movimientos = db.relationship('Historial', backref='equipo_individual', foreign_keys='Historial.equipo_individual_id')
+
+
+class Ubicacion(db.Model):
+    """Catálogo de destinos usados en movimientos (alimenta los datalist de ubicaciones)"""
+    id = db.Column(db.Integer, primary_key=True)
+    nombre = db.Column(db.String(100), unique=True, nullable=False)
+    usos = db.Column(db.Integer, default=0, nullable=False)
+    ultimo_uso = db.Column(db.DateTime)
+
+
+class UsoDiario(db.Model):
+    """Resumen diario de utilización: unidades fuera de bodega por día, equipo, unidad individual y destino.
+    Lo mantiene utilizacion.py al registrar movimientos; equipo_individual_id = 0 para equipos por cantidad."""
+    # Sin rowid la tabla queda ordenada por la clave: un rango de días se lee de corrido
+    __table_args__ = {'sqlite_with_rowid': False}
+    dia = db.Column(db.Date, primary_key=True)
+    equipo_id = db.Column(db.Integer, primary_key=True)
+    equipo_individual_id = db.Column(db.Integer, primary_key=True, default=0)
+    usuario = db.Column(db.String(100), primary_key=True)
+    unidades = db.Column(db.Integer, default=0, nullable=False)  # unidades fuera ese día: su suma son días-unidad
+    salidas = db.Column(db.Integer, default=0, nullable=False)
+    retornos = db.Column(db.Integer, default=0, nullable=False)
+
+
+class PrestamoAbierto(db.Model):
+    """Unidades que siguen fuera de bodega; sus días pasan a UsoDiario cuando vuelven"""
+    __table_args__ = (
+        db.Index('uq_prestamo_abierto', 'equipo_id', 'equipo_individual_id', 'usuario', 'desde', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    equipo_id = db.Column(db.Integer, nullable=False)
+    equipo_individual_id = db.Column(db.Integer, default=0, nullable=False)
+    usuario = db.Column(db.String(100), nullable=False)
+    desde = db.Column(db.Date, nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False)
+
+
+class Instantanea(db.Model):
+    """Punto de control del historial: los préstamos abiertos justo antes de `fecha` (ver historico.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.DateTime, nullable=False, unique=True)
+    movimientos = db.Column(db.Integer, nullable=False)  # movimientos reproducidos desde el punto anterior
+
+
+class InstantaneaPrestamo(db.Model):
+    """Unidades fuera de bodega en una instantánea; equipo_individual_id = 0 para equipos por cantidad"""
+    __table_args__ = {'sqlite_with_rowid': False}
+    instantanea_id = db.Column(db.Integer, db.ForeignKey('instantanea.id'), primary_key=True)
+    equipo_id = db.Column(db.Integer, primary_key=True)
+    equipo_individual_id = db.Column(db.Integer, primary_key=True, default=0)
+    usuario = db.Column(db.String(100), primary_key=True)
+    desde = db.Column(db.Date, primary_key=True)
+    cantidad = db.Column(db.Integer, nullable=False)
+
+
+class Conciliacion(db.Model):
+    """Estado de la conciliación de contadores (una sola fila, ver conciliacion.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    ultimo_historial_id = db.Column(db.Integer, default=0, nullable=False)  # movimientos ya agregados
+    proxima = db.Column(db.DateTime)  # turno de la corrida programada
+    ultima = db.Column(db.DateTime)
+    discrepancias = db.Column(db.Integer, default=0, nullable=False)
+
+
+class SaldoEquipo(db.Model):
+    """Salidas y retornos acumulados por equipo hasta Conciliacion.ultimo_historial_id"""
+    equipo_id = db.Column(db.Integer, primary_key=True)
+    salidas = db.Column(db.Integer, default=0, nullable=False)
+    retornos = db.Column(db.Integer, default=0, nullable=False)
+
+
+class UltimoMovimientoUnidad(db.Model):
+    """Último movimiento de cada unidad individual hasta Conciliacion.ultimo_historial_id"""
+    equipo_individual_id = db.Column(db.Integer, primary_key=True)
+    historial_id = db.Column(db.Integer, nullable=False)
+    tipo = db.Column(db.String(20), nullable=False)
+    usuario = db.Column(db.String(100))
+
+
+class Reserva(db.Model):
+    """Unidades comprometidas para un destino entre inicio y fin (intervalo [inicio, fin)). Sin
+    equipo_individual_id reserva `cantidad` unidades cualquiera del equipo. Las consultas por rango
+    usan el índice de intervalos reserva_rtree (ver reservas.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    equipo_id = db.Column(db.Integer, db.ForeignKey('equipo.id'), nullable=False, index=True)
+    equipo_individual_id = db.Column(db.Integer, db.ForeignKey('equipo_individual.id'), index=True)
+    cantidad = db.Column(db.Integer, default=1, nullable=False)
+    usuario = db.Column(db.String(100), nullable=False)  # destino, como en Historial
+    inicio = db.Column(db.DateTime, nullable=False)
+    fin = db.Column(db.DateTime, nullable=False)
+    retiradas = db.Column(db.Integer, default=0, nullable=False)  # unidades que ya salieron con esta reserva
+    observaciones = db.Column(db.Text, default="")
+    creada = db.Column(db.DateTime, default=datetime.now)
+
+
+class Usuario(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(50), unique=True, nullable=False)
+    password_hash = db.Column(db.String(200), nullable=False)
+
+
+def subconsulta_disponibilidad():
+    """Totales por grupo (total/disponibles/en_uso/danados) agregados en SQL sobre equipo_individual"""
+    en_uso = db.func.coalesce(EquipoIndividual.en_uso, False)
+    danado = db.func.coalesce(EquipoIndividual.danado, False)
+    return (db.select(
+        EquipoIndividual.equipo_grupo_id.label('equipo_id'),
+        db.func.count(EquipoIndividual.id).label('total'),
+        db.func.sum(db.case((db.or_(en_uso, danado), 0), else_=1)).label('disponibles'),
+        db.func.sum(db.case((en_uso, 1), else_=0)).label('en_uso'),
+        db.func.sum(db.case((danado, 1), else_=0)).label('danados'),
+    ).group_by(EquipoIndividual.equipo_grupo_id).subquery('disponibilidad'))
+
+
+def resumen_disponibilidad(equipo_id):
+    disp = subconsulta_disponibilidad()
+    fila = db.session.execute(db.select(disp).where(disp.c.equipo_id == equipo_id)).mappings().first()
+    if fila is None:
+        return {'total': 0, 'disponibles': 0, 'en_uso': 0, 'danados': 0}
+    return {k: fila[k] for k in ('total', 'disponibles', 'en_uso', 'danados')}
@@ -0,0 +1,384 @@
+"""Salidas y retornos (de a uno, en lote y por kit), reservas de kit e historial"""
+from datetime import datetime
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, Response, url_for
+
+from .auth import login_required
+from .extensiones import db, realizar_backup
+from .modelos import Equipo, EquipoIndividual, Historial, Reserva, subconsulta_disponibilidad
+from .reservas import comprometidas, parse_intervalo, por_retirar, reservar, retirar_reservas
+from .ubicaciones import listar_ubicaciones, registrar_ubicacion
+from .utilizacion import registrar_movimiento
+
+bp = Blueprint('movimientos', __name__)
+
+
+class ConflictoStock(Exception):
+    """Otro request cambió el stock entre la validación y la escritura"""
+
+
+def aplicar_movimiento(e, tipo, cantidad, ubicacion, observaciones='', estado='Buen Estado', ind=None):
+    """Aplica un movimiento: contadores del grupo, estado del individual y registro en Historial.
+
+    Los contadores se actualizan con UPDATE condicionales (la condición de stock va en el WHERE),
+    así dos workers que registran a la vez no pueden sobreasignar ni pisarse. Una salida además deja
+    las unidades reservadas por otros destinos (ver reservas.py) y retira las reservas del suyo. Si la
+    condición no se cumple se lanza ConflictoStock y el llamador debe hacer rollback."""
+    ahora = datetime.now()
+    if tipo == 'prestar':
+        de_otros = db.and_(por_retirar(ahora, [e.id]), Reserva.usuario != ubicacion, Reserva.retiradas < Reserva.cantidad)
+        reservadas = (db.select(db.func.coalesce(db.func.sum(Reserva.cantidad - Reserva.retiradas), 0))
+                      .where(de_otros).scalar_subquery())
+        actualizado = db.session.execute(
+            db.update(Equipo)
+            .where(Equipo.id == e.id, Equipo.cantidad_total - Equipo.cantidad_en_uso - reservadas >= cantidad)
+            .values(cantidad_en_uso=Equipo.cantidad_en_uso + cantidad)
+        ).rowcount
+        if not actualizado:
+            raise ConflictoStock(f"{e.nombre}: ya no quedan {cantidad} disponibles sin tocar reservas de otros destinos.")
+        if ind:
+            actualizado = db.session.execute(
+                db.update(EquipoIndividual)
+                .where(EquipoIndividual.id == ind.id, ~db.func.coalesce(EquipoIndividual.en_uso, False),
+                       ~db.exists().where(de_otros, Reserva.equipo_individual_id == ind.id))
+                .values(en_uso=True, ubicacion_actual=ubicacion)
+            ).rowcount
+            if not actualizado:
+                raise ConflictoStock(f"{e.nombre} #{ind.numero_fixture}: ya tiene una salida registrada o está reservado.")
+        retirar_reservas(e.id, ind.id if ind else None, ubicacion, cantidad, ahora)
+        nuevo_h = Historial(equipo_id=e.id, tipo='SALIDA', usuario=ubicacion, cantidad=cantidad, fecha=ahora,
+                            observaciones=observaciones, equipo_individual_id=ind.id if ind else None)
+    else:
+        valores = {'cantidad_en_uso': Equipo.cantidad_en_uso - cantidad}
+        # Si se marca como dañado a nivel de grupo (solo para equipos sin gestión individual)
+        if estado == 'Dañado' and not e.gestion_individual:
+            valores['danado'] = True
+        actualizado = db.session.execute(
+            db.update(Equipo)
+            .where(Equipo.id == e.id, Equipo.cantidad_en_uso >= cantidad)
+            .values(**valores)
+        ).rowcount
+        if not actualizado:
+            raise ConflictoStock(f"{e.nombre}: ya no hay {cantidad} en uso para devolver.")
+        if ind:
+            valores_ind = {'en_uso': False, 'ubicacion_actual': "Bodega"}
+            if estado == 'Dañado':
+                valores_ind['danado'] = True
+            actualizado = db.session.execute(
+                db.update(EquipoIndividual)
+                .where(EquipoIndividual.id == ind.id, EquipoIndividual.en_uso == True)
+                .values(**valores_ind)
+            ).rowcount
+            if not actualizado:
+                raise ConflictoStock(f"{e.nombre} #{ind.numero_fixture}: ya fue devuelto.")
+        nuevo_h = Historial(equipo_id=e.id, tipo='RETORNO', usuario=ubicacion, cantidad=cantidad, fecha=ahora,
+                            observaciones=observaciones, estado_al_retorno=estado,
+                            equipo_individual_id=ind.id if ind else None)
+    db.session.add(nuevo_h)
+    registrar_movimiento(nuevo_h)
+    return nuevo_h
+
+
+@bp.route('/movimiento/<int:id>/<tipo>', methods=['POST'])
+@login_required
+def movimiento(id, tipo):
+    e = Equipo.query.get_or_404(id)
+    # Cambiado de 'usuario' a 'donde' (ubicación física)
+    ubicacion = request.form.get('donde', 'Sin Destino').strip() or "Sin Destino"
+    obs_movimiento = request.form.get('observaciones_movimiento', '').strip()
+    
+    try:
+        cant_lote = int(request.form.get('cant_lote') or 1)
+        if cant_lote < 1:
+            flash("La cantidad debe ser al menos 1.", "warning")
+            return redirect(request.referrer or url_for('equipos.index'))
+    except ValueError:
+        cant_lote = 1
+
+    ind_id = request.form.get('ind_id', type=int)
+    # Si se especificó un equipo individual
+    ind = EquipoIndividual.query.get(ind_id) if ind_id else None
+    
+    try:
+        if tipo == 'prestar':
+            reservadas, unidades_reservadas = comprometidas([e.id], ubicacion)
+            reservadas = reservadas.get(e.id, 0)
+            disponible = e.cantidad_total - e.cantidad_en_uso - reservadas
+            if ind and ind.id in unidades_reservadas:
+                flash(f"Error: {e.nombre} #{ind.numero_fixture} está reservado para {unidades_reservadas[ind.id]}.", "error")
+            elif cant_lote <= disponible:
+                aplicar_movimiento(e, tipo, cant_lote, ubicacion, obs_movimiento, ind=ind)
+                registrar_ubicacion(ubicacion)
+                flash(f"Salida registrada: {cant_lote} x {e.nombre} para {ubicacion}", "warning")
+            elif reservadas:
+                flash(f"Error: Solo quedan {max(disponible, 0)} disponibles ({reservadas} reservadas para otros destinos).", "error")
+            else:
+                flash(f"Error: Solo quedan {disponible} disponibles.", "error")
+        elif tipo == 'devolver':
+            if cant_lote <= e.cantidad_en_uso: 
+                estado = request.form.get('estado_retorno', 'Buen Estado')
+                aplicar_movimiento(e, tipo, cant_lote, ubicacion, obs_movimiento, estado=estado, ind=ind)
+                registrar_ubicacion(ubicacion)
+                flash(f"Retorno registrado: {cant_lote} x {e.nombre} ({estado})", "success")
+            else:
+                flash(f"Error: Solo hay {e.cantidad_en_uso} en uso actualmente.", "error")
+        db.session.commit()
+    except ConflictoStock as conflicto:
+        # Otro usuario registró un movimiento del mismo equipo al mismo tiempo
+        db.session.rollback()
+        flash(f"Conflicto: {conflicto} Otro usuario acaba de registrar un movimiento; revisa el stock e intenta de nuevo.", "error")
+        return redirect(request.referrer or url_for('equipos.index'))
+
+    realizar_backup() # Sistema de Backup Automático
+    return redirect(request.referrer or url_for('equipos.index'))
+
+
+def leer_lineas_lote():
+    """Líneas del lote como dicts equipo_id/cantidad/ind_id, desde JSON o desde el formulario del kit.
+    En el formulario, una línea con fixtures ('1, 4, 7') se expande a una línea por individual."""
+    if request.is_json:
+        datos = request.get_json(silent=True) or {}
+        lineas = []
+        for l in datos.get('lineas', []):
+            try:
+                lineas.append({'equipo_id': int(l['equipo_id']), 'cantidad': int(l.get('cantidad') or 1),
+                               'ind_id': int(l['ind_id']) if l.get('ind_id') else None})
+            except (KeyError, TypeError, ValueError):
+                continue
+        return lineas
+
+    lineas, pedidos_fixture = [], []
+    for equipo_id, cantidad, fixtures in zip(request.form.getlist('equipo_id'), request.form.getlist('cantidad'),
+                                             request.form.getlist('fixtures')):
+        if not equipo_id:
+            continue
+        numeros = [int(n) for n in fixtures.replace(',', ' ').split() if n.strip().isdigit()]
+        if numeros:
+            pedidos_fixture.extend((int(equipo_id), n) for n in numeros)
+        else:
+            lineas.append({'equipo_id': int(equipo_id), 'cantidad': int(cantidad or 1), 'ind_id': None})
+
+    if pedidos_fixture:
+        # Una consulta para traducir todos los números de fixture a individuales
+        encontrados = {(i.equipo_grupo_id, i.numero_fixture): i.id for i in EquipoIndividual.query.filter(
+            db.tuple_(EquipoIndividual.equipo_grupo_id, EquipoIndividual.numero_fixture).in_(pedidos_fixture))}
+        for clave in pedidos_fixture:
+            lineas.append({'equipo_id': clave[0], 'cantidad': 1, 'ind_id': encontrados.get(clave), 'fixture': clave[1]})
+    return lineas
+
+
+def validar_lote(lineas, tipo, ubicacion=None):
+    """Valida todas las líneas contra el estado actual y las reservas de otros destinos.
+    Devuelve (equipos, individuales, errores)."""
+    equipos = {e.id: e for e in Equipo.query.filter(Equipo.id.in_({l['equipo_id'] for l in lineas}))}
+    ind_ids = {l['ind_id'] for l in lineas if l['ind_id']}
+    individuales = ({i.id: i for i in EquipoIndividual.query.filter(EquipoIndividual.id.in_(ind_ids))}
+                    if ind_ids else {})
+    reservadas, unidades_reservadas = comprometidas(list(equipos), ubicacion) if tipo == 'prestar' else ({}, {})
+
+    errores = []
+    pedido = {}
+    vistos = set()
+    for l in lineas:
+        e = equipos.get(l['equipo_id'])
+        if e is None:
+            errores.append(f"El equipo #{l['equipo_id']} no existe.")
+            continue
+        if l['cantidad'] < 1:
+            errores.append(f"{e.nombre}: la cantidad debe ser al menos 1.")
+            continue
+        if l['ind_id'] or l.get('fixture'):
+            ind = individuales.get(l['ind_id'])
+            if ind is None or ind.equipo_grupo_id != e.id:
+                unidad = f"#{l['fixture']}" if l.get('fixture') else f"(id {l['ind_id']})"
+                errores.append(f"{e.nombre}: la unidad {unidad} no existe.")
+                continue
+            if ind.id in vistos:
+                errores.append(f"{e.nombre} #{ind.numero_fixture}: está repetido en el lote.")
+                continue
+            vistos.add(ind.id)
+            if tipo == 'prestar' and (ind.en_uso or ind.danado):
+                errores.append(f"{e.nombre} #{ind.numero_fixture}: no está disponible.")
+            elif tipo == 'prestar' and ind.id in unidades_reservadas:
+                errores.append(f"{e.nombre} #{ind.numero_fixture}: está reservado para {unidades_reservadas[ind.id]}.")
+            elif tipo == 'devolver' and not ind.en_uso:
+                errores.append(f"{e.nombre} #{ind.numero_fixture}: no está en uso.")
+        pedido[e.id] = pedido.get(e.id, 0) + l['cantidad']
+
+    for equipo_id, cantidad in pedido.items():
+        e = equipos[equipo_id]
+        libres = e.cantidad_total - e.cantidad_en_uso - reservadas.get(equipo_id, 0)
+        if tipo == 'prestar' and cantidad > libres:
+            detalle = f" ({reservadas[equipo_id]} reservadas para otros destinos)" if reservadas.get(equipo_id) else ""
+            errores.append(f"{e.nombre}: se piden {cantidad} y solo quedan {max(libres, 0)} disponibles{detalle}.")
+        elif tipo == 'devolver' and cantidad > e.cantidad_en_uso:
+            errores.append(f"{e.nombre}: se devuelven {cantidad} y solo hay {e.cantidad_en_uso} en uso.")
+    return equipos, individuales, errores
+
+
+@bp.route('/movimiento/lote', methods=['POST'])
+@login_required
+def movimiento_lote():
+    """Salida o retorno de un kit completo: todo se valida junto y se escribe en una sola transacción"""
+    datos = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    tipo = datos.get('tipo', 'prestar')
+    ubicacion = (datos.get('donde') or '').strip() or "Sin Destino"
+    obs_movimiento = (datos.get('observaciones_movimiento') or '').strip()
+    estado = datos.get('estado_retorno') or 'Buen Estado'
+    lineas = leer_lineas_lote()
+
+    errores = []
+    if tipo not in ('prestar', 'devolver'):
+        errores.append("Tipo de movimiento inválido.")
+    if not lineas:
+        errores.append("El lote no tiene líneas.")
+    if not errores:
+        equipos, individuales, errores = validar_lote(lineas, tipo, ubicacion)
+
+    if errores:
+        if request.is_json:
+            return jsonify(ok=False, errores=errores), 409
+        for error in errores:
+            flash(f"Error: {error}", "error")
+        flash("No se registró ningún movimiento del lote.", "warning")
+        return redirect(request.referrer or url_for('movimientos.kit'))
+
+    try:
+        for l in lineas:
+            ind = individuales.get(l['ind_id']) if l['ind_id'] else None
+            aplicar_movimiento(equipos[l['equipo_id']], tipo, l['cantidad'], ubicacion, obs_movimiento,
+                               estado=estado, ind=ind)
+        registrar_ubicacion(ubicacion)
+        db.session.commit()
+    except ConflictoStock as conflicto:
+        # Todo el lote se descarta: o se registra completo o no se registra nada
+        db.session.rollback()
+        if request.is_json:
+            return jsonify(ok=False, errores=[str(conflicto)]), 409
+        flash(f"Conflicto: {conflicto} No se registró ningún movimiento del lote.", "error")
+        return redirect(request.referrer or url_for('movimientos.kit'))
+    realizar_backup()
+
+    total = sum(l['cantidad'] for l in lineas)
+    if request.is_json:
+        return jsonify(ok=True, movimientos=len(lineas), unidades=total)
+    accion = "Salida" if tipo == 'prestar' else "Retorno"
+    flash(f"{accion} de kit registrada: {total} unidades en {len(lineas)} líneas ({ubicacion})",
+          "warning" if tipo == 'prestar' else "success")
+    return redirect(url_for('movimientos.kit'))
+
+
+@bp.route('/reservas/lote', methods=['POST'])
+@login_required
+def reservar_lote():
+    """Reserva un kit completo: todas las líneas se validan juntas y se guardan o no se guarda ninguna"""
+    datos = (request.get_json(silent=True) or {}) if request.is_json else request.form
+    usuario = (datos.get('donde') or '').strip() or "Sin Destino"
+    inicio, fin = parse_intervalo(datos.get('desde'), datos.get('hasta'))
+    lineas = leer_lineas_lote()
+
+    errores = []
+    if inicio is None:
+        errores.append("Rango de fechas inválido: el fin tiene que ser posterior al inicio.")
+    if not lineas:
+        errores.append("El lote no tiene líneas.")
+    if not errores:
+        errores = reservar(lineas, usuario, inicio, fin, (datos.get('observaciones_movimiento') or '').strip())
+    if errores:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify(ok=False, errores=errores), 409
+        for error in errores:
+            flash(f"Error: {error}", "error")
+        flash("No se guardó ninguna reserva del lote.", "warning")
+        return redirect(request.referrer or url_for('movimientos.kit'))
+    db.session.commit()
+    realizar_backup()
+
+    total = sum(l['cantidad'] for l in lineas)
+    if request.is_json:
+        return jsonify(ok=True, reservas=len(lineas), unidades=total)
+    flash(f"Reserva registrada: {total} unidades para {usuario} ({inicio:%d/%m %H:%M} - {fin:%d/%m %H:%M})", "success")
+    return redirect(url_for('reservas.listar'))
+
+
+@bp.route('/kit')
+@login_required
+def kit():
+    disp = subconsulta_disponibilidad()
+    equipos = db.session.execute(
+        db.select(Equipo.id, Equipo.nombre, Equipo.categoria, Equipo.gestion_individual,
+                  (Equipo.cantidad_total - Equipo.cantidad_en_uso).label('disponibles'),
+                  Equipo.cantidad_en_uso.label('en_uso'),
+                  db.func.coalesce(disp.c.total, 0).label('unidades'))
+        .outerjoin(disp, disp.c.equipo_id == Equipo.id)
+        .order_by(Equipo.categoria, Equipo.nombre)
+    ).all()
+    return render_template('kit.html', equipos=equipos, ubicaciones=listar_ubicaciones())
+
+
+HISTORIAL_POR_PAGINA = 50
+
+
+@bp.route('/historial')
+@login_required
+def mostrar_historial():
+    """Historial paginado por keyset sobre (fecha, id): cada página cuesta lo mismo sin importar el largo total"""
+    filtros = {
+        'equipo': request.args.get('equipo', '').strip(),
+        'serie': request.args.get('serie', '').strip(),
+        'usuario': request.args.get('usuario', '').strip(),
+        'tipo': request.args.get('tipo', ''),
+        'estado': request.args.get('estado', ''),
+    }
+
+    consulta = (
+        db.select(Historial.id, Historial.fecha, Historial.tipo, Historial.usuario, Historial.cantidad,
+                  Historial.observaciones, Historial.estado_al_retorno,
+                  Equipo.nombre.label('equipo_nombre'), EquipoIndividual.numero_fixture,
+                  EquipoIndividual.numero_serie)
+        .outerjoin(Equipo, Historial.equipo_id == Equipo.id)
+        .outerjoin(EquipoIndividual, Historial.equipo_individual_id == EquipoIndividual.id)
+    )
+    if filtros['equipo']:
+        consulta = consulta.where(Equipo.nombre.ilike(f"%{filtros['equipo']}%"))
+    if filtros['serie']:
+        serie = filtros['serie'].lstrip('#')
+        condicion = EquipoIndividual.numero_serie.ilike(f"%{serie}%")
+        if serie.isdigit():
+            condicion = db.or_(condicion, EquipoIndividual.numero_fixture == int(serie))
+        consulta = consulta.where(condicion)
+    if filtros['usuario']:
+        consulta = consulta.where(Historial.usuario.ilike(f"%{filtros['usuario']}%"))
+    if filtros['tipo'] in ('SALIDA', 'RETORNO'):
+        consulta = consulta.where(Historial.tipo == filtros['tipo'])
+    if filtros['estado']:
+        consulta = consulta.where(Historial.tipo == 'RETORNO', Historial.estado_al_retorno == filtros['estado'])
+
+    # Cursor: fecha e id del último registro de la página anterior
+    cursor = request.args.get('cursor', '')
+    if cursor:
+        try:
+            fecha_txt, id_txt = cursor.rsplit('_', 1)
+            cursor_fecha, cursor_id = datetime.fromisoformat(fecha_txt), int(id_txt)
+            consulta = consulta.where(db.or_(
+                Historial.fecha < cursor_fecha,
+                db.and_(Historial.fecha == cursor_fecha, Historial.id < cursor_id)
+            ))
+        except ValueError:
+            pass
+
+    filas = db.session.execute(
+        consulta.order_by(Historial.fecha.desc(), Historial.id.desc()).limit(HISTORIAL_POR_PAGINA + 1)
+    ).all()
+    registros = filas[:HISTORIAL_POR_PAGINA]
+    siguiente = None
+    if len(filas) > HISTORIAL_POR_PAGINA and registros[-1].fecha:
+        siguiente = f"{registros[-1].fecha.isoformat()}_{registros[-1].id}"
+
+    if request.args.get('parcial'):
+        # Solo las filas, para "cargar más" / scroll infinito
+        html = render_template('historial_filas.html', registros=registros)
+        return Response(html, headers={'X-Siguiente-Cursor': siguiente or ''})
+
+    return render_template('historial.html', registros=registros, filtros=filtros, siguiente=siguiente)
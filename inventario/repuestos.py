@@ -0,0 +1,97 @@
+"""Repuestos y su vínculo con equipos"""
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from .auth import login_required
+from .cache import cache_pagina
+from .config import CATEGORIAS_REPUESTOS
+from .extensiones import db
+from .modelos import Equipo, Repuesto
+
+bp = Blueprint('repuestos', __name__)
+
+
+@bp.route('/repuestos')
+@login_required
+@cache_pagina('repuesto')
+def repuestos():
+    lista_repuestos = Repuesto.query.order_by(Repuesto.nombre.asc()).all()
+    return render_template('repuestos.html', repuestos=lista_repuestos, categorias=CATEGORIAS_REPUESTOS)
+
+
+@bp.route('/repuesto/<int:id>')
+@login_required
+def detalle_repuesto(id):
+    r = Repuesto.query.get_or_404(id)
+    # Lista de equipos para vincular (excluyendo los ya vinculados)
+    equipos_disponibles = Equipo.query.order_by(Equipo.nombre).all()
+    # En producción real, filtraríamos mejor, pero por ahora mostramos todos para seleccionar
+    return render_template('detalle_repuesto.html', r=r, categorias=CATEGORIAS_REPUESTOS, equipos=equipos_disponibles)
+
+
+@bp.route('/repuesto/add', methods=['POST'])
+@login_required
+def add_repuesto():
+    nuevo = Repuesto(
+        nombre=request.form.get('nombre'),
+        categoria=request.form.get('categoria'),
+        cantidad=int(request.form.get('cantidad') or 1),
+        equipo_asociado_texto=request.form.get('equipo_asociado_texto')
+    )
+    db.session.add(nuevo)
+    db.session.commit()
+    flash(f"Repuesto {nuevo.nombre} agregado.", "success")
+    return redirect(url_for('repuestos.repuestos'))
+
+
+@bp.route('/repuesto/<int:id>/update', methods=['POST'])
+@login_required
+def update_repuesto(id):
+    r = Repuesto.query.get_or_404(id)
+    r.nombre = request.form.get('nombre', r.nombre)
+    r.categoria = request.form.get('categoria', r.categoria)
+    r.equipo_asociado_texto = request.form.get('equipo_asociado_texto', r.equipo_asociado_texto)
+    try:
+        r.cantidad = int(request.form.get('cantidad', r.cantidad))
+    except ValueError:
+        pass
+    
+    db.session.commit()
+    flash(f"Repuesto {r.nombre} actualizado.", "success")
+    return redirect(url_for('repuestos.detalle_repuesto', id=id))
+
+
+@bp.route('/repuesto/delete/<int:id>')
+@login_required
+def delete_repuesto(id):
+    r = Repuesto.query.get_or_404(id)
+    nombre = r.nombre
+    db.session.delete(r)
+    db.session.commit()
+    flash(f"Repuesto {nombre} eliminado.", "warning")
+    return redirect(url_for('repuestos.repuestos'))
+
+
+@bp.route('/repuesto/<int:id>/link_equipo', methods=['POST'])
+@login_required
+def link_equipo_repuesto(id):
+    r = Repuesto.query.get_or_404(id)
+    equipo_id = request.form.get('equipo_id')
+    if equipo_id:
+        equipo = Equipo.query.get(equipo_id)
+        if equipo and equipo not in r.equipos:
+            r.equipos.append(equipo)
+            db.session.commit()
+            flash(f"Vinculado con {equipo.nombre}.", "success")
+    return redirect(url_for('repuestos.detalle_repuesto', id=id))
+
+
+@bp.route('/repuesto/<int:id>/unlink_equipo/<int:equipo_id>', methods=['POST'])
+@login_required
+def unlink_equipo_repuesto(id, equipo_id):
+    r = Repuesto.query.get_or_404(id)
+    equipo = Equipo.query.get(equipo_id)
+    if equipo and equipo in r.equipos:
+        r.equipos.remove(equipo)
+        db.session.commit()
+        flash(f"Desvinculado de {equipo.nombre}.", "success")
+    return redirect(url_for('repuestos.detalle_repuesto', id=id))
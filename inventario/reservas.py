@@ -0,0 +1,314 @@
+"""
+Reservas de equipos y unidades individuales para fechas futuras.
+
+El índice de intervalos es una tabla R*Tree de SQLite (reserva_rtree: equipo e [inicio, fin] en
+minutos) mantenida con triggers, igual que busqueda_fts: una consulta por rango lee solo las
+reservas que se cruzan con él y no todas las que hubo.
+
+Disponibilidad de un equipo en [desde, hasta): stock utilizable - unidades fuera que no volvieron con
+una reserva - el pico de unidades reservadas a la vez dentro del rango. Una salida retira las
+reservas de su mismo destino y no puede llevarse unidades que otros destinos tienen reservadas desde
+ya o desde dentro de RESERVAS_ANTICIPO_HORAS (el día de carga).
+"""
+import calendar
+from datetime import datetime, time, timedelta
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+
+from .auth import login_required
+from .extensiones import db, realizar_backup
+from .modelos import Equipo, EquipoIndividual, Reserva, subconsulta_disponibilidad
+
+bp = Blueprint('reservas', __name__)
+
+# Minutos desde 1970 (UTC naive, igual que las fechas guardadas): entra en el entero de 32 bits de rtree_i32.
+# El inicio se redondea hacia abajo y el fin hacia arriba; el filtro exacto se hace sobre reserva.
+SQL_MINUTO = "CAST(strftime('%s', {}) AS INTEGER) / 60"
+SQL_MINUTO_FIN = "(CAST(strftime('%s', {}) AS INTEGER) + 59) / 60"
+SQL_RESERVAS = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS reserva_rtree USING rtree_i32(id, equipo_min, equipo_max, inicio, fin)",
+    f"""CREATE TRIGGER IF NOT EXISTS reserva_rtree_ai AFTER INSERT ON reserva BEGIN
+        INSERT INTO reserva_rtree (id, equipo_min, equipo_max, inicio, fin)
+        VALUES (new.id, new.equipo_id, new.equipo_id, {SQL_MINUTO.format('new.inicio')}, {SQL_MINUTO_FIN.format('new.fin')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS reserva_rtree_au AFTER UPDATE OF equipo_id, inicio, fin ON reserva BEGIN
+        UPDATE reserva_rtree SET equipo_min = new.equipo_id, equipo_max = new.equipo_id,
+            inicio = {SQL_MINUTO.format('new.inicio')}, fin = {SQL_MINUTO_FIN.format('new.fin')}
+        WHERE id = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reserva_rtree_ad AFTER DELETE ON reserva BEGIN
+        DELETE FROM reserva_rtree WHERE id = old.id;
+    END""",
+]
+
+reserva_rtree = db.table('reserva_rtree', db.column('id'), db.column('equipo_min'), db.column('equipo_max'),
+                         db.column('inicio'), db.column('fin'))
+
+
+def reconstruir_indice_reservas():
+    db.session.execute(db.text("DELETE FROM reserva_rtree"))
+    db.session.execute(db.text(f"""
+        INSERT INTO reserva_rtree (id, equipo_min, equipo_max, inicio, fin)
+        SELECT id, equipo_id, equipo_id, {SQL_MINUTO.format('inicio')}, {SQL_MINUTO_FIN.format('fin')} FROM reserva"""))
+    db.session.commit()
+
+
+def inicializar_reservas():
+    for sql in SQL_RESERVAS:
+        db.session.execute(db.text(sql))
+    db.session.commit()
+    vacio = db.session.execute(db.text("SELECT 1 FROM reserva_rtree LIMIT 1")).first() is None
+    if vacio and db.session.execute(db.text("SELECT 1 FROM reserva LIMIT 1")).first() is not None:
+        reconstruir_indice_reservas()
+
+
+def minuto(fecha):
+    return calendar.timegm(fecha.timetuple()) // 60
+
+
+def en_rango(desde, hasta, equipo_ids=None):
+    """Condición sobre Reserva: se cruza con [desde, hasta). Busca en el índice y filtra exacto."""
+    candidatas = db.select(reserva_rtree.c.id).where(reserva_rtree.c.inicio <= minuto(hasta),
+                                                     reserva_rtree.c.fin >= minuto(desde))
+    if equipo_ids:
+        candidatas = candidatas.where(reserva_rtree.c.equipo_min <= max(equipo_ids),
+                                      reserva_rtree.c.equipo_max >= min(equipo_ids))
+    condicion = db.and_(Reserva.id.in_(candidatas), Reserva.inicio < hasta, Reserva.fin > desde)
+    if equipo_ids:
+        condicion = db.and_(condicion, Reserva.equipo_id.in_(equipo_ids))
+    return condicion
+
+
+def por_retirar(ahora, equipo_ids=None):
+    """Reservas que una salida de ahora tiene que respetar: vigentes o que empiezan dentro del anticipo"""
+    limite = ahora + timedelta(hours=current_app.config['RESERVAS_ANTICIPO_HORAS'])
+    return en_rango(ahora, limite, equipo_ids)
+
+
+def comprometidas(equipo_ids, usuario, ahora=None):
+    """Unidades reservadas por otros destinos que aún no salieron: ({equipo_id: cantidad}, {ind_id: destino})"""
+    por_equipo, unidades = {}, {}
+    if not equipo_ids:
+        return por_equipo, unidades
+    filas = db.session.execute(
+        db.select(Reserva.equipo_id, Reserva.equipo_individual_id, Reserva.usuario,
+                  (Reserva.cantidad - Reserva.retiradas).label('pendientes'))
+        .where(por_retirar(ahora or datetime.now(), equipo_ids), Reserva.usuario != usuario,
+               Reserva.retiradas < Reserva.cantidad))
+    for f in filas:
+        por_equipo[f.equipo_id] = por_equipo.get(f.equipo_id, 0) + f.pendientes
+        if f.equipo_individual_id:
+            unidades[f.equipo_individual_id] = f.usuario
+    return por_equipo, unidades
+
+
+def retirar_reservas(equipo_id, ind_id, usuario, cantidad, ahora):
+    """Descuenta la salida de las reservas del mismo destino: primero la de esa unidad, después las
+    del equipo por cantidad, de la más próxima a la más lejana"""
+    pendientes = db.session.execute(
+        db.select(Reserva).where(por_retirar(ahora, [equipo_id]), Reserva.usuario == usuario,
+                                 Reserva.retiradas < Reserva.cantidad,
+                                 db.or_(Reserva.equipo_individual_id.is_(None),
+                                        Reserva.equipo_individual_id == ind_id))
+        .order_by(Reserva.equipo_individual_id.is_(None), Reserva.inicio)
+    ).scalars().all()
+    for r in pendientes:
+        if cantidad <= 0:
+            break
+        unidades = min(cantidad, r.cantidad - r.retiradas)
+        r.retiradas += unidades
+        cantidad -= unidades
+
+
+def pico(intervalos, desde, hasta):
+    """Máximo de unidades reservadas a la vez dentro de [desde, hasta); intervalos: (inicio, fin, cantidad)"""
+    eventos = []
+    for inicio, fin, cantidad in intervalos:
+        eventos.append((max(inicio, desde), cantidad))
+        eventos.append((min(fin, hasta), -cantidad))
+    maximo = actual = 0
+    # A igual hora van primero los fines: una reserva que termina a las 10 no choca con otra que empieza a las 10
+    for _, delta in sorted(eventos):
+        actual += delta
+        maximo = max(maximo, actual)
+    return maximo
+
+
+def disponibilidad(equipo_ids, desde, hasta, excluir=()):
+    """Por equipo: total utilizable, fuera sin reserva, pico reservado en el rango y disponibles.
+    `excluir` son ids de reservas que no cuentan (las que se están validando)."""
+    equipo_ids = list(equipo_ids)
+    if not equipo_ids:
+        return {}
+    ahora = datetime.now()
+    disp = subconsulta_disponibilidad()
+    resultado = {}
+    for e in db.session.execute(
+            db.select(Equipo.id, Equipo.nombre,
+                      db.func.coalesce(disp.c.total - disp.c.danados, Equipo.cantidad_total, 0).label('total'),
+                      db.func.coalesce(Equipo.cantidad_en_uso, 0).label('en_uso'))
+            .outerjoin(disp, disp.c.equipo_id == Equipo.id)
+            .where(Equipo.id.in_(equipo_ids))):
+        resultado[e.id] = {'equipo_id': e.id, 'nombre': e.nombre, 'total': e.total, 'en_uso': e.en_uso,
+                           'reservas': []}
+
+    # Las unidades que salieron con una reserva vuelven, como tarde, cuando la reserva termina; las demás no se sabe.
+    # Una reserva solo se retira dentro del anticipo, así que las que aún no terminaron caen en por_retirar().
+    retiradas = dict(db.session.execute(
+        db.select(Reserva.equipo_id, db.func.sum(Reserva.retiradas))
+        .where(por_retirar(ahora, equipo_ids), Reserva.retiradas > 0)
+        .group_by(Reserva.equipo_id)).all())
+    for r in db.session.execute(db.select(Reserva).where(en_rango(desde, hasta, equipo_ids))).scalars():
+        if r.id not in excluir and r.equipo_id in resultado:
+            resultado[r.equipo_id]['reservas'].append(r)
+
+    for equipo_id, d in resultado.items():
+        d['fuera_sin_reserva'] = max(0, d['en_uso'] - (retiradas.get(equipo_id) or 0))
+        d['reservadas'] = pico([(r.inicio, r.fin, r.cantidad) for r in d['reservas']], desde, hasta)
+        d['disponibles'] = max(0, d['total'] - d['fuera_sin_reserva'] - d['reservadas'])
+    return resultado
+
+
+def unidades_ocupadas(ind_ids, desde, hasta, excluir=()):
+    """Unidades que no se pueden usar en [desde, hasta): {ind_id: motivo}"""
+    if not ind_ids:
+        return {}
+    ahora = datetime.now()
+    reservadas, vuelven = {}, set()
+    for r in db.session.execute(db.select(Reserva).where(
+            en_rango(min(desde, ahora), hasta), Reserva.equipo_individual_id.in_(ind_ids))).scalars():
+        if r.id in excluir:
+            continue
+        if r.inicio < hasta and r.fin > desde:
+            reservadas[r.equipo_individual_id] = (f"reservado para {r.usuario} "
+                                                  f"({r.inicio:%d/%m %H:%M} - {r.fin:%d/%m %H:%M})")
+        elif r.retiradas and r.fin <= desde:
+            # Salió con esta reserva y tiene que volver antes del rango pedido
+            vuelven.add(r.equipo_individual_id)
+
+    ocupadas = {}
+    for u in db.session.execute(
+            db.select(EquipoIndividual.id, EquipoIndividual.danado, EquipoIndividual.en_uso,
+                      EquipoIndividual.ubicacion_actual)
+            .where(EquipoIndividual.id.in_(ind_ids))):
+        if u.danado:
+            ocupadas[u.id] = "está dañado"
+        elif u.id in reservadas:
+            ocupadas[u.id] = reservadas[u.id]
+        elif u.en_uso and u.id not in vuelven:
+            ocupadas[u.id] = f"está fuera ({u.ubicacion_actual or 'sin destino'}) sin fecha de retorno"
+    return ocupadas
+
+
+def conflictos(lineas, desde, hasta, excluir=()):
+    """Valida un kit entero contra las reservas del rango. Devuelve (errores, disponibilidad por equipo)."""
+    equipos = {e.id: e for e in Equipo.query.filter(Equipo.id.in_({l['equipo_id'] for l in lineas}))}
+    ind_ids = {l['ind_id'] for l in lineas if l['ind_id']}
+    individuales = ({i.id: i for i in EquipoIndividual.query.filter(EquipoIndividual.id.in_(ind_ids))}
+                    if ind_ids else {})
+    errores, pedido, vistos = [], {}, set()
+    for l in lineas:
+        e = equipos.get(l['equipo_id'])
+        if e is None:
+            errores.append(f"El equipo #{l['equipo_id']} no existe.")
+            continue
+        if l['cantidad'] < 1:
+            errores.append(f"{e.nombre}: la cantidad debe ser al menos 1.")
+            continue
+        if l['ind_id'] or l.get('fixture'):
+            ind = individuales.get(l['ind_id'])
+            if ind is None or ind.equipo_grupo_id != e.id:
+                unidad = f"#{l['fixture']}" if l.get('fixture') else f"(id {l['ind_id']})"
+                errores.append(f"{e.nombre}: la unidad {unidad} no existe.")
+                continue
+            if ind.id in vistos:
+                errores.append(f"{e.nombre} #{ind.numero_fixture}: está repetido en el lote.")
+                continue
+            vistos.add(ind.id)
+        pedido[e.id] = pedido.get(e.id, 0) + l['cantidad']
+
+    disp = disponibilidad(pedido.keys(), desde, hasta, excluir)
+    for ind_id, motivo in unidades_ocupadas(vistos, desde, hasta, excluir).items():
+        ind = individuales[ind_id]
+        errores.append(f"{equipos[ind.equipo_grupo_id].nombre} #{ind.numero_fixture}: {motivo}.")
+    for equipo_id, cantidad in pedido.items():
+        d = disp[equipo_id]
+        d['pedidas'] = cantidad
+        if cantidad > d['disponibles']:
+            errores.append(f"{d['nombre']}: se piden {cantidad} y en ese período hay {d['disponibles']} disponibles "
+                           f"({d['reservadas']} reservadas, {d['fuera_sin_reserva']} fuera sin fecha de retorno).")
+    return errores, disp
+
+
+def reservar(lineas, usuario, inicio, fin, observaciones=''):
+    """Crea las reservas del lote y las valida ya escritas: el INSERT toma el lock de SQLite, así otra
+    reserva simultánea espera y se valida después contra esta. Si hay errores el llamador hace rollback."""
+    nuevas = [Reserva(equipo_id=l['equipo_id'], equipo_individual_id=l['ind_id'], cantidad=l['cantidad'],
+                      usuario=usuario, inicio=inicio, fin=fin, observaciones=observaciones)
+              for l in lineas if l['cantidad'] >= 1]
+    db.session.add_all(nuevas)
+    db.session.flush()
+    errores, _ = conflictos(lineas, inicio, fin, excluir={r.id for r in nuevas})
+    return errores
+
+
+def borrar_reservas(equipo_id=None, ind_id=None):
+    """Al eliminar un equipo o una unidad se van sus reservas"""
+    if ind_id is not None:
+        db.session.execute(db.delete(Reserva).where(Reserva.equipo_individual_id == ind_id))
+        return
+    db.session.execute(db.delete(Reserva).where(Reserva.equipo_id == equipo_id))
+
+
+def parse_intervalo(desde, hasta):
+    """(inicio, fin) desde texto ISO. Una fecha sola vale desde las 00:00 y hasta el final del día."""
+    try:
+        inicio = datetime.fromisoformat(desde) if desde else None
+        fin = datetime.fromisoformat(hasta) if hasta else None
+    except (TypeError, ValueError):
+        return None, None
+    if fin and hasta and len(hasta) == 10:
+        fin = datetime.combine(fin.date() + timedelta(days=1), time.min)
+    if not inicio or not fin or fin <= inicio:
+        return None, None
+    return inicio, fin
+
+
+@bp.route('/reservas')
+@login_required
+def listar():
+    """Reservas vigentes y futuras, y la consulta "¿hay N de X entre tal y tal fecha?" """
+    ahora = datetime.now()
+    reservas = db.session.execute(
+        db.select(Reserva, Equipo.nombre, EquipoIndividual.numero_fixture)
+        .join(Equipo, Equipo.id == Reserva.equipo_id)
+        .outerjoin(EquipoIndividual, EquipoIndividual.id == Reserva.equipo_individual_id)
+        .where(Reserva.fin > ahora)
+        .order_by(Reserva.inicio, Reserva.usuario, Equipo.nombre)
+    ).all()
+
+    consulta = None
+    equipo_id = request.args.get('equipo', type=int)
+    inicio, fin = parse_intervalo(request.args.get('desde'), request.args.get('hasta'))
+    if equipo_id and inicio:
+        cantidad = max(request.args.get('cantidad', 1, type=int), 1)
+        d = disponibilidad([equipo_id], inicio, fin).get(equipo_id)
+        if d:
+            consulta = dict(d, cantidad=cantidad, ok=cantidad <= d['disponibles'])
+    elif request.args.get('desde') or request.args.get('hasta'):
+        flash("Rango de fechas inválido: el fin tiene que ser posterior al inicio.", "error")
+
+    equipos = db.session.execute(db.select(Equipo.id, Equipo.nombre).order_by(Equipo.nombre)).all()
+    return render_template('reservas.html', reservas=reservas, equipos=equipos, consulta=consulta,
+                           inicio=inicio, fin=fin, equipo_id=equipo_id)
+
+
+@bp.route('/reservas/<int:id>/cancelar', methods=['POST'])
+@login_required
+def cancelar(id):
+    reserva = Reserva.query.get_or_404(id)
+    db.session.delete(reserva)
+    db.session.commit()
+    realizar_backup()
+    flash(f"Reserva de {reserva.usuario} cancelada.", "warning")
+    return redirect(url_for('reservas.listar'))
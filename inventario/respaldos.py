@@ -0,0 +1,170 @@
+"""
+Motor de respaldos de la base SQLite.
+
+Usa la API de backup en línea de SQLite (copia consistente aunque haya escrituras en curso)
+y corre en un hilo en segundo plano: las rutas solo avisan que hubo una escritura y nunca
+esperan a que el respaldo termine. Los respaldos se agrupan (cada N escrituras o cada cierto
+intervalo si hubo cambios) y se podan con una retención horaria/diaria/semanal.
+"""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+PREFIJO = 'inventario_backup_'
+FORMATO_FECHA = '%Y%m%d_%H%M%S'
+
+
+def copiar_base(origen, destino):
+    """Copia una base SQLite a otra usando la API de backup en línea"""
+    src = sqlite3.connect(origen)
+    dst = sqlite3.connect(destino)
+    try:
+        with dst:
+            src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def verificar_respaldo(path):
+    """Devuelve (ok, detalle) según PRAGMA integrity_check"""
+    if not os.path.exists(path):
+        return False, 'El archivo no existe'
+    try:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            resultado = [r[0] for r in conn.execute('PRAGMA integrity_check')]
+            conn.execute('SELECT count(*) FROM equipo').fetchone()
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return False, str(e)
+    if resultado != ['ok']:
+        return False, '; '.join(resultado)
+    return True, 'ok'
+
+
+def fecha_de_respaldo(nombre):
+    try:
+        return datetime.strptime(nombre[len(PREFIJO):-len('.db')], FORMATO_FECHA)
+    except ValueError:
+        return None
+
+
+class MotorRespaldos:
+    def __init__(self, db_path, carpeta, cada_n_escrituras=20, intervalo_segundos=3600,
+                 retencion_horaria=24, retencion_diaria=7, retencion_semanal=4):
+        self.db_path = db_path
+        self.carpeta = carpeta
+        self.cada_n_escrituras = cada_n_escrituras
+        self.intervalo_segundos = intervalo_segundos
+        self.retencion_horaria = retencion_horaria
+        self.retencion_diaria = retencion_diaria
+        self.retencion_semanal = retencion_semanal
+
+        # Funciones sin argumentos que se llaman después de restaurar: cachés derivadas de la base reemplazada
+        self.al_restaurar = []
+
+        self._pendientes = 0
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._hilo = None
+        self._pid = None
+
+    def registrar_escritura(self, n=1):
+        """Llamar después de cada commit relevante. No bloquea."""
+        with self._lock:
+            self._pendientes += n
+            listo = self._pendientes >= self.cada_n_escrituras
+        self._asegurar_hilo()
+        if listo:
+            self._evento.set()
+
+    def _asegurar_hilo(self):
+        # El hilo se crea de forma perezosa para que cada worker de gunicorn (proceso hijo) tenga el suyo
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._hilo = threading.Thread(target=self._bucle, name='respaldos', daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            self._evento.wait(timeout=self.intervalo_segundos)
+            self._evento.clear()
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, 0
+            if not pendientes:
+                continue
+            try:
+                self.realizar()
+            except Exception:
+                # Se reintenta en la próxima vuelta
+                with self._lock:
+                    self._pendientes += pendientes
+
+    def listar(self):
+        """Respaldos existentes como (fecha, path), del más nuevo al más antiguo"""
+        if not os.path.isdir(self.carpeta):
+            return []
+        respaldos = []
+        for nombre in os.listdir(self.carpeta):
+            if nombre.startswith(PREFIJO) and nombre.endswith('.db'):
+                fecha = fecha_de_respaldo(nombre)
+                if fecha:
+                    respaldos.append((fecha, os.path.join(self.carpeta, nombre)))
+        return sorted(respaldos, reverse=True)
+
+    def realizar(self):
+        """Crea un respaldo ahora (síncrono) y aplica la retención. Devuelve la ruta creada."""
+        if not os.path.exists(self.db_path):
+            return None
+        os.makedirs(self.carpeta, exist_ok=True)
+        ahora = datetime.now()
+        destino = os.path.join(self.carpeta, f'{PREFIJO}{ahora.strftime(FORMATO_FECHA)}.db')
+        if os.path.exists(destino):
+            # Otro worker respaldó en este mismo segundo
+            return destino
+        temporal = f'{destino}.{os.getpid()}.tmp'
+        copiar_base(self.db_path, temporal)
+        os.replace(temporal, destino)
+        self.aplicar_retencion(ahora)
+        return destino
+
+    def aplicar_retencion(self, ahora=None):
+        """Conserva el respaldo más reciente de cada hora/día/semana dentro de la ventana configurada"""
+        ahora = ahora or datetime.now()
+        conservar = set()
+        vistos = {'hora': set(), 'dia': set(), 'semana': set()}
+        for fecha, path in self.listar():
+            edad_horas = (ahora - fecha).total_seconds() / 3600
+            claves = {
+                'hora': (fecha.strftime('%Y%m%d%H'), edad_horas < self.retencion_horaria),
+                'dia': (fecha.strftime('%Y%m%d'), edad_horas < self.retencion_diaria * 24),
+                'semana': (fecha.strftime('%G%V'), edad_horas < self.retencion_semanal * 24 * 7),
+            }
+            for nivel, (clave, dentro) in claves.items():
+                if dentro and clave not in vistos[nivel]:
+                    vistos[nivel].add(clave)
+                    conservar.add(path)
+        eliminados = []
+        for _, path in self.listar():
+            if path not in conservar:
+                try:
+                    os.remove(path)
+                    eliminados.append(path)
+                except FileNotFoundError:
+                    pass
+        return eliminados
+
+    def restaurar(self, path):
+        """Verifica un respaldo y lo copia sobre la base activa"""
+        ok, detalle = verificar_respaldo(path)
+        if not ok:
+            raise ValueError(f'Respaldo inválido: {detalle}')
+        copiar_base(path, self.db_path)
+        # Los contadores de versión vuelven a los del respaldo y pueden repetir versiones ya cacheadas
+        for limpiar in self.al_restaurar:
+            limpiar()
+
@@ -0,0 +1,48 @@
+"""Catálogo de destinos de los movimientos"""
+from datetime import datetime
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .cache import version_datos
+from .extensiones import db
+from .modelos import Ubicacion
+
+# Caché en memoria del proceso, guardada con la versión de la tabla ubicacion (contador_cambios, ver
+# cache.py): un destino registrado en cualquier worker cambia la versión y la próxima lectura la
+# vuelve a armar. Así una página cacheada con una versión nueva nunca lleva una lista vieja.
+_cache_ubicaciones = {'lista': None, 'version': None}
+
+
+def registrar_ubicacion(nombre):
+    """Suma un uso al destino (lo crea si es nuevo). Se confirma junto con el movimiento."""
+    ahora = datetime.now()
+    stmt = sqlite_insert(Ubicacion).values(nombre=nombre, usos=1, ultimo_uso=ahora)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Ubicacion.nombre],
+        set_={'usos': Ubicacion.usos + 1, 'ultimo_uso': stmt.excluded.ultimo_uso}
+    )
+    db.session.execute(stmt)
+
+
+def listar_ubicaciones():
+    """Nombres de destinos, primero los usados más recientemente y luego los más frecuentes"""
+    version = version_datos('ubicacion')
+    if _cache_ubicaciones['lista'] is None or _cache_ubicaciones['version'] != version:
+        filas = db.session.query(Ubicacion.nombre).order_by(
+            Ubicacion.ultimo_uso.desc(), Ubicacion.usos.desc(), Ubicacion.nombre).all()
+        _cache_ubicaciones.update(lista=[f[0] for f in filas], version=version)
+    return _cache_ubicaciones['lista']
+
+
+def vaciar_cache_ubicaciones():
+    _cache_ubicaciones.update(lista=None, version=None)
+
+
+def inicializar_ubicaciones():
+    # Bases existentes: poblar el catálogo una vez a partir del historial
+    if Ubicacion.query.first() is None:
+        db.session.execute(db.text("""
+            INSERT INTO ubicacion (nombre, usos, ultimo_uso)
+            SELECT usuario, count(*), max(fecha) FROM historial
+            WHERE usuario IS NOT NULL AND usuario != '' GROUP BY usuario"""))
+        db.session.commit()
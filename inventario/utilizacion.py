@@ -0,0 +1,261 @@
+"""
+Utilización diaria de equipos a partir de los movimientos.
+
+UsoDiario guarda por día, equipo, unidad individual y destino cuántas unidades estuvieron fuera
+de bodega (su suma en un rango son los días-unidad), cuántas salieron y cuántas volvieron. Se
+mantiene al registrar cada movimiento: la SALIDA abre un PrestamoAbierto y el RETORNO lo cierra
+sumando una unidad a cada día que estuvo fuera (cuentan el de salida y el de retorno). El reporte
+lee solo estas dos tablas, así su costo depende del rango de fechas y no del largo del historial.
+"""
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, render_template, request
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .auth import login_required
+from .extensiones import db
+from .modelos import Equipo, EquipoIndividual, Historial, PrestamoAbierto, UsoDiario
+
+bp = Blueprint('utilizacion', __name__)
+
+LOTE_FILAS = 20000
+DIAS_REPORTE = 30
+
+
+def sumar_uso(filas):
+    """Suma las filas (dicts con la clave de UsoDiario y unidades/salidas/retornos) a UsoDiario"""
+    if not filas:
+        return
+    stmt = sqlite_insert(UsoDiario)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[UsoDiario.dia, UsoDiario.equipo_id, UsoDiario.equipo_individual_id, UsoDiario.usuario],
+        set_={c: getattr(UsoDiario, c) + getattr(stmt.excluded, c) for c in ('unidades', 'salidas', 'retornos')}
+    ), filas)
+
+
+def fila_uso(dia, equipo_id, ind_id, usuario, unidades=0, salidas=0, retornos=0):
+    return {'dia': dia, 'equipo_id': equipo_id, 'equipo_individual_id': ind_id, 'usuario': usuario,
+            'unidades': unidades, 'salidas': salidas, 'retornos': retornos}
+
+
+def dias_fuera(equipo_id, ind_id, usuario, desde, hasta, cantidad):
+    """Filas de UsoDiario de un tramo que volvió: `cantidad` unidades fuera cada día de desde a hasta"""
+    filas = []
+    dia = desde
+    while dia <= hasta:
+        filas.append(fila_uso(dia, equipo_id, ind_id, usuario, unidades=cantidad,
+                              retornos=cantidad if dia == hasta else 0))
+        dia += timedelta(days=1)
+    return filas
+
+
+def repartir_retorno(abiertos, usuario, cantidad):
+    """Qué préstamos cierra un retorno: primero los del mismo destino y después los más antiguos
+    (en los equipos por cantidad el destino del retorno no siempre coincide con el de la salida).
+    `abiertos` son objetos con usuario/desde/cantidad; devuelve pares (préstamo, unidades). El orden no
+    depende de cómo llegó la lista (base, memoria o punto de control): a igual fecha desempata el destino."""
+    cierres = []
+    for prestamo in sorted(abiertos, key=lambda p: (p.usuario != usuario, p.desde, p.usuario)):
+        if cantidad <= 0:
+            break
+        unidades = min(cantidad, prestamo.cantidad)
+        cierres.append((prestamo, unidades))
+        cantidad -= unidades
+    return cierres
+
+
+def registrar_movimiento(h):
+    """Actualiza la utilización con un movimiento recién creado. Se confirma junto con el movimiento."""
+    dia = h.fecha.date()
+    ind_id = h.equipo_individual_id or 0
+    if h.tipo == 'SALIDA':
+        stmt = sqlite_insert(PrestamoAbierto).values(equipo_id=h.equipo_id, equipo_individual_id=ind_id,
+                                                     usuario=h.usuario, desde=dia, cantidad=h.cantidad)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[PrestamoAbierto.equipo_id, PrestamoAbierto.equipo_individual_id,
+                            PrestamoAbierto.usuario, PrestamoAbierto.desde],
+            set_={'cantidad': PrestamoAbierto.cantidad + stmt.excluded.cantidad}))
+        sumar_uso([fila_uso(dia, h.equipo_id, ind_id, h.usuario, salidas=h.cantidad)])
+        return
+
+    abiertos = db.session.execute(db.select(PrestamoAbierto).where(
+        PrestamoAbierto.equipo_id == h.equipo_id, PrestamoAbierto.equipo_individual_id == ind_id)).scalars().all()
+    filas = []
+    for prestamo, unidades in repartir_retorno(abiertos, h.usuario, h.cantidad):
+        filas += dias_fuera(h.equipo_id, ind_id, prestamo.usuario, prestamo.desde, max(dia, prestamo.desde), unidades)
+        if unidades == prestamo.cantidad:
+            db.session.delete(prestamo)
+        else:
+            prestamo.cantidad -= unidades
+    sumar_uso(filas)
+
+
+def borrar_utilizacion(equipo_id=None, ind_id=None):
+    """Al eliminar un equipo se va toda su utilización; al eliminar una unidad, solo su préstamo abierto"""
+    if ind_id is not None:
+        db.session.execute(db.delete(PrestamoAbierto).where(PrestamoAbierto.equipo_individual_id == ind_id))
+        return
+    db.session.execute(db.delete(PrestamoAbierto).where(PrestamoAbierto.equipo_id == equipo_id))
+    db.session.execute(db.delete(UsoDiario).where(UsoDiario.equipo_id == equipo_id))
+
+
+class Prestamo:
+    """Préstamo abierto en memoria, para recorrer el historial sin tocar PrestamoAbierto"""
+    __slots__ = ('usuario', 'desde', 'cantidad')
+
+    def __init__(self, usuario, desde, cantidad):
+        self.usuario, self.desde, self.cantidad = usuario, desde, cantidad
+
+
+def movimientos_en_orden(desde=None, hasta=None):
+    """Salidas y retornos con fecha en [desde, hasta], en orden y de a lotes, ya normalizados:
+    (equipo_id, ind_id, tipo, usuario, cantidad, fecha)"""
+    consulta = (db.select(Historial.equipo_id, Historial.equipo_individual_id, Historial.tipo,
+                          Historial.usuario, Historial.cantidad, Historial.fecha)
+                .where(Historial.tipo.in_(['SALIDA', 'RETORNO']), Historial.fecha.isnot(None))
+                .order_by(Historial.fecha, Historial.id))
+    if desde is not None:
+        consulta = consulta.where(Historial.fecha >= desde)
+    if hasta is not None:
+        consulta = consulta.where(Historial.fecha <= hasta)
+    for equipo_id, ind_id, tipo, usuario, cantidad, fecha in db.session.execute(
+            consulta, execution_options={'yield_per': LOTE_FILAS}):
+        yield equipo_id, ind_id or 0, tipo, usuario or 'Sin Destino', cantidad or 1, fecha
+
+
+def reproducir(abiertos, equipo_id, ind_id, tipo, usuario, cantidad, dia):
+    """Aplica un movimiento a `abiertos` ({(equipo_id, ind_id): [Prestamo]}).
+    Devuelve los pares (préstamo, unidades) que cerró un retorno."""
+    clave = (equipo_id, ind_id)
+    if tipo == 'SALIDA':
+        abiertos.setdefault(clave, []).append(Prestamo(usuario, dia, cantidad))
+        return []
+    lista = abiertos.get(clave, [])
+    cierres = repartir_retorno(lista, usuario, cantidad)
+    for prestamo, unidades in cierres:
+        prestamo.cantidad -= unidades
+    if cierres:
+        abiertos[clave] = [p for p in lista if p.cantidad > 0]
+    return cierres
+
+
+def filas_abiertos(abiertos):
+    """Los préstamos en memoria como filas de PrestamoAbierto (sin id). Varias salidas del mismo día
+    y destino quedan en una sola fila."""
+    prestamos = {}
+    for (equipo_id, ind_id), lista in abiertos.items():
+        for p in lista:
+            clave = (equipo_id, ind_id, p.usuario, p.desde)
+            prestamos[clave] = prestamos.get(clave, 0) + p.cantidad
+    return [{'equipo_id': e, 'equipo_individual_id': i, 'usuario': u, 'desde': d, 'cantidad': c}
+            for (e, i, u, d), c in prestamos.items()]
+
+
+def reconstruir_utilizacion():
+    """Recalcula UsoDiario y PrestamoAbierto recorriendo todo el historial en orden (una sola pasada).
+    Devuelve la cantidad de movimientos procesados."""
+    db.session.execute(db.delete(UsoDiario))
+    db.session.execute(db.delete(PrestamoAbierto))
+
+    abiertos = {}
+    pendientes = []
+    procesados = 0
+    for equipo_id, ind_id, tipo, usuario, cantidad, fecha in movimientos_en_orden():
+        procesados += 1
+        dia = fecha.date()
+        cierres = reproducir(abiertos, equipo_id, ind_id, tipo, usuario, cantidad, dia)
+        if tipo == 'SALIDA':
+            pendientes.append(fila_uso(dia, equipo_id, ind_id, usuario, salidas=cantidad))
+        for prestamo, unidades in cierres:
+            pendientes += dias_fuera(equipo_id, ind_id, prestamo.usuario, prestamo.desde,
+                                     max(dia, prestamo.desde), unidades)
+        if len(pendientes) >= LOTE_FILAS:
+            sumar_uso(pendientes)
+            pendientes = []
+    sumar_uso(pendientes)
+
+    filas = filas_abiertos(abiertos)
+    for i in range(0, len(filas), LOTE_FILAS):
+        db.session.execute(db.insert(PrestamoAbierto), filas[i:i + LOTE_FILAS])
+    db.session.commit()
+    return procesados
+
+
+def orden(fila):
+    return -fila['dias_unidad'], fila.get('nombre') or fila.get('usuario')
+
+
+def parse_dia(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+    except ValueError:
+        return None
+
+
+def consulta_uso(desde, hasta):
+    """Días-unidad, salidas y retornos por (equipo, unidad, destino) dentro del rango, solo desde los resúmenes.
+    Los préstamos abiertos suman los días que llevan fuera hasta hoy (su salida ya está en UsoDiario)."""
+    cerrados = db.select(
+        UsoDiario.equipo_id, UsoDiario.equipo_individual_id, UsoDiario.usuario,
+        UsoDiario.unidades.label('dias_unidad'), UsoDiario.salidas, UsoDiario.retornos,
+    ).where(UsoDiario.dia.between(desde, hasta))
+    fin = min(hasta, date.today())
+    if fin < desde:
+        return cerrados.subquery('uso')
+    inicio = db.func.max(PrestamoAbierto.desde, db.literal(desde, db.Date))
+    dias = db.cast(db.func.julianday(db.literal(fin, db.Date)) - db.func.julianday(inicio) + 1, db.Integer)
+    abiertos = db.select(
+        PrestamoAbierto.equipo_id, PrestamoAbierto.equipo_individual_id, PrestamoAbierto.usuario,
+        (PrestamoAbierto.cantidad * dias).label('dias_unidad'), db.literal(0).label('salidas'),
+        db.literal(0).label('retornos'),
+    ).where(PrestamoAbierto.desde <= fin)
+    return db.union_all(cerrados, abiertos).subquery('uso')
+
+
+@bp.route('/utilizacion')
+@login_required
+def reporte():
+    hoy = date.today()
+    hasta = parse_dia(request.args.get('hasta')) or hoy
+    desde = parse_dia(request.args.get('desde')) or hasta - timedelta(days=DIAS_REPORTE - 1)
+    if desde > hasta:
+        desde, hasta = hasta, desde
+    n_dias = (hasta - desde).days + 1
+    equipo_id = request.args.get('equipo', type=int)
+    uso = consulta_uso(desde, hasta)
+    totales = (db.func.sum(uso.c.dias_unidad).label('dias_unidad'), db.func.sum(uso.c.salidas).label('salidas'),
+               db.func.sum(uso.c.retornos).label('retornos'))
+
+    # Una sola pasada por el rango: por equipo y destino; los totales por equipo y por destino se arman acá
+    por_equipo, por_destino = {}, {}
+    filas = db.session.execute(
+        db.select(Equipo.id, Equipo.nombre, Equipo.categoria, Equipo.cantidad_total, uso.c.usuario, *totales)
+        .join(uso, uso.c.equipo_id == Equipo.id)
+        .group_by(Equipo.id, uso.c.usuario)
+    ).all()
+    for f in filas:
+        e = por_equipo.setdefault(f.id, {'id': f.id, 'nombre': f.nombre, 'categoria': f.categoria,
+                                         'cantidad_total': f.cantidad_total, 'dias_unidad': 0, 'salidas': 0})
+        e['dias_unidad'] += f.dias_unidad
+        e['salidas'] += f.salidas
+        if equipo_id in (None, f.id):
+            d = por_destino.setdefault(f.usuario, {'usuario': f.usuario, 'dias_unidad': 0, 'salidas': 0, 'retornos': 0})
+            for campo in ('dias_unidad', 'salidas', 'retornos'):
+                d[campo] += getattr(f, campo)
+
+    por_unidad = []
+    if equipo_id:
+        por_unidad = db.session.execute(
+            db.select(uso.c.equipo_individual_id, EquipoIndividual.numero_fixture, EquipoIndividual.numero_serie,
+                      *totales)
+            .outerjoin(EquipoIndividual, EquipoIndividual.id == uso.c.equipo_individual_id)
+            .where(uso.c.equipo_id == equipo_id, uso.c.equipo_individual_id != 0)
+            .group_by(uso.c.equipo_individual_id)
+            .order_by(db.desc('dias_unidad'), EquipoIndividual.numero_fixture)
+        ).all()
+
+    return render_template('utilizacion.html', desde=desde, hasta=hasta, n_dias=n_dias,
+                           equipo=por_equipo.get(equipo_id),
+                           por_equipo=sorted(por_equipo.values(), key=orden),
+                           por_destino=sorted(por_destino.values(), key=orden),
+                           por_unidad=por_unidad)
@@ -0,0 +1,132 @@
+"""Esquema inicial (incluye las columnas que antes se agregaban con ALTER a mano)
+
+Todas las tablas se crean con IF NOT EXISTS, así que una base existente
+puede pasar por `flask db upgrade` sin necesidad de `flask db stamp`.
+
+Revision ID: 0001_esquema_inicial
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001_esquema_inicial'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'equipo',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('categoria', sa.String(length=50), nullable=False),
+        sa.Column('marca', sa.String(length=50), nullable=True),
+        sa.Column('cantidad_total', sa.Integer(), nullable=True),
+        sa.Column('cantidad_en_uso', sa.Integer(), nullable=True),
+        sa.Column('fecha_ingreso', sa.String(length=10), nullable=True),
+        sa.Column('observaciones', sa.Text(), nullable=True),
+        sa.Column('manual_filename', sa.String(length=200), nullable=True),
+        sa.Column('danado', sa.Boolean(), server_default='0', nullable=True),
+        sa.Column('gestion_individual', sa.Boolean(), server_default='0', nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'equipo_individual',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipo_grupo_id', sa.Integer(), nullable=False),
+        sa.Column('numero_serie', sa.String(length=100), nullable=False),
+        sa.Column('numero_fixture', sa.Integer(), nullable=True),
+        sa.Column('danado', sa.Boolean(), nullable=True),
+        sa.Column('observaciones_individuales', sa.Text(), nullable=True),
+        sa.Column('fecha_ingreso', sa.String(length=10), nullable=True),
+        sa.Column('en_uso', sa.Boolean(), nullable=True),
+        sa.Column('ubicacion_actual', sa.String(length=200), nullable=True),
+        sa.ForeignKeyConstraint(['equipo_grupo_id'], ['equipo.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'historial',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=True),
+        sa.Column('usuario', sa.String(length=100), nullable=True),
+        sa.Column('cantidad', sa.Integer(), nullable=True),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.Column('observaciones', sa.Text(), server_default='', nullable=True),
+        sa.Column('estado_al_retorno', sa.String(length=50), server_default='Buen Estado', nullable=True),
+        sa.Column('equipo_individual_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['equipo_id'], ['equipo.id']),
+        sa.ForeignKeyConstraint(['equipo_individual_id'], ['equipo_individual.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'documento',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('filename', sa.String(length=200), nullable=False),
+        sa.Column('nombre_referencial', sa.String(length=100), nullable=False),
+        sa.ForeignKeyConstraint(['equipo_id'], ['equipo.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'compatibilidad',
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('compatible_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['compatible_id'], ['equipo.id']),
+        sa.ForeignKeyConstraint(['equipo_id'], ['equipo.id']),
+        sa.PrimaryKeyConstraint('equipo_id', 'compatible_id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'repuesto',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('marca', sa.String(length=50), nullable=True),
+        sa.Column('categoria', sa.String(length=50), nullable=True),
+        sa.Column('cantidad', sa.Integer(), nullable=True),
+        sa.Column('equipo_asociado_texto', sa.String(length=200), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'equipo_repuesto',
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('repuesto_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['equipo_id'], ['equipo.id']),
+        sa.ForeignKeyConstraint(['repuesto_id'], ['repuesto.id']),
+        sa.PrimaryKeyConstraint('equipo_id', 'repuesto_id'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'usuario',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('password_hash', sa.String(length=200), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        if_not_exists=True
+    )
+    op.create_table(
+        'ubicacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('usos', sa.Integer(), nullable=False),
+        sa.Column('ultimo_uso', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('nombre'),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    for tabla in ('ubicacion', 'usuario', 'equipo_repuesto', 'repuesto', 'compatibilidad',
+                  'documento', 'historial', 'equipo_individual', 'equipo'):
+        op.drop_table(tabla)
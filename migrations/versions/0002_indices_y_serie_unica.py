@@ -0,0 +1,45 @@
+"""Índices para las consultas frecuentes y número de serie único por grupo
+
+Revision ID: 0002_indices_y_serie_unica
+Revises: 0001_esquema_inicial
+Create Date: 2026-10-17 00:00:01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002_indices_y_serie_unica'
+down_revision = '0001_esquema_inicial'
+branch_labels = None
+depends_on = None
+
+INDICES = [
+    ('ix_historial_equipo_id', 'historial', ['equipo_id']),
+    ('ix_historial_fecha', 'historial', ['fecha']),
+    ('ix_historial_usuario', 'historial', ['usuario']),
+    ('ix_historial_equipo_individual_id', 'historial', ['equipo_individual_id']),
+    ('ix_equipo_categoria', 'equipo', ['categoria']),
+]
+
+
+def upgrade():
+    for nombre, tabla, columnas in INDICES:
+        op.create_index(nombre, tabla, columnas, unique=False, if_not_exists=True)
+
+    # Antes solo se validaba en add_individual(); si hay duplicados hay que resolverlos a mano
+    duplicados = op.get_bind().execute(sa.text(
+        "SELECT equipo_grupo_id, numero_serie, count(*) FROM equipo_individual "
+        "GROUP BY equipo_grupo_id, numero_serie HAVING count(*) > 1"
+    )).fetchall()
+    if duplicados:
+        detalle = ', '.join(f"grupo {g} / serie {s} ({n} veces)" for g, s, n in duplicados)
+        raise RuntimeError(f"Números de serie duplicados en equipo_individual: {detalle}")
+    op.create_index('uq_equipo_individual_grupo_serie', 'equipo_individual',
+                    ['equipo_grupo_id', 'numero_serie'], unique=True, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('uq_equipo_individual_grupo_serie', table_name='equipo_individual')
+    for nombre, tabla, _ in reversed(INDICES):
+        op.drop_index(nombre, table_name=tabla)
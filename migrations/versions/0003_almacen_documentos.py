@@ -0,0 +1,91 @@
+"""Almacén de documentos por contenido: tabla archivo y deduplicación de los archivos existentes
+
+Cada documento/manual con archivo en disco pasa a apuntar a `{sha256}.{ext}`; los archivos
+con el mismo contenido quedan guardados una sola vez y `archivo.referencias` cuenta sus usos.
+Los registros cuyo archivo no está en disco se dejan como están.
+
+Revision ID: 0003_almacen_documentos
+Revises: 0002_indices_y_serie_unica
+Create Date: 2026-10-17 00:00:02
+
+"""
+import hashlib
+import os
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+revision = '0003_almacen_documentos'
+down_revision = '0002_indices_y_serie_unica'
+branch_labels = None
+depends_on = None
+
+
+def digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for bloque in iter(lambda: f.read(64 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def ya_en_almacen(nombre):
+    # Subidos después de este cambio: ya están contados en archivo
+    base = nombre.split('.', 1)[0]
+    return len(base) == 64 and all(c in '0123456789abcdef' for c in base)
+
+
+def upgrade():
+    op.create_table(
+        'archivo',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=80), nullable=False),
+        sa.Column('tamano', sa.Integer(), nullable=True),
+        sa.Column('referencias', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('sha256'),
+        sa.UniqueConstraint('filename'),
+        if_not_exists=True,
+    )
+
+    conn = op.get_bind()
+    carpeta = current_app.config['UPLOAD_FOLDER']
+    referencias = [('documento', 'filename', id_, nombre) for id_, nombre in
+                   conn.execute(sa.text("SELECT id, filename FROM documento WHERE filename IS NOT NULL"))]
+    referencias += [('equipo', 'manual_filename', id_, nombre) for id_, nombre in
+                    conn.execute(sa.text("SELECT id, manual_filename FROM equipo WHERE manual_filename IS NOT NULL"))]
+
+    archivos = {}      # sha256 -> [filename, tamaño, referencias]
+    originales = set()
+    for tabla, columna, id_, nombre in referencias:
+        path = os.path.join(carpeta, nombre)
+        if not os.path.isfile(path) or ya_en_almacen(nombre):
+            continue
+        sha256 = digest(path)
+        extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+        blob = f"{sha256}.{extension}" if extension else sha256
+        if sha256 not in archivos:
+            archivos[sha256] = [blob, os.path.getsize(path), 0]
+            destino = os.path.join(carpeta, blob)
+            if not os.path.exists(destino):
+                os.link(path, destino)  # mismo inodo: no ocupa espacio extra hasta borrar el original
+        archivos[sha256][2] += 1
+        originales.add(path)
+        conn.execute(sa.text(f"UPDATE {tabla} SET {columna} = :blob WHERE id = :id"),
+                     {'blob': archivos[sha256][0], 'id': id_})
+
+    for sha256, (blob, tamano, usos) in archivos.items():
+        conn.execute(sa.text(
+            "INSERT INTO archivo (sha256, filename, tamano, referencias) VALUES (:s, :f, :t, :r) "
+            "ON CONFLICT (sha256) DO UPDATE SET referencias = referencias + excluded.referencias"),
+            {'s': sha256, 'f': blob, 't': tamano, 'r': usos})
+
+    # Los duplicados se borran al final, cuando todas las filas ya apuntan al archivo único
+    for path in originales:
+        os.remove(path)
+
+
+def downgrade():
+    # Los registros siguen apuntando a {sha256}.{ext}, que sigue siendo un nombre de archivo válido
+    op.drop_table('archivo')
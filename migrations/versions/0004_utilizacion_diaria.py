@@ -0,0 +1,53 @@
+"""Resúmenes diarios de utilización (uso_diario) y préstamos abiertos
+
+Las tablas se llenan con `flask --app app utilizacion reconstruir` a partir del historial;
+desde ahí cada movimiento las mantiene al día.
+
+Revision ID: 0004_utilizacion_diaria
+Revises: 0003_almacen_documentos
+Create Date: 2026-10-17 00:00:03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004_utilizacion_diaria'
+down_revision = '0003_almacen_documentos'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'uso_diario',
+        sa.Column('dia', sa.Date(), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('equipo_individual_id', sa.Integer(), nullable=False),
+        sa.Column('usuario', sa.String(length=100), nullable=False),
+        sa.Column('unidades', sa.Integer(), nullable=False),
+        sa.Column('salidas', sa.Integer(), nullable=False),
+        sa.Column('retornos', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('dia', 'equipo_id', 'equipo_individual_id', 'usuario'),
+        if_not_exists=True,
+        sqlite_with_rowid=False,
+    )
+    op.create_table(
+        'prestamo_abierto',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('equipo_individual_id', sa.Integer(), nullable=False),
+        sa.Column('usuario', sa.String(length=100), nullable=False),
+        sa.Column('desde', sa.Date(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('uq_prestamo_abierto', 'prestamo_abierto',
+                    ['equipo_id', 'equipo_individual_id', 'usuario', 'desde'], unique=True, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('uq_prestamo_abierto', table_name='prestamo_abierto')
+    op.drop_table('prestamo_abierto')
+    op.drop_table('uso_diario')
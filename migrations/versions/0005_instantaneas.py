@@ -0,0 +1,48 @@
+"""Puntos de control del estado a una fecha (instantanea y sus préstamos abiertos)
+
+Las tablas se llenan solas al consultar fechas pasadas, o de una vez con
+`flask --app app instantaneas actualizar`.
+
+Revision ID: 0005_instantaneas
+Revises: 0004_utilizacion_diaria
+Create Date: 2026-10-17 00:00:04
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005_instantaneas'
+down_revision = '0004_utilizacion_diaria'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'instantanea',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.DateTime(), nullable=False),
+        sa.Column('movimientos', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('fecha'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'instantanea_prestamo',
+        sa.Column('instantanea_id', sa.Integer(), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('equipo_individual_id', sa.Integer(), nullable=False),
+        sa.Column('usuario', sa.String(length=100), nullable=False),
+        sa.Column('desde', sa.Date(), nullable=False),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['instantanea_id'], ['instantanea.id']),
+        sa.PrimaryKeyConstraint('instantanea_id', 'equipo_id', 'equipo_individual_id', 'usuario', 'desde'),
+        if_not_exists=True,
+        sqlite_with_rowid=False,
+    )
+
+
+def downgrade():
+    op.drop_table('instantanea_prestamo')
+    op.drop_table('instantanea')
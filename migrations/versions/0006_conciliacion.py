@@ -0,0 +1,53 @@
+"""Conciliación de contadores: estado, saldos por equipo y último movimiento por unidad
+
+Las tablas se llenan con la primera corrida de `flask --app app conciliacion revisar`.
+
+Revision ID: 0006_conciliacion
+Revises: 0005_instantaneas
+Create Date: 2026-10-17 00:00:05
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006_conciliacion'
+down_revision = '0005_instantaneas'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'conciliacion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ultimo_historial_id', sa.Integer(), nullable=False),
+        sa.Column('proxima', sa.DateTime(), nullable=True),
+        sa.Column('ultima', sa.DateTime(), nullable=True),
+        sa.Column('discrepancias', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'saldo_equipo',
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('salidas', sa.Integer(), nullable=False),
+        sa.Column('retornos', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('equipo_id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'ultimo_movimiento_unidad',
+        sa.Column('equipo_individual_id', sa.Integer(), nullable=False),
+        sa.Column('historial_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('usuario', sa.String(length=100), nullable=True),
+        sa.PrimaryKeyConstraint('equipo_individual_id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('ultimo_movimiento_unidad')
+    op.drop_table('saldo_equipo')
+    op.drop_table('conciliacion')
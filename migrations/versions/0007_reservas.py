@@ -0,0 +1,48 @@
+"""Reservas de equipos y unidades individuales
+
+El índice de intervalos reserva_rtree (R*Tree) y sus triggers los crea `flask --app app inicializar`,
+igual que busqueda_fts.
+
+Revision ID: 0007_reservas
+Revises: 0006_conciliacion
+Create Date: 2026-10-17 00:00:06
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007_reservas'
+down_revision = '0006_conciliacion'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'reserva',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('equipo_individual_id', sa.Integer(), nullable=True),
+        sa.Column('cantidad', sa.Integer(), nullable=False),
+        sa.Column('usuario', sa.String(length=100), nullable=False),
+        sa.Column('inicio', sa.DateTime(), nullable=False),
+        sa.Column('fin', sa.DateTime(), nullable=False),
+        sa.Column('retiradas', sa.Integer(), nullable=False),
+        sa.Column('observaciones', sa.Text(), nullable=True),
+        sa.Column('creada', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['equipo_id'], ['equipo.id']),
+        sa.ForeignKeyConstraint(['equipo_individual_id'], ['equipo_individual.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index('ix_reserva_equipo_id', 'reserva', ['equipo_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_reserva_equipo_individual_id', 'reserva', ['equipo_individual_id'], unique=False,
+                    if_not_exists=True)
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS reserva_rtree")
+    op.drop_index('ix_reserva_equipo_individual_id', table_name='reserva')
+    op.drop_index('ix_reserva_equipo_id', table_name='reserva')
+    op.drop_table('reserva')
@@ -0,0 +1,82 @@
+"""Archivo por nombre: igual contenido con otra extensión es otro archivo
+
+Hasta ahora la tabla archivo se indexaba por sha256, pero el archivo se guarda como
+`{sha256}.{ext}`: subir el mismo contenido con otra extensión creaba un segundo archivo sin fila y
+sumaba la referencia a la del primero. Se reconstruye la tabla con filename como clave y las
+referencias se vuelven a contar desde documento y equipo. Los archivos del almacén que no usa
+ningún registro (subidas de transacciones deshechas) se borran del disco.
+
+Revision ID: 0008_archivo_por_nombre
+Revises: 0007_reservas
+Create Date: 2026-10-17 00:00:07
+
+"""
+import os
+
+from alembic import op
+import sqlalchemy as sa
+from flask import current_app
+
+
+revision = '0008_archivo_por_nombre'
+down_revision = '0007_reservas'
+branch_labels = None
+depends_on = None
+
+
+def sha256_de_nombre(nombre):
+    base = nombre.split('.', 1)[0]
+    return base if len(base) == 64 and all(c in '0123456789abcdef' for c in base) else None
+
+
+def upgrade():
+    conn = op.get_bind()
+    carpeta = current_app.config['UPLOAD_FOLDER']
+    anteriores = {f: (s, t) for s, f, t in conn.execute(sa.text("SELECT sha256, filename, tamano FROM archivo"))}
+    usos = dict(conn.execute(sa.text(
+        "SELECT filename, COUNT(*) FROM (SELECT filename FROM documento WHERE filename IS NOT NULL "
+        "UNION ALL SELECT manual_filename FROM equipo WHERE manual_filename IS NOT NULL) GROUP BY filename")).all())
+
+    op.create_table(
+        'archivo_nuevo',
+        sa.Column('filename', sa.String(length=200), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('tamano', sa.Integer(), nullable=True),
+        sa.Column('referencias', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('filename'),
+    )
+    for filename, referencias in usos.items():
+        # Los nombres anteriores al almacén siguen sin fila: los usa un solo registro (ver documentos.py)
+        sha256 = anteriores[filename][0] if filename in anteriores else sha256_de_nombre(filename)
+        if sha256 is None:
+            continue
+        path = os.path.join(carpeta, filename)
+        tamano = os.path.getsize(path) if os.path.isfile(path) else anteriores.get(filename, (None, None))[1]
+        conn.execute(sa.text("INSERT INTO archivo_nuevo (filename, sha256, tamano, referencias) "
+                             "VALUES (:f, :s, :t, :r)"), {'f': filename, 's': sha256, 't': tamano, 'r': referencias})
+    op.drop_table('archivo')
+    op.rename_table('archivo_nuevo', 'archivo')
+    op.create_index('ix_archivo_sha256', 'archivo', ['sha256'], unique=False)
+
+    if os.path.isdir(carpeta):
+        for nombre in os.listdir(carpeta):
+            if sha256_de_nombre(nombre) and nombre not in usos:
+                os.remove(os.path.join(carpeta, nombre))
+
+
+def downgrade():
+    # Vuelve a una fila por contenido; los registros siguen apuntando a su archivo en disco
+    op.create_table(
+        'archivo_anterior',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=80), nullable=False),
+        sa.Column('tamano', sa.Integer(), nullable=True),
+        sa.Column('referencias', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('sha256'),
+        sa.UniqueConstraint('filename'),
+    )
+    op.execute("INSERT INTO archivo_anterior (sha256, filename, tamano, referencias) "
+               "SELECT sha256, MIN(filename), MAX(tamano), SUM(referencias) FROM archivo GROUP BY sha256")
+    op.drop_index('ix_archivo_sha256', table_name='archivo')
+    op.drop_table('archivo')
+    op.rename_table('archivo_anterior', 'archivo')
@@ -0,0 +1,70 @@
+"""Historial con AUTOINCREMENT: los ids de movimientos borrados no se vuelven a usar
+
+Sin AUTOINCREMENT SQLite entrega max(id) + 1, así que al eliminar el equipo dueño de los movimientos
+más nuevos sus ids se repiten en los siguientes y quedan por debajo de Conciliacion.ultimo_historial_id:
+la conciliación no los contaba. SQLite no agrega AUTOINCREMENT a una tabla existente, así que se
+reconstruye con sus índices y triggers, y sqlite_sequence arranca en el mayor id ya visto (el de la
+tabla o la marca de la conciliación). Como la marca pudo haber salteado movimientos, la próxima
+conciliación vuelve a agregar todo el historial.
+
+Revision ID: 0009_historial_autoincrement
+Revises: 0008_archivo_por_nombre
+Create Date: 2026-10-17 00:00:08
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009_historial_autoincrement'
+down_revision = '0008_archivo_por_nombre'
+branch_labels = None
+depends_on = None
+
+COLUMNAS = 'id, equipo_id, tipo, usuario, cantidad, fecha, observaciones, estado_al_retorno, equipo_individual_id'
+
+
+def reconstruir(autoincrement):
+    conn = op.get_bind()
+    # Índices y triggers (contadores de versión, etc.) se van con la tabla: se guardan para recrearlos
+    dependientes = conn.execute(sa.text(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'historial' AND type IN ('index', 'trigger') "
+        "AND sql IS NOT NULL")).scalars().all()
+    op.create_table(
+        'historial_nuevo',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('equipo_id', sa.Integer(), nullable=False),
+        sa.Column('tipo', sa.String(length=20), nullable=True),
+        sa.Column('usuario', sa.String(length=100), nullable=True),
+        sa.Column('cantidad', sa.Integer(), nullable=True),
+        sa.Column('fecha', sa.DateTime(), nullable=True),
+        sa.Column('observaciones', sa.Text(), server_default='', nullable=True),
+        sa.Column('estado_al_retorno', sa.String(length=50), server_default='Buen Estado', nullable=True),
+        sa.Column('equipo_individual_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['equipo_id'], ['equipo.id']),
+        sa.ForeignKeyConstraint(['equipo_individual_id'], ['equipo_individual.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=autoincrement,
+    )
+    op.execute(f"INSERT INTO historial_nuevo ({COLUMNAS}) SELECT {COLUMNAS} FROM historial")
+    op.drop_table('historial')
+    op.rename_table('historial_nuevo', 'historial')
+    for sql in dependientes:
+        op.execute(sql)
+
+
+def upgrade():
+    reconstruir(autoincrement=True)
+    conn = op.get_bind()
+    marca = conn.execute(sa.text("SELECT max(ultimo_historial_id) FROM conciliacion")).scalar() or 0
+    maximo = conn.execute(sa.text("SELECT max(id) FROM historial")).scalar() or 0
+    conn.execute(sa.text("DELETE FROM sqlite_sequence WHERE name IN ('historial', 'historial_nuevo')"))
+    conn.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('historial', :seq)"),
+                 {'seq': max(marca, maximo)})
+    op.execute("DELETE FROM saldo_equipo")
+    op.execute("DELETE FROM ultimo_movimiento_unidad")
+    op.execute("UPDATE conciliacion SET ultimo_historial_id = 0")
+
+
+def downgrade():
+    reconstruir(autoincrement=False)
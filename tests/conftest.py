@@ -0,0 +1,47 @@
+"""Fixtures comunes: una app sobre una base temporal vacía, inicializada como en un despliegue"""
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    """Base, manuales, respaldos y caché en una carpeta temporal (configurar() los lee del entorno)"""
+    monkeypatch.setenv('DATABASE_PATH', str(tmp_path / 'inventario.db'))
+    monkeypatch.setenv('UPLOAD_FOLDER', str(tmp_path / 'manuales'))
+    monkeypatch.setenv('BACKUP_FOLDER', str(tmp_path / 'backups'))
+    monkeypatch.setenv('CACHE_FOLDER', str(tmp_path / 'cache'))
+    monkeypatch.setenv('BACKUP_CADA_N_ESCRITURAS', str(10 ** 9))
+    return tmp_path
+
+
+@pytest.fixture
+def app(carpeta):
+    from inventario import create_app
+    from inventario.cli import inicializar_base
+
+    app = create_app({'TESTING': True, 'CONCILIACION_INTERVALO_SEGUNDOS': 0})
+    # Las cachés por proceso se indexan por versión de datos, y una base nueva repite versiones: lo
+    # mismo que al restaurar un respaldo
+    for vaciar in app.extensions['respaldos'].al_restaurar:
+        vaciar()
+    with app.app_context():
+        inicializar_base()
+    yield app
+    for vaciar in app.extensions['respaldos'].al_restaurar:
+        vaciar()
+
+
+@pytest.fixture
+def cliente(app):
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={'username': 'MLProducciones', 'password': 'admin123'})
+    assert respuesta.status_code == 302
+    # El mensaje de bienvenida haría que el primer request se salte la caché de páginas
+    with cliente.session_transaction() as sesion:
+        sesion.pop('_flashes', None)
+    return cliente
@@ -0,0 +1,54 @@
+from inventario.busqueda import inicializar_busqueda
+from inventario.extensiones import db
+from inventario.modelos import Equipo, EquipoIndividual
+
+
+def crear_grupo(nombre, marca, fixtures):
+    grupo = Equipo(nombre=nombre, marca=marca, categoria='Luminarias', gestion_individual=True,
+                   cantidad_total=len(fixtures))
+    db.session.add(grupo)
+    db.session.flush()
+    db.session.add_all(EquipoIndividual(equipo_grupo_id=grupo.id, numero_fixture=n, numero_serie=f'S-{grupo.id}-{n}')
+                       for n in fixtures)
+    db.session.commit()
+    return grupo.id
+
+
+def buscar(cliente, q):
+    respuesta = cliente.get('/api/buscar', query_string={'q': q})
+    assert respuesta.status_code == 200
+    return {(i['nombre'], i['numero_fixture']) for i in respuesta.get_json()['items']}
+
+
+def test_grupo_y_fixture_en_la_misma_consulta(app, cliente):
+    with app.app_context():
+        crear_grupo('Forza 720B', 'Nanlite', [3, 12])
+        crear_grupo('Alien 150C', 'Nanlite', [12])
+
+    assert buscar(cliente, 'forza 12') == {('Forza 720B', 12)}
+    assert buscar(cliente, 'Forza 720B #12') == {('Forza 720B', 12)}
+    assert buscar(cliente, 'nanlite 12') == {('Forza 720B', 12), ('Alien 150C', 12)}
+    # Solo el grupo sigue trayendo todas sus unidades
+    assert buscar(cliente, 'forza') == {('Forza 720B', 3), ('Forza 720B', 12)}
+
+
+def test_renombrar_grupo_reindexa_sus_unidades(app, cliente):
+    with app.app_context():
+        grupo_id = crear_grupo('Forza 720B', 'Nanlite', [12])
+        db.session.get(Equipo, grupo_id).nombre = 'Evoke 1200'
+        db.session.commit()
+
+    assert buscar(cliente, 'evoke 12') == {('Evoke 1200', 12)}
+    assert buscar(cliente, 'forza 12') == set()
+
+
+def test_indice_del_formato_anterior_se_reconstruye(app, cliente):
+    with app.app_context():
+        crear_grupo('Forza 720B', 'Nanlite', [12])
+        # Lo que dejaba la versión anterior: sin el trigger nuevo y unidades sin el texto del grupo
+        db.session.execute(db.text("DROP TRIGGER busqueda_equipo_au_unidades"))
+        db.session.execute(db.text("UPDATE busqueda_fts SET texto = '12' WHERE tipo = 'individual'"))
+        db.session.commit()
+        inicializar_busqueda()
+
+    assert buscar(cliente, 'forza 12') == {('Forza 720B', 12)}
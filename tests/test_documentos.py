@@ -0,0 +1,94 @@
+"""Almacén de documentos: referencias por archivo, subidas deshechas y documentos vinculados a varios equipos"""
+import io
+import os
+
+from werkzeug.datastructures import FileStorage
+
+
+def nuevo_equipo(cliente, nombre):
+    from inventario.modelos import Equipo
+    cliente.post('/add', data={'nom': nombre, 'mar': 'Test', 'cat': 'Audio', 'can': 1})
+    return Equipo.query.filter_by(nombre=nombre).one().id
+
+
+def subir(cliente, equipo_id, nombre, contenido):
+    return cliente.post(f'/equipo/{equipo_id}/add_documento', content_type='multipart/form-data',
+                        data={'referencia': nombre, 'documento': (io.BytesIO(contenido), nombre)})
+
+
+def archivos(app):
+    from inventario.modelos import Archivo
+    return {a.filename: a.referencias for a in Archivo.query}
+
+
+def en_disco(app):
+    return {n for n in os.listdir(app.config['UPLOAD_FOLDER']) if not n.startswith('.')}
+
+
+def test_mismo_contenido_con_otra_extension_es_otro_archivo(app, cliente):
+    with app.app_context():
+        equipo = nuevo_equipo(cliente, 'Consola')
+        subir(cliente, equipo, 'plano.pdf', b'mismo contenido')
+        subir(cliente, equipo, 'plano.png', b'mismo contenido')
+        subir(cliente, equipo, 'copia.pdf', b'mismo contenido')
+        conteo = archivos(app)
+        assert sorted(conteo.values()) == [1, 2]
+        assert set(conteo) == en_disco(app)
+
+        from inventario.modelos import Documento
+        png = Documento.query.filter(Documento.filename.like('%.png')).one()
+        cliente.post(f'/documento/delete/{png.id}')
+        assert list(archivos(app).values()) == [2]
+        assert en_disco(app) == set(archivos(app))
+
+
+def test_subida_de_una_transaccion_deshecha_se_borra(app):
+    from inventario.documentos import guardar_archivo
+    from inventario.extensiones import db
+
+    with app.test_request_context():
+        guardar_archivo(FileStorage(io.BytesIO(b'se deshace'), 'a.pdf'))
+        assert len(en_disco(app)) == 1
+        db.session.rollback()
+        assert en_disco(app) == set()
+
+        # Sin rollback explícito: el request termina y la sesión se cierra sin commit
+        guardar_archivo(FileStorage(io.BytesIO(b'sin commit'), 'b.pdf'))
+        db.session.remove()
+        assert en_disco(app) == set()
+
+        filename = guardar_archivo(FileStorage(io.BytesIO(b'confirmado'), 'c.pdf'))
+        db.session.commit()
+        # Otra subida del mismo contenido que se deshace no borra el archivo ya registrado
+        guardar_archivo(FileStorage(io.BytesIO(b'confirmado'), 'c.pdf'))
+        db.session.rollback()
+        assert en_disco(app) == {filename}
+        assert archivos(app) == {filename: 1}
+
+
+def test_vincular_documento_a_varios_equipos(app, cliente):
+    from inventario.modelos import Documento
+
+    with app.app_context():
+        origen = nuevo_equipo(cliente, 'Origen')
+        destinos = [nuevo_equipo(cliente, f'Destino {i}') for i in range(3)]
+        subir(cliente, origen, 'manual.pdf', b'manual compartido')
+        filename = Documento.query.filter_by(equipo_id=origen).one().filename
+        assert cliente.get(f'/equipo/{origen}').status_code == 200
+
+        cliente.post(f'/equipo/{origen}/vincular_documento',
+                     data={'filename': filename, 'equipo_ids': destinos[:2]})
+        # Repetir un destino no suma otra referencia
+        cliente.post(f'/equipo/{origen}/vincular_documento',
+                     data={'filename': filename, 'equipo_ids': destinos})
+        vinculados = Documento.query.filter_by(filename=filename).all()
+        assert sorted(d.equipo_id for d in vinculados) == [origen] + destinos
+        assert {d.nombre_referencial for d in vinculados} == {'manual.pdf'}
+        assert archivos(app) == {filename: 4}
+
+        # El archivo queda en disco hasta que lo suelta el último equipo
+        for d in vinculados[:-1]:
+            cliente.post(f'/documento/delete/{d.id}')
+        assert en_disco(app) == {filename}
+        cliente.post(f'/documento/delete/{vinculados[-1].id}')
+        assert en_disco(app) == set() and archivos(app) == {}
@@ -0,0 +1,71 @@
+"""Presupuesto de sentencias SQL por ruta (ver SQL_PRESUPUESTOS en config.py y metricas.py).
+
+Con TESTING la app lanza AssertionError cuando una ruta se pasa de su presupuesto. Cada ruta con
+presupuesto tiene que estar en RUTAS: agregar un presupuesto sin agregar aquí cómo pedirla falla.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import pytest
+
+from conftest import RAIZ
+
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+import generar_datos  # noqa: E402
+
+RUTAS = {
+    'equipos.index': lambda ids: ('GET', '/inventario', None),
+    'busqueda.buscar': lambda ids: ('GET', '/buscar', None),
+    'individuales.luminarias': lambda ids: ('GET', '/luminarias', None),
+    'individuales.gestion_individual': lambda ids: ('GET', f"/equipo/{ids['grupo_individual']}/individuales", None),
+    'movimientos.mostrar_historial': lambda ids: ('GET', '/historial?tipo=SALIDA', None),
+    'movimientos.movimiento': lambda ids: ('POST', f"/movimiento/{ids['equipo_cantidad']}/prestar",
+                                           {'cant_lote': 1, 'donde': 'Test'}),
+    'utilizacion.reporte': lambda ids: ('GET', '/utilizacion', None),
+    'api.api_equipos': lambda ids: ('GET', '/api/v1/equipos', None),
+    'api.api_individuales': lambda ids: ('GET', '/api/v1/individuales', None),
+    'api.api_repuestos': lambda ids: ('GET', '/api/v1/repuestos', None),
+    'api.api_movimientos': lambda ids: ('GET', '/api/v1/movimientos', None),
+}
+
+
+@pytest.fixture
+def ids(app):
+    # Suficientes filas por relación para que una carga perezosa N+1 se note en el conteo
+    ids = generar_datos.generar(equipos=25, individuales=300, movimientos=1500, repuestos=30)
+    # Una reserva en curso del destino de la salida: el movimiento también la retira (el caso más caro)
+    from inventario.extensiones import db
+    from inventario.modelos import Reserva
+    ahora = datetime.now()
+    with app.app_context():
+        db.session.add(Reserva(equipo_id=ids['equipo_cantidad'], cantidad=1, usuario='Test',
+                               inicio=ahora - timedelta(hours=1), fin=ahora + timedelta(days=1)))
+        db.session.commit()
+    return ids
+
+
+def pedir(app, cliente, metodo, url, datos):
+    # Sin cachés (páginas, Excel, destinos, grafo): se cuenta lo que cuesta armar la respuesta en frío
+    for vaciar in app.extensions['respaldos'].al_restaurar:
+        vaciar()
+    return cliente.open(url, method=metodo, data=datos)
+
+
+def test_todas_las_rutas_con_presupuesto_tienen_escenario(app):
+    assert set(app.config['SQL_PRESUPUESTOS']) == set(RUTAS)
+
+
+@pytest.mark.parametrize('endpoint', sorted(RUTAS))
+def test_ruta_dentro_del_presupuesto(app, cliente, ids, endpoint):
+    metodo, url, datos = RUTAS[endpoint](ids)
+    respuesta = pedir(app, cliente, metodo, url, datos)
+    assert respuesta.status_code < 400
+    assert app.url_map.bind('localhost').match(urlsplit(url).path, method=metodo)[0] == endpoint
+
+
+def test_superar_el_presupuesto_falla(app, cliente, ids):
+    app.config['SQL_PRESUPUESTOS'] = dict(app.config['SQL_PRESUPUESTOS'], **{'equipos.index': 0})
+    with pytest.raises(AssertionError, match='equipos.index'):
+        pedir(app, cliente, 'GET', '/inventario', None)
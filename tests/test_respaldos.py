@@ -0,0 +1,56 @@
+"""Restaurar un respaldo: las versiones de datos vuelven atrás y lo cacheado con ellas no puede servirse"""
+import io
+import os
+
+import openpyxl
+
+
+def agregar_equipo(cliente, nombre):
+    cliente.post('/add', data={'nom': nombre, 'mar': 'Test', 'cat': 'Audio', 'can': 1})
+
+
+def nombres_en_libro(contenido):
+    libro = openpyxl.load_workbook(io.BytesIO(contenido), read_only=True)
+    return {celda for hoja in libro for fila in hoja.iter_rows(values_only=True) for celda in fila}
+
+
+def test_restaurar_no_deja_servir_un_excel_viejo_con_la_misma_version(app, cliente):
+    from inventario.cache import version_datos
+
+    motor = app.extensions['respaldos']
+    with app.app_context():
+        respaldo = motor.realizar()
+        agregar_equipo(cliente, 'Antes de restaurar')
+        version = version_datos()
+        assert 'Antes de restaurar' in nombres_en_libro(cliente.get('/exportar').data)
+
+        motor.restaurar(respaldo)
+        assert not [n for n in os.listdir(app.config['CACHE_FOLDER']) if n.endswith('.xlsx')]
+
+        # Las mismas escrituras con otros datos llevan la suma de versiones al mismo número
+        agregar_equipo(cliente, 'Después de restaurar')
+        assert version_datos() == version
+        nombres = nombres_en_libro(cliente.get('/exportar').data)
+    assert 'Después de restaurar' in nombres and 'Antes de restaurar' not in nombres
+
+
+def test_restaurar_vacia_las_caches_del_proceso(app, cliente):
+    from inventario.cache import version_datos
+
+    motor = app.extensions['respaldos']
+    with app.app_context():
+        respaldo = motor.realizar()
+    agregar_equipo(cliente, 'Antes de restaurar')
+    cliente.get('/inventario')  # consume el mensaje flash
+    assert 'Antes de restaurar' in cliente.get('/inventario').get_data(as_text=True)
+    with app.app_context():
+        version = version_datos()
+        motor.restaurar(respaldo)
+
+    # Las mismas escrituras llevan a la misma versión: la página cacheada con ella no puede volver
+    agregar_equipo(cliente, 'Después de restaurar')
+    cliente.get('/inventario')
+    with app.app_context():
+        assert version_datos() == version
+    pagina = cliente.get('/inventario').get_data(as_text=True)
+    assert 'Después de restaurar' in pagina and 'Antes de restaurar' not in pagina
@@ -0,0 +1,14 @@
+"""Catálogo de destinos: la lista en memoria sigue a la versión de la tabla, no a un plazo"""
+import sqlite3
+
+
+def test_destino_registrado_por_otro_worker_aparece_enseguida(app, cliente):
+    from inventario.ubicaciones import listar_ubicaciones
+
+    with app.app_context():
+        assert 'Teatro' not in listar_ubicaciones()
+        # Otro proceso escribe directo en la base: este no ve ningún evento de su sesión
+        with sqlite3.connect(app.config['SQLALCHEMY_DATABASE_URI'].removeprefix('sqlite:///')) as conexion:
+            conexion.execute("INSERT INTO ubicacion (nombre, usos, ultimo_uso) VALUES ('Teatro', 1, '2099-01-01')")
+        assert listar_ubicaciones()[0] == 'Teatro'
+    assert 'Teatro' in cliente.get('/inventario').get_data(as_text=True)